@@ -5,12 +5,28 @@ import { useParams, useRouter } from 'next/navigation';
 import axios from 'axios';
 import CodeEditor from '@/components/CodeEditor';
 
+const LANGUAGES: { [key: string]: { label: string; template: string } } = {
+  cpp: {
+    label: 'C++17',
+    template: '#include <iostream>\nusing namespace std;\n\nint main() {\n    // Your code here\n    return 0;\n}'
+  },
+  python: {
+    label: 'Python 3',
+    template: '# Your code here\n'
+  },
+  java: {
+    label: 'Java 21',
+    template: 'import java.util.*;\n\npublic class Main {\n    public static void main(String[] args) {\n        // Your code here\n    }\n}'
+  }
+};
+
 export default function SubmitPage() {
   const params = useParams();
   const router = useRouter();
   const contestId = params.id as string;
   const [problemId, setProblemId] = useState('');
-  const [code, setCode] = useState('#include <iostream>\nusing namespace std;\n\nint main() {\n    // Your code here\n    return 0;\n}');
+  const [language, setLanguage] = useState('cpp');
+  const [code, setCode] = useState(LANGUAGES.cpp.template);
   const [problems, setProblems] = useState<any[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -35,6 +51,14 @@ export default function SubmitPage() {
     }
   };
 
+  const changeLanguage = (next: string) => {
+    // Replace the template of the previous language, but never code the user wrote
+    if (code === LANGUAGES[language].template) {
+      setCode(LANGUAGES[next].template);
+    }
+    setLanguage(next);
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     setError('');
@@ -48,7 +72,7 @@ export default function SubmitPage() {
           contest_id: contestId,
           problem_id: problemId,
           code: code,
-          language: 'cpp'
+          language: language
         },
         { headers: { Authorization: `Bearer ${token}` } }
       );
@@ -88,11 +112,28 @@ export default function SubmitPage() {
             ))}
           </select>
         </div>
+        <div>
+          <label htmlFor="language" className="block text-sm font-medium text-gray-700 mb-2">
+            Language
+          </label>
+          <select
+            id="language"
+            value={language}
+            onChange={(e) => changeLanguage(e.target.value)}
+            className="block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-blue-500"
+          >
+            {Object.entries(LANGUAGES).map(([key, { label }]) => (
+              <option key={key} value={key}>
+                {label}
+              </option>
+            ))}
+          </select>
+        </div>
         <div>
           <label className="block text-sm font-medium text-gray-700 mb-2">
-            Code (C++)
+            Code ({LANGUAGES[language].label})
           </label>
-          <CodeEditor value={code} onChange={setCode} language="cpp" />
+          <CodeEditor value={code} onChange={setCode} language={language} />
         </div>
         <button
           type="submit"
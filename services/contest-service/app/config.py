@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     # Auth Service
     AUTH_SERVICE_URL: str = "http://auth-service:8000"
     
+    # Shared with the judges, which send it to fetch hidden test data and checkers; unset, nobody can
+    INTERNAL_SERVICE_TOKEN: str = ""
+    
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
     
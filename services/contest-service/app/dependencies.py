@@ -1,3 +1,5 @@
+import hmac
+
 from fastapi import Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
 import httpx
@@ -46,3 +48,12 @@ async def require_staff(auth_data: dict = Depends(verify_token)) -> dict:
         )
     return auth_data
 
+async def require_internal_service(x_internal_service_token: str = Header(None)) -> None:
+    """Require the token shared with the judges, for data contestants must not see"""
+    if not settings.INTERNAL_SERVICE_TOKEN or not x_internal_service_token or not hmac.compare_digest(
+        x_internal_service_token.encode(), settings.INTERNAL_SERVICE_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Internal service access required"
+        )
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Text, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+import enum
 
 from app.database import Base
 
+class JudgingPolicy(str, enum.Enum):
+    ICPC = "icpc"  # Fail-fast: stop judging at the first test that does not pass
+    IOI = "ioi"    # Run all tests for partial scoring
+
 class Contest(Base):
     __tablename__ = "contests"
 
@@ -20,6 +25,7 @@ class Contest(Base):
     is_active = Column(Boolean, default=True, index=True)
     registration_open = Column(Boolean, default=True)
     max_participants = Column(Integer)
+    judging_policy = Column(SQLEnum(JudgingPolicy, values_callable=lambda policies: [p.value for p in policies]), nullable=False, default=JudgingPolicy.IOI)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -1,17 +1,25 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Text, Enum as SQLEnum, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 import uuid
 import enum
 
 from app.database import Base
+from app.models.contest import JudgingPolicy
 
 class Difficulty(str, enum.Enum):
     EASY = "easy"
     MEDIUM = "medium"
     HARD = "hard"
 
+class CheckerMode(str, enum.Enum):
+    EXACT = "exact"  # Whole output, ignoring leading and trailing whitespace
+    TOKENS = "tokens"  # Whitespace-separated tokens
+    FLOAT = "float"  # Tokens, numbers compared with checker_tolerance
+    CUSTOM = "custom"  # The problem's checker program (checker_source) decides
+
 class Problem(Base):
     __tablename__ = "problems"
 
@@ -24,6 +32,16 @@ class Problem(Base):
     memory_limit_mb = Column(Integer, nullable=False, default=256)
     points = Column(Integer, nullable=False, default=100)
     order_index = Column(Integer, nullable=False)
+    # Overrides the contest's judging policy when set
+    judging_policy = Column(SQLEnum(JudgingPolicy, values_callable=lambda policies: [p.value for p in policies]))
+    checker_mode = Column(SQLEnum(CheckerMode, values_callable=lambda modes: [m.value for m in modes]), nullable=False, default=CheckerMode.EXACT)
+    checker_tolerance = Column(Float, nullable=False, default=1e-6)  # Absolute or relative error
+    # C++ source of the custom checker; judges compile it once per checker_version
+    checker_source = Column(Text)
+    # Bumped whenever checker_source changes
+    checker_version = Column(Integer, nullable=False, default=1)
+    # Bumped whenever test cases change; judges cache test data per version
+    test_set_version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -31,6 +49,20 @@ class Problem(Base):
     contest = relationship("Contest", back_populates="problems")
     test_cases = relationship("TestCase", back_populates="problem", cascade="all, delete-orphan")
 
+    @property
+    def effective_judging_policy(self) -> str:
+        """Judging policy for this problem, falling back to the contest's"""
+        policy = self.judging_policy or (self.contest.judging_policy if self.contest else JudgingPolicy.IOI)
+        return JudgingPolicy(policy).value
+
+    @property
+    def contest_running(self) -> bool:
+        """Whether the problem's contest is active and between its start and end time"""
+        contest = self.contest
+        if not contest or not contest.is_active:
+            return False
+        return contest.start_time <= datetime.now(timezone.utc) <= contest.end_time
+
     def __repr__(self):
         return f"<Problem {self.title}>"
 
@@ -1,10 +1,12 @@
-from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Text, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, Text, DateTime, event
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
+from itertools import chain
 import uuid
 
 from app.database import Base
+from app.models.problem import Problem
 
 class TestCase(Base):
     __tablename__ = "test_cases"
@@ -23,3 +25,17 @@ class TestCase(Base):
     def __repr__(self):
         return f"<TestCase {self.id}>"
 
+@event.listens_for(Session, "before_flush")
+def bump_test_set_version(session, flush_context, instances):
+    """Give problems whose test cases are added, changed or removed a new test-set version"""
+    problem_ids = {
+        obj.problem_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, TestCase) and obj.problem_id is not None
+    }
+    with session.no_autoflush:
+        for problem_id in problem_ids:
+            problem = session.get(Problem, problem_id)
+            if problem is not None and problem not in session.deleted:
+                problem.test_set_version = Problem.test_set_version + 1
+
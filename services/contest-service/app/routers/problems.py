@@ -4,10 +4,12 @@ from typing import List
 from uuid import UUID
 
 from app.database import get_db
-from app.models.problem import Problem
+from app.models.problem import Problem, CheckerMode
 from app.models.contest import Contest
-from app.schemas.problem import ProblemCreate, ProblemUpdate, ProblemResponse, ProblemWithTestCases
-from app.dependencies import get_current_user, require_staff
+from app.models.test_case import TestCase
+from app.schemas.problem import ProblemCreate, ProblemUpdate, ProblemResponse, ProblemWithTestCases, CheckerData
+from app.schemas.test_case import TestSetInfo, TestSetData, TestCaseData
+from app.dependencies import get_current_user, require_staff, require_internal_service
 
 router = APIRouter()
 
@@ -25,6 +27,11 @@ async def create_problem(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contest not found"
         )
+    if problem_data.checker_mode == CheckerMode.CUSTOM.value and not problem_data.checker_source:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The custom checker mode requires checker_source"
+        )
     
     db_problem = Problem(**problem_data.dict())
     db.add(db_problem)
@@ -48,14 +55,94 @@ async def get_problem(
     problem_id: UUID,
     db: Session = Depends(get_db)
 ):
-    """Get problem by ID with test cases"""
+    """Get problem by ID with its sample test cases, the only ones contestants may see"""
     problem = db.query(Problem).filter(Problem.id == problem_id).first()
     if not problem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Problem not found"
         )
-    return problem
+    samples = db.query(TestCase).filter(
+        TestCase.problem_id == problem_id,
+        TestCase.is_sample.is_(True)
+    ).order_by(TestCase.order_index).all()
+    return ProblemWithTestCases(
+        **ProblemResponse.model_validate(problem).model_dump(),
+        test_cases=[TestCaseData.model_validate(sample) for sample in samples]
+    )
+
+@router.get("/{problem_id}/test-set", response_model=TestSetInfo)
+async def get_test_set_info(
+    problem_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Get the current test-set version and size of a problem"""
+    problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    count = db.query(TestCase).filter(TestCase.problem_id == problem_id).count()
+    return TestSetInfo(problem_id=problem.id, version=problem.test_set_version, test_case_count=count)
+
+@router.get("/{problem_id}/test-set/data", response_model=TestSetData, dependencies=[Depends(require_internal_service)])
+async def get_test_set_data(
+    problem_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Get the test cases of a problem with their version, fetched by judges once per version"""
+    problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    test_cases = db.query(TestCase).filter(
+        TestCase.problem_id == problem_id
+    ).order_by(TestCase.order_index).all()
+    return TestSetData(
+        problem_id=problem.id,
+        version=problem.test_set_version,
+        test_case_count=len(test_cases),
+        test_cases=test_cases
+    )
+
+@router.get("/{problem_id}/checker", response_model=CheckerData, dependencies=[Depends(require_internal_service)])
+async def get_checker(
+    problem_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Get the source of a problem's custom checker with its version, fetched by judges once per version"""
+    problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    if not problem.checker_source:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem has no custom checker"
+        )
+    return CheckerData(problem_id=problem.id, version=problem.checker_version, source=problem.checker_source)
+
+@router.get("/{problem_id}/samples", response_model=List[TestCaseData])
+async def get_sample_tests(
+    problem_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Get the sample test cases of a problem, which contestants may see"""
+    problem = db.query(Problem).filter(Problem.id == problem_id).first()
+    if not problem:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Problem not found"
+        )
+    return db.query(TestCase).filter(
+        TestCase.problem_id == problem_id,
+        TestCase.is_sample.is_(True)
+    ).order_by(TestCase.order_index).all()
 
 @router.put("/{problem_id}", response_model=ProblemResponse)
 async def update_problem(
@@ -73,6 +160,16 @@ async def update_problem(
         )
     
     update_data = problem_update.dict(exclude_unset=True)
+    checker_mode = update_data.get("checker_mode", CheckerMode(problem.checker_mode).value)
+    checker_source = update_data.get("checker_source", problem.checker_source)
+    if checker_mode == CheckerMode.CUSTOM.value and not checker_source:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The custom checker mode requires checker_source"
+        )
+    if checker_source != problem.checker_source:
+        # Judges compile and cache checkers per version
+        problem.checker_version = Problem.checker_version + 1
     for field, value in update_data.items():
         setattr(problem, field, value)
     
@@ -10,6 +10,7 @@ class ContestBase(BaseModel):
     end_time: datetime
     duration_minutes: int
     max_participants: Optional[int] = None
+    judging_policy: str = Field(default="ioi", pattern="^(icpc|ioi)$")
 
 class ContestCreate(ContestBase):
     pass
@@ -23,6 +24,7 @@ class ContestUpdate(BaseModel):
     is_active: Optional[bool] = None
     registration_open: Optional[bool] = None
     max_participants: Optional[int] = None
+    judging_policy: Optional[str] = Field(None, pattern="^(icpc|ioi)$")
 
 class ContestResponse(ContestBase):
     id: UUID
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 
+from app.schemas.test_case import TestCaseData
+
 class ProblemBase(BaseModel):
     title: str
     description: str
@@ -11,9 +13,14 @@ class ProblemBase(BaseModel):
     memory_limit_mb: int = Field(default=256, ge=1)
     points: int = Field(default=100, ge=0)
     order_index: int
+    judging_policy: Optional[str] = Field(None, pattern="^(icpc|ioi)$")
+    checker_mode: str = Field(default="exact", pattern="^(exact|tokens|float|custom)$")
+    checker_tolerance: float = Field(default=1e-6, ge=0)
 
 class ProblemCreate(ProblemBase):
     contest_id: UUID
+    # Required with the "custom" checker mode; never returned to contestants
+    checker_source: Optional[str] = Field(None, min_length=1)
 
 class ProblemUpdate(BaseModel):
     title: Optional[str] = None
@@ -23,10 +30,18 @@ class ProblemUpdate(BaseModel):
     memory_limit_mb: Optional[int] = Field(None, ge=1)
     points: Optional[int] = Field(None, ge=0)
     order_index: Optional[int] = None
+    judging_policy: Optional[str] = Field(None, pattern="^(icpc|ioi)$")
+    checker_mode: Optional[str] = Field(None, pattern="^(exact|tokens|float|custom)$")
+    checker_tolerance: Optional[float] = Field(None, ge=0)
+    checker_source: Optional[str] = Field(None, min_length=1)
 
 class ProblemResponse(ProblemBase):
     id: UUID
     contest_id: UUID
+    effective_judging_policy: str
+    contest_running: bool
+    test_set_version: int
+    checker_version: int
     created_at: datetime
     updated_at: datetime
 
@@ -34,5 +49,12 @@ class ProblemResponse(ProblemBase):
         from_attributes = True
 
 class ProblemWithTestCases(ProblemResponse):
-    test_cases: List[Any] = []
+    # Sample tests only; judges fetch the rest from the token-protected test-set route
+    test_cases: List[TestCaseData] = []
+
 
+class CheckerData(BaseModel):
+    """Source of a problem's custom checker, fetched by judges once per version"""
+    problem_id: UUID
+    version: int
+    source: str
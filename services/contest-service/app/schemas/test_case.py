@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 
@@ -26,3 +26,20 @@ class TestCaseResponse(TestCaseBase):
     class Config:
         from_attributes = True
 
+
+class TestSetInfo(BaseModel):
+    """Identifies the current test data of a problem without carrying it"""
+    problem_id: UUID
+    version: int
+    test_case_count: int
+
+class TestCaseData(BaseModel):
+    id: UUID
+    input_data: str
+    expected_output: str
+
+    class Config:
+        from_attributes = True
+
+class TestSetData(TestSetInfo):
+    test_cases: List[TestCaseData]
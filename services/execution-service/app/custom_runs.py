@@ -0,0 +1,107 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.executor.test_data import write_test_set
+from app.metrics import CUSTOM_RUN_SECONDS, CUSTOM_RUNS_REJECTED_TOTAL
+from app.worker import checkers, executor
+
+
+class CustomRunBusy(Exception):
+    """Every custom-run worker and pending slot is taken"""
+
+
+class CustomRunner:
+    """Runs contestants' code against their own input or a problem's samples
+    
+    Custom runs bypass the judging queue and get a small pool of their own
+    (CUSTOM_RUN_WORKERS), so they answer within about a compile and a run and
+    exploratory traffic does not hold up judging. Binaries come from the same
+    compile server and artifact store as judged submissions. Nothing is
+    stored; at most CUSTOM_RUN_MAX_PENDING runs wait for a worker, further
+    ones are turned away with CustomRunBusy.
+    """
+    
+    def __init__(self, workers: int, max_pending: int):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="custom-run")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+    
+    def submit(self, code: str, tests: List[Dict], time_limit_seconds: int, memory_limit_mb: int,
+               checker_mode: Optional[str] = None, checker_tolerance: float = 1e-6, language: str = "cpp",
+               checker: Optional[Tuple[str, int]] = None) -> Future:
+        """Queue a run; tests are {"input_data", "expected_output"} with the expected output only for samples
+        
+        With the "custom" checker mode, checker is the (problem id, checker version) of the problem's checker.
+        """
+        if not self._slots.acquire(blocking=False):
+            CUSTOM_RUNS_REJECTED_TOTAL.inc()
+            raise CustomRunBusy()
+        queued_at = time.monotonic()
+        
+        def task():
+            try:
+                result = self._run(code, tests, time_limit_seconds, memory_limit_mb, checker_mode, checker_tolerance, language, checker)
+            finally:
+                self._slots.release()
+            CUSTOM_RUN_SECONDS.labels(status=result["status"]).observe(time.monotonic() - queued_at)
+            return result
+        
+        return self._pool.submit(task)
+    
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _run(self, code: str, tests: List[Dict], time_limit_seconds: int, memory_limit_mb: int,
+             checker_mode: Optional[str], checker_tolerance: float, language: str,
+             checker: Optional[Tuple[str, int]]) -> Dict:
+        compiled = executor.compile(code, language)
+        if compiled["status"] != "compiled":
+            return {"status": compiled["status"], "error_message": compiled["error_message"], "tests": []}
+        checker_artifact = None
+        if checker_mode == "custom":
+            try:
+                checker_artifact = checkers.artifact(*checker)
+            except Exception as e:
+                return {"status": "error", "error_message": f"Checker not available: {e}", "tests": []}
+        
+        with tempfile.TemporaryDirectory() as directory:
+            test_set = write_test_set(directory, [
+                {"input_data": test["input_data"], "expected_output": test.get("expected_output") or ""}
+                for test in tests
+            ])
+            result = executor.run(
+                compiled["artifact"],
+                test_set=test_set,
+                time_limit_seconds=time_limit_seconds,
+                memory_limit_mb=memory_limit_mb,
+                judging_policy="ioi",
+                # Without an expected output the supervisor keeps the output instead of checking it
+                checker_mode=checker_mode or "none",
+                checker_tolerance=checker_tolerance,
+                language=language,
+                checker_artifact=checker_artifact
+            )
+        
+        status = result["status"]
+        if status == "accepted" and checker_mode is None:
+            status = "completed"
+        return {
+            "status": status,
+            "error_message": result.get("error_message"),
+            "tests": [
+                {
+                    "status": "ok" if test["status"] == "passed" and checker_mode is None else test["status"],
+                    "execution_time_ms": test.get("execution_time_ms"),
+                    "memory_used_mb": test.get("memory_used_mb"),
+                    "output": test.get("actual_output"),
+                    "expected_output": test.get("expected_output") if checker_mode else None,
+                    "error_message": test.get("error_message")
+                }
+                for test in result["results"]
+            ]
+        }
+
+
+custom_runner = CustomRunner(settings.CUSTOM_RUN_WORKERS, settings.CUSTOM_RUN_MAX_PENDING)
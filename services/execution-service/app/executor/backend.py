@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.executor.languages import Language
+
+
+class Workspace:
+    """Directory a submission is compiled and run in
+
+    work_dir is the path on this host, sandbox_dir is the same directory as seen
+    by processes running inside the sandbox, which has language's runtime.
+    """
+
+    def __init__(self, work_dir: str, sandbox_dir: str, language: Language, handle=None):
+        self.work_dir = work_dir
+        self.sandbox_dir = sandbox_dir
+        self.language = language
+        # Backend-specific state, e.g. the pooled container backing this workspace
+        self.handle = handle
+
+
+class SandboxBackend:
+    """Interface for the environments Executor compiles and runs submissions in"""
+
+    name = "base"
+    # Whether run_isolated() is available for the per-test execution mode
+    supports_per_test = False
+
+    def is_available(self) -> bool:
+        raise NotImplementedError
+
+    @property
+    def unavailable_message(self) -> str:
+        return f"{self.name} sandbox not available"
+
+    def start(self):
+        """Prepare long-lived resources such as warm sandboxes"""
+
+    def shutdown(self):
+        """Release long-lived resources"""
+
+    def language_available(self, language: Language) -> bool:
+        """Whether submissions in a language can be compiled and run"""
+        return True
+
+    @contextmanager
+    def workspace(self, language: Language) -> Iterator[Workspace]:
+        """Workspace in a sandbox with the language's toolchain"""
+        raise NotImplementedError
+        yield
+
+    def compiler_digest(self, language: Language) -> str:
+        """Identifies a language's toolchain, used to key the compilation cache"""
+        raise NotImplementedError
+
+    def supervisor_path(self, workspace: Workspace) -> str:
+        """Path of the supervisor binary inside the sandbox"""
+        raise NotImplementedError
+
+    def staged_tests_path(self, workspace: Workspace, staged_dir: str) -> str:
+        """Path inside the sandbox of a test set staged in TEST_DATA_STAGE_DIR (see TestStage)"""
+        raise NotImplementedError
+
+    def start_compile_server(self, compiler: List[str], jobs: int) -> str:
+        """Start a long-lived compile server (compile_server.c) next to the sandboxes, return its socket path
+
+        compiler is the compile command without input and output files. The
+        server builds a precompiled header for it first; this blocks until the
+        server accepts jobs. A server started earlier is replaced.
+        """
+        raise NotImplementedError
+
+    def stop_compile_server(self):
+        """Stop the compile server, if one is running"""
+
+    def compile(self, workspace: Workspace, command: List[str], timeout: int) -> Dict:
+        """Run a compile command, return {"success": bool, "error": str}"""
+        raise NotImplementedError
+
+    def run(self, workspace: Workspace, script: str, timeout: int, memory_limit_mb: int) -> bytes:
+        """Run a shell script that invokes the supervisor, return its stdout"""
+        raise NotImplementedError
+
+    def run_isolated(self, workspace: Workspace, command: List[str], timeout: int, memory_limit_mb: int,
+                     cpu: Optional[int]) -> bytes:
+        """Run one supervisor command, executed directly rather than through a shell, in a fresh sandbox
+        of its own, optionally restricted to one CPU (per-test mode); return its stdout"""
+        raise NotImplementedError
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.executor.test_data import INTERNAL_TOKEN_HEADER
+from app.metrics import CHECKER_CACHE_REQUESTS_TOTAL
+
+
+class CheckerError(Exception):
+    """A problem's custom checker could not be compiled"""
+
+
+class CheckerCache:
+    """Compiled custom checkers of problems, fetched from contest-service once per checker version
+
+    Checkers are compiled by Executor.compile_checker into the artifact store,
+    once per version on each node, and every submission to the problem runs
+    that artifact. The cache maps <problem_id>-<version> to the artifact and
+    keeps the source, so a checker evicted from the artifact store is rebuilt
+    without fetching it again. At most max_entries versions are remembered,
+    least recently used first to go. A checker that does not compile is
+    remembered too, rather than compiled again for every submission.
+    """
+
+    def __init__(self, executor, contest_service_url: str, max_entries: int, fetch_timeout: int = 60, internal_token: str = ""):
+        self.executor = executor
+        self.contest_service_url = contest_service_url
+        self.max_entries = max_entries
+        self.fetch_timeout = fetch_timeout
+        self.internal_token = internal_token
+        self._lock = threading.Lock()
+        # key -> (source, artifact or None, compile error or None), least recently used first
+        self._entries: "OrderedDict[str, Tuple[str, Optional[str], Optional[str]]]" = OrderedDict()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def artifact(self, problem_id: str, version: int) -> str:
+        """Artifact of a problem's compiled checker, fetching and compiling it on a miss
+
+        Raises CheckerError if the checker does not compile.
+        """
+        key = self._key(problem_id, version)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Concurrent submissions to a new checker version wait for a single compile
+        with build_lock:
+            with self._lock:
+                cached = self._lookup(problem_id, version)
+                entry = self._entries[cached] if cached else None
+                if cached:
+                    self._entries.move_to_end(cached)
+            if entry and (entry[1] is None or self.executor.artifacts.lookup(entry[1])):
+                CHECKER_CACHE_REQUESTS_TOTAL.labels(result="hit").inc()
+                key, (source, artifact, error) = cached, entry
+            else:
+                CHECKER_CACHE_REQUESTS_TOTAL.labels(result="miss").inc()
+                if entry:
+                    key, source = cached, entry[0]
+                else:
+                    key, source = self._fetch(problem_id, version)
+                artifact, error = self._compile(source)
+                with self._lock:
+                    self._entries[key] = (source, artifact, error)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        if artifact is None:
+            raise CheckerError(f"Checker of problem {problem_id} does not compile: {error}")
+        return artifact
+
+    def _lookup(self, problem_id: str, version: int) -> Optional[str]:
+        """Key of the cached version, or else of the newest cached later version (lock held)"""
+        key = self._key(problem_id, version)
+        if key in self._entries:
+            return key
+        prefix = f"{problem_id}-"
+        newer = [
+            (int(cached[len(prefix):]), cached) for cached in self._entries
+            if cached.startswith(prefix) and int(cached[len(prefix):]) > version
+        ]
+        return max(newer)[1] if newer else None
+
+    def _fetch(self, problem_id: str, version: int) -> Tuple[str, str]:
+        """Key and source of the problem's current checker"""
+        response = httpx.get(
+            f"{self.contest_service_url}/api/v1/problems/{problem_id}/checker",
+            headers={INTERNAL_TOKEN_HEADER: self.internal_token},
+            timeout=self.fetch_timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data["version"] != version:
+            # Checker changed since the submission was queued, judge with the current one
+            print(f"Warning: Problem {problem_id} checker is version {data['version']}, expected {version}")
+        return self._key(problem_id, data["version"]), data["source"]
+
+    def _compile(self, source: str) -> Tuple[Optional[str], Optional[str]]:
+        compiled = self.executor.compile_checker(source)
+        if compiled["status"] == "compiled":
+            return compiled["artifact"], None
+        if compiled["status"] == "compilation_error":
+            return None, compiled["error_message"]
+        # The judge failed, not the checker; nothing is remembered
+        raise RuntimeError(compiled["error_message"])
+
+    @staticmethod
+    def _key(problem_id: str, version: int) -> str:
+        return f"{problem_id}-{version}"
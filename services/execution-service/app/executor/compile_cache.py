@@ -0,0 +1,111 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import List
+
+from app.metrics import COMPILE_CACHE_REQUESTS_TOTAL, COMPILE_CACHE_EVICTIONS_TOTAL, COMPILE_CACHE_BYTES
+
+
+class CompileCache:
+    """Content-addressed on-disk store of compiled binaries with a size cap and LRU eviction
+
+    The compile stage puts binaries here and the run stage gets them by key;
+    binaries outlive their submission, so identical source is compiled once.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def key(source: str, image_digest: str, flags: List[str]) -> str:
+        """Cache key for a source file compiled with the given compiler image and flags"""
+        digest = hashlib.sha256()
+        for part in (image_digest, "\0".join(flags), source):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> bool:
+        """Whether a binary is stored for key, counted as a cache hit or miss"""
+        with self._lock:
+            found = key in self._entries and os.path.exists(self._path(key))
+            if found:
+                self._entries.move_to_end(key)
+            else:
+                # Entry vanished from disk underneath us
+                self._forget(key)
+        COMPILE_CACHE_REQUESTS_TOTAL.labels(result="hit" if found else "miss").inc()
+        return found
+
+    def get(self, key: str, destination: str) -> bool:
+        """Copy the stored binary for key to destination, return False if there is none"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+        try:
+            shutil.copy2(self._path(key), destination)
+            # Keep modification time as the recency order across restarts
+            os.utime(self._path(key))
+        except OSError:
+            # Entry vanished from disk underneath us
+            with self._lock:
+                self._forget(key)
+            return False
+        return True
+
+    def put(self, key: str, binary_path: str):
+        """Store a freshly compiled binary and evict least recently used entries over the cap"""
+        size = os.path.getsize(binary_path)
+        if size > self.max_bytes:
+            return
+        # Write under a temporary name so readers never see a partial binary
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        shutil.copy2(binary_path, tmp_path)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                try:
+                    os.remove(self._path(oldest))
+                except OSError:
+                    pass
+                COMPILE_CACHE_EVICTIONS_TOTAL.inc()
+            COMPILE_CACHE_BYTES.set(self._total_bytes)
+
+    def _load(self):
+        """Rebuild the index from disk, oldest modification time first"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        COMPILE_CACHE_BYTES.set(self._total_bytes)
+
+    def _forget(self, key: str):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
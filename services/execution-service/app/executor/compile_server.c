@@ -0,0 +1,430 @@
+/*
+ * Long-lived compile server for the execution service.
+ *
+ * Listens on a Unix socket and compiles one source file per connection with
+ *
+ *   <compiler> [args...] -o main main.cpp
+ *
+ * so the compiler's sandbox, page cache and precompiled headers stay warm
+ * between submissions instead of being set up for every compile. Each job is
+ * compiled in a fresh directory under jobs_dir, as uid with -u,
+ * in its own process group with the time and memory limits of the request.
+ * At most max_jobs compiles run at once; further connections wait in the
+ * listen backlog.
+ *
+ * Request:   "<timeout_seconds> <memory_limit_mb> <source_bytes>\n" and the source
+ * Response:  "<status> <exit_code> <time_ms> <log_bytes> <binary_bytes>\n",
+ *            the compiler's output (at most log_limit bytes), then the binary
+ *
+ * status is OK, CE (compilation error), TLE or ERR (the server could not run
+ * the job, e.g. the compiler could not switch to uid; it is never run as the
+ * server's user then). The binary is only sent with OK.
+ *
+ * usage: compile_server [-j max_jobs] [-u uid] [-d jobs_dir] [-l log_limit_bytes]
+ *                       <socket> <compiler> [args...]
+ */
+#define _GNU_SOURCE
+#include <dirent.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <grp.h>
+#include <limits.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/time.h>
+#include <sys/un.h>
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+
+#define MAX_SOURCE_BYTES (16L * 1024 * 1024)
+#define MAX_BINARY_BYTES (256L * 1024 * 1024)
+/* How long a client may take to send its request or read the response */
+#define IO_TIMEOUT_SECONDS 30
+/* Exit status of a job that could not switch to uid; compilers do not use it */
+#define DROP_FAILED_EXIT 126
+
+static long run_uid = -1;
+static const char *jobs_dir = "/tmp";
+static long log_limit = 64 * 1024;
+static char **compiler_argv;
+static int compiler_argc;
+
+static long elapsed_ms(const struct timespec *start)
+{
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (now.tv_sec - start->tv_sec) * 1000 + (now.tv_nsec - start->tv_nsec) / 1000000;
+}
+
+static void set_limit(int resource, rlim_t value)
+{
+    struct rlimit rl;
+    rl.rlim_cur = value;
+    rl.rlim_max = value;
+    setrlimit(resource, &rl);
+}
+
+static int write_all(int fd, const char *buf, size_t len)
+{
+    while (len > 0) {
+        ssize_t n = write(fd, buf, len);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        buf += n;
+        len -= (size_t)n;
+    }
+    return 0;
+}
+
+/* Read the request line, without the newline */
+static int read_line(int fd, char *buf, size_t size)
+{
+    size_t len = 0;
+
+    while (len + 1 < size) {
+        ssize_t n = read(fd, buf + len, 1);
+        if (n < 0 && errno == EINTR)
+            continue;
+        if (n <= 0)
+            return -1;
+        if (buf[len] == '\n') {
+            buf[len] = '\0';
+            return 0;
+        }
+        len++;
+    }
+    return -1;
+}
+
+/* Copy exactly len bytes from the socket into path */
+static int receive_file(int fd, const char *path, long len)
+{
+    char buf[65536];
+    int out = open(path, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+
+    if (out < 0)
+        return -1;
+    while (len > 0) {
+        ssize_t n = read(fd, buf, len < (long)sizeof(buf) ? (size_t)len : sizeof(buf));
+        if (n < 0 && errno == EINTR)
+            continue;
+        if (n <= 0 || write_all(out, buf, (size_t)n) < 0) {
+            close(out);
+            return -1;
+        }
+        len -= n;
+    }
+    close(out);
+    return 0;
+}
+
+/* Send the first len bytes of path, padding with newlines if the file is shorter */
+static int send_file(int fd, const char *path, long len)
+{
+    char buf[65536];
+    int in = len > 0 ? open(path, O_RDONLY) : -1;
+
+    while (len > 0) {
+        ssize_t n = in < 0 ? -1 : read(in, buf, len < (long)sizeof(buf) ? (size_t)len : sizeof(buf));
+        if (n <= 0) {
+            n = len < (long)sizeof(buf) ? len : (long)sizeof(buf);
+            memset(buf, '\n', (size_t)n);
+        }
+        if (write_all(fd, buf, (size_t)n) < 0) {
+            if (in >= 0)
+                close(in);
+            return -1;
+        }
+        len -= n;
+    }
+    if (in >= 0)
+        close(in);
+    return 0;
+}
+
+static long file_size(const char *path)
+{
+    struct stat st;
+    return stat(path, &st) < 0 ? -1 : (long)st.st_size;
+}
+
+/* Job directories are flat, compiler temporaries included (TMPDIR points there) */
+static void remove_dir(const char *dir)
+{
+    char path[PATH_MAX];
+    struct dirent *entry;
+    DIR *d = opendir(dir);
+
+    if (d) {
+        while ((entry = readdir(d))) {
+            if (strcmp(entry->d_name, ".") == 0 || strcmp(entry->d_name, "..") == 0)
+                continue;
+            snprintf(path, sizeof(path), "%s/%s", dir, entry->d_name);
+            unlink(path);
+        }
+        closedir(d);
+    }
+    rmdir(dir);
+}
+
+static void respond(int fd, const char *status, int exit_code, long time_ms, const char *dir)
+{
+    char header[128];
+    char log_path[PATH_MAX];
+    char binary_path[PATH_MAX];
+    long log_bytes = 0;
+    long binary_bytes = 0;
+    int len;
+
+    if (dir) {
+        snprintf(log_path, sizeof(log_path), "%s/compile.log", dir);
+        snprintf(binary_path, sizeof(binary_path), "%s/main", dir);
+        log_bytes = file_size(log_path);
+        if (log_bytes < 0)
+            log_bytes = 0;
+        if (log_bytes > log_limit)
+            log_bytes = log_limit;
+        if (strcmp(status, "OK") == 0) {
+            binary_bytes = file_size(binary_path);
+            if (binary_bytes <= 0) {
+                status = "ERR";
+                binary_bytes = 0;
+            }
+        }
+    }
+
+    len = snprintf(header, sizeof(header), "%s %d %ld %ld %ld\n", status, exit_code, time_ms, log_bytes, binary_bytes);
+    if (write_all(fd, header, (size_t)len) < 0)
+        return;
+    if (log_bytes && send_file(fd, log_path, log_bytes) < 0)
+        return;
+    if (binary_bytes)
+        send_file(fd, binary_path, binary_bytes);
+}
+
+/* Switch to run_uid for uid and gid with no supplementary groups, fail unless all of it applied */
+static int drop_privileges(long run_uid)
+{
+    if (setgroups(0, NULL) < 0 || setgid((gid_t)run_uid) < 0 || setuid((uid_t)run_uid) < 0)
+        return -1;
+    return getuid() == (uid_t)run_uid && geteuid() == (uid_t)run_uid
+        && getgid() == (gid_t)run_uid && getegid() == (gid_t)run_uid ? 0 : -1;
+}
+
+static void run_compiler(const char *dir, long memory_limit_mb)
+{
+    char **argv = calloc((size_t)compiler_argc + 5, sizeof(char *));
+    int fd;
+    int i;
+
+    /* Own process group, so cc1plus, as and ld are killed with the driver */
+    setpgid(0, 0);
+    signal(SIGPIPE, SIG_DFL);
+    if (!argv || chdir(dir) < 0)
+        _exit(127);
+
+    fd = open("/dev/null", O_RDONLY);
+    if (fd < 0 || dup2(fd, STDIN_FILENO) < 0)
+        _exit(127);
+    close(fd);
+    fd = open("compile.log", O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0 || dup2(fd, STDOUT_FILENO) < 0 || dup2(fd, STDERR_FILENO) < 0)
+        _exit(127);
+    close(fd);
+
+    /* Source code must not be able to #include files only the server may read */
+    if (run_uid >= 0 && drop_privileges(run_uid) < 0)
+        _exit(DROP_FAILED_EXIT);
+
+    set_limit(RLIMIT_AS, (rlim_t)memory_limit_mb * 1024 * 1024);
+    set_limit(RLIMIT_FSIZE, (rlim_t)MAX_BINARY_BYTES);
+    set_limit(RLIMIT_CORE, 0);
+    setenv("TMPDIR", dir, 1);
+
+    for (i = 0; i < compiler_argc; i++)
+        argv[i] = compiler_argv[i];
+    argv[i++] = "-o";
+    argv[i++] = "main";
+    argv[i++] = "main.cpp";
+    argv[i] = NULL;
+    execvp(argv[0], argv);
+    _exit(127);
+}
+
+static void handle(int fd)
+{
+    struct timeval io_timeout = { IO_TIMEOUT_SECONDS, 0 };
+    struct timespec start;
+    char line[128];
+    char dir[PATH_MAX];
+    char source_path[PATH_MAX];
+    const char *status;
+    long timeout_seconds;
+    long memory_limit_mb;
+    long source_bytes;
+    int exit_code = 0;
+    int wait_status;
+    pid_t pid;
+
+    setsockopt(fd, SOL_SOCKET, SO_RCVTIMEO, &io_timeout, sizeof(io_timeout));
+    setsockopt(fd, SOL_SOCKET, SO_SNDTIMEO, &io_timeout, sizeof(io_timeout));
+
+    if (read_line(fd, line, sizeof(line)) < 0)
+        return;
+    if (sscanf(line, "%ld %ld %ld", &timeout_seconds, &memory_limit_mb, &source_bytes) != 3
+        || timeout_seconds <= 0 || memory_limit_mb <= 0
+        || source_bytes < 0 || source_bytes > MAX_SOURCE_BYTES) {
+        respond(fd, "ERR", 0, 0, NULL);
+        return;
+    }
+
+    snprintf(dir, sizeof(dir), "%s/job.XXXXXX", jobs_dir);
+    if (!mkdtemp(dir)) {
+        respond(fd, "ERR", 0, 0, NULL);
+        return;
+    }
+    snprintf(source_path, sizeof(source_path), "%s/main.cpp", dir);
+    if (receive_file(fd, source_path, source_bytes) < 0) {
+        remove_dir(dir);
+        return;
+    }
+    /* The compiler writes the binary and its temporaries here after dropping privileges */
+    if (run_uid >= 0 && chown(dir, (uid_t)run_uid, (gid_t)run_uid) < 0) {
+        perror("chown");
+        respond(fd, "ERR", 0, 0, NULL);
+        remove_dir(dir);
+        return;
+    }
+
+    clock_gettime(CLOCK_MONOTONIC, &start);
+    pid = fork();
+    if (pid < 0) {
+        respond(fd, "ERR", 0, 0, NULL);
+        remove_dir(dir);
+        return;
+    }
+    if (pid == 0)
+        run_compiler(dir, memory_limit_mb);
+
+    status = NULL;
+    for (;;) {
+        pid_t done = waitpid(pid, &wait_status, WNOHANG);
+        if (done == pid)
+            break;
+        if (done < 0 && errno != EINTR) {
+            status = "ERR";
+            break;
+        }
+        if (elapsed_ms(&start) > timeout_seconds * 1000) {
+            kill(-pid, SIGKILL);
+            waitpid(pid, &wait_status, 0);
+            status = "TLE";
+            break;
+        }
+        usleep(2000);
+    }
+    /* Compiler subprocesses left behind by a killed driver */
+    kill(-pid, SIGKILL);
+
+    if (!status) {
+        if (WIFEXITED(wait_status)) {
+            exit_code = WEXITSTATUS(wait_status);
+            status = exit_code == 0 ? "OK" : exit_code == DROP_FAILED_EXIT ? "ERR" : "CE";
+        } else {
+            exit_code = 128 + WTERMSIG(wait_status);
+            status = WTERMSIG(wait_status) == SIGXCPU ? "TLE" : "CE";
+        }
+    }
+    respond(fd, status, exit_code, elapsed_ms(&start), dir);
+    remove_dir(dir);
+}
+
+int main(int argc, char **argv)
+{
+    struct sockaddr_un addr;
+    const char *socket_path;
+    int max_jobs = 4;
+    int active = 0;
+    int listen_fd;
+    int opt;
+
+    /* '+' stops at the socket path, so compiler flags are not taken as options */
+    while ((opt = getopt(argc, argv, "+j:u:d:l:")) != -1) {
+        switch (opt) {
+        case 'j': max_jobs = atoi(optarg); break;
+        case 'u': run_uid = atol(optarg); break;
+        case 'd': jobs_dir = optarg; break;
+        case 'l': log_limit = atol(optarg); break;
+        default: optind = argc; break;
+        }
+    }
+    if (argc - optind < 2 || max_jobs < 1) {
+        fprintf(stderr, "usage: %s [-j max_jobs] [-u uid] [-d jobs_dir] [-l log_limit_bytes] "
+                        "<socket> <compiler> [args...]\n", argv[0]);
+        return 2;
+    }
+    socket_path = argv[optind];
+    compiler_argv = argv + optind + 1;
+    compiler_argc = argc - optind - 1;
+    if (strlen(socket_path) >= sizeof(addr.sun_path)) {
+        fprintf(stderr, "socket path too long: %s\n", socket_path);
+        return 2;
+    }
+
+    /* A client hanging up early must not take the server down */
+    signal(SIGPIPE, SIG_IGN);
+
+    memset(&addr, 0, sizeof(addr));
+    addr.sun_family = AF_UNIX;
+    strcpy(addr.sun_path, socket_path);
+    listen_fd = socket(AF_UNIX, SOCK_STREAM | SOCK_CLOEXEC, 0);
+    if (listen_fd < 0) {
+        perror("socket");
+        return 1;
+    }
+    unlink(socket_path);
+    if (bind(listen_fd, (struct sockaddr *)&addr, sizeof(addr)) < 0 || chmod(socket_path, 0600) < 0
+        || listen(listen_fd, 128) < 0) {
+        perror(socket_path);
+        return 1;
+    }
+
+    for (;;) {
+        int fd;
+        pid_t pid;
+
+        while (active > 0 && waitpid(-1, NULL, WNOHANG) > 0)
+            active--;
+        if (active >= max_jobs) {
+            if (waitpid(-1, NULL, 0) > 0)
+                active--;
+            continue;
+        }
+
+        fd = accept(listen_fd, NULL, NULL);
+        if (fd < 0) {
+            if (errno != EINTR)
+                perror("accept");
+            continue;
+        }
+        pid = fork();
+        if (pid == 0) {
+            handle(fd);
+            _exit(0);
+        }
+        if (pid > 0)
+            active++;
+        else
+            perror("fork");
+        close(fd);
+    }
+}
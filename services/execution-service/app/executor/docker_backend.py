@@ -0,0 +1,262 @@
+import docker
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.executor.backend import SandboxBackend, Workspace
+from app.executor.compiler import COMPILE_SERVER_SOURCE, pch_script, wait_for_socket
+from app.executor.languages import LANGUAGES, Language
+from app.executor.pool import SandboxPool, SUPERVISOR_SOURCE, STAGE_MOUNT, TOOLS_MOUNT, read_streams, sandbox_volumes
+
+COMPILE_SERVER_LABEL = "codeforces.compile-server"
+# Where <SANDBOX_TOOLS_DIR>/compiler, holding the compile server's source and socket, is mounted
+COMPILER_MOUNT = "/compiler"
+
+
+class DockerBackend(SandboxBackend):
+    """Runs submissions in containers of their language's image, from a warm pool per language when enabled"""
+
+    name = "docker"
+    supports_per_test = True
+
+    def __init__(self):
+        self.pools: Dict[str, SandboxPool] = {}
+        self._image_digests: Dict[str, str] = {}
+        self._tools_lock = threading.Lock()
+        self._tools_ready = False
+        self._compile_server = None
+        try:
+            # Try to connect to Docker socket
+            self.client = docker.from_env()
+            # Test connection
+            self.client.ping()
+        except Exception as e:
+            print(f"Warning: Could not connect to Docker: {e}")
+            self.client = None
+
+        if self.client and settings.EXECUTION_MODE == "session" and settings.SANDBOX_POOL_SIZE > 0:
+            self.pools = {
+                name: SandboxPool(self.client, settings.SANDBOX_POOL_SIZE, LANGUAGES[name])
+                for name in settings.ENABLED_LANGUAGES
+            }
+
+    def is_available(self) -> bool:
+        return self.client is not None
+
+    @property
+    def unavailable_message(self) -> str:
+        return "Docker not available"
+
+    def start(self):
+        """Build the supervisor and start warming the sandbox pools"""
+        if self.client is None:
+            return
+        try:
+            self._ensure_supervisor()
+        except Exception as e:
+            print(f"Warning: Could not build the supervisor, sandboxes are not pre-warmed: {e}")
+            return
+        for pool in self.pools.values():
+            pool.start()
+
+    def shutdown(self):
+        """Remove pooled sandboxes"""
+        for pool in self.pools.values():
+            pool.shutdown()
+
+    @contextmanager
+    def workspace(self, language: Language) -> Iterator[Workspace]:
+        pool = self.pools.get(language.name)
+        if pool:
+            sandbox = pool.acquire()
+            try:
+                yield Workspace(sandbox.work_dir, "/code", language, sandbox)
+            finally:
+                pool.release(sandbox)
+            return
+
+        # Create temporary directory for code
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield Workspace(temp_dir, "/code", language)
+
+    def compiler_digest(self, language: Language) -> str:
+        """Image ID of the language's image, so cached artifacts are invalidated when it changes"""
+        if language.image not in self._image_digests:
+            try:
+                self._image_digests[language.image] = self.client.images.get(language.image).id
+            except Exception:
+                # Unknown digest, fall back to the tag without memoizing it
+                return language.image
+        return self._image_digests[language.image]
+
+    def supervisor_path(self, workspace: Workspace) -> str:
+        return f"{TOOLS_MOUNT}/supervisor"
+
+    def staged_tests_path(self, workspace: Workspace, staged_dir: str) -> str:
+        return f"{STAGE_MOUNT}/{os.path.basename(staged_dir)}"
+
+    def start_compile_server(self, compiler: List[str], jobs: int) -> str:
+        """Run the compile server in a long-lived, network-disabled container of the sandbox image
+
+        The precompiled header is built inside that container, so it always
+        matches the compiler that uses it.
+        """
+        if self.client is None:
+            raise RuntimeError("Docker not available")
+        self.stop_compile_server()
+        for container in self.client.containers.list(all=True, filters={"label": COMPILE_SERVER_LABEL}):
+            try:
+                container.remove(force=True)
+            except Exception:
+                pass
+
+        host_dir = os.path.join(settings.SANDBOX_TOOLS_DIR, "compiler")
+        os.makedirs(host_dir, exist_ok=True)
+        shutil.copy(COMPILE_SERVER_SOURCE, os.path.join(host_dir, "compile_server.c"))
+        socket_path = os.path.join(host_dir, "compile.sock")
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        script = (
+            f"gcc -O2 -o /opt/compile_server {COMPILER_MOUNT}/compile_server.c"
+            f" && {pch_script('/opt/pch', compiler)}"
+            f" && mkdir -m 711 /opt/jobs"
+            f" && exec /opt/compile_server -j {jobs} -u {settings.SANDBOX_RUN_UID} -d /opt/jobs"
+            f" {COMPILER_MOUNT}/compile.sock {shlex.join(compiler + ['-I', '/opt/pch'])}"
+        )
+        container = self.client.containers.run(
+            image=settings.SANDBOX_IMAGE,
+            command=["sh", "-c", script],
+            volumes={host_dir: {"bind": COMPILER_MOUNT, "mode": "rw"}},
+            mem_limit=f"{settings.MAX_MEMORY_MB * jobs + settings.SESSION_MEMORY_OVERHEAD_MB}m",
+            network_disabled=True,
+            labels={COMPILE_SERVER_LABEL: "1"},
+            detach=True
+        )
+        self._compile_server = container
+
+        def alive() -> bool:
+            container.reload()
+            return container.status in ("created", "running")
+
+        try:
+            wait_for_socket(socket_path, alive)
+        except Exception:
+            logs = container.logs(stdout=False, stderr=True).decode(errors="replace")
+            self.stop_compile_server()
+            raise RuntimeError(logs[-1000:] or "compile server did not start")
+        return socket_path
+
+    def stop_compile_server(self):
+        container, self._compile_server = self._compile_server, None
+        if container is not None:
+            try:
+                container.remove(force=True)
+            except Exception:
+                pass
+
+    def compile(self, workspace: Workspace, command: List[str], timeout: int) -> Dict:
+        if workspace.handle:
+            try:
+                exit_code, _, stderr = workspace.handle.exec(["timeout", str(timeout)] + command)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            if exit_code != 0:
+                return {"success": False, "error": stderr.decode(errors="replace")}
+            return {"success": True}
+
+        try:
+            self.client.containers.run(
+                image=workspace.language.image,
+                command=command,
+                volumes={workspace.work_dir: {"bind": "/code", "mode": "rw"}},
+                remove=True,
+                mem_limit=f"{int(settings.MAX_MEMORY_MB * workspace.language.memory_multiplier)}m",
+                network_disabled=True,
+                timeout=timeout
+            )
+            return {"success": True}
+        except docker.errors.ContainerError as e:
+            return {"success": False, "error": e.stderr.decode() if e.stderr else str(e)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def run(self, workspace: Workspace, script: str, timeout: int, memory_limit_mb: int) -> bytes:
+        if workspace.handle:
+            # Past the timeout the sandbox is killed and retired; the tests it had not reported count as timed out
+            _, stdout, _ = workspace.handle.exec(["sh", "-c", script], timeout=timeout)
+            return stdout
+        return self._run_container(workspace, ["sh", "-c", script], timeout, memory_limit_mb)
+
+    def run_isolated(self, workspace: Workspace, command: List[str], timeout: int, memory_limit_mb: int, cpu: Optional[int]) -> bytes:
+        return self._run_container(workspace, command, timeout, memory_limit_mb, cpu)
+
+    def _run_container(self, workspace: Workspace, command: List[str], timeout: int, memory_limit: int, cpu: Optional[int] = None) -> bytes:
+        """Run a command in a one-off container of the workspace's language, return its stdout
+
+        Output is read from the container's attached stdout and stderr streams
+        rather than from the logging driver, so the streams stay separate and
+        nothing depends on the driver keeping every line; see read_streams for
+        the bounds. The container is killed once timeout seconds have passed.
+        """
+        self._ensure_supervisor()
+
+        container = None
+        try:
+            container = self.client.containers.create(
+                image=workspace.language.image,
+                command=command,
+                volumes=sandbox_volumes(workspace.work_dir),
+                mem_limit=f"{memory_limit + settings.SESSION_MEMORY_OVERHEAD_MB}m",
+                cpuset_cpus=str(cpu) if cpu is not None else None,
+                network_disabled=True
+            )
+            # Attached before starting, so no output is written before anyone reads it
+            streams = container.attach(stdout=True, stderr=True, stream=True, demux=True)
+            container.start()
+            deadline = threading.Timer(timeout, self._kill, [container])
+            deadline.start()
+            try:
+                stdout, _ = read_streams(streams)
+            finally:
+                deadline.cancel()
+            return stdout
+        finally:
+            if container is not None:
+                try:
+                    container.remove(force=True)
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _kill(container):
+        try:
+            container.kill()
+        except Exception:
+            # Exited in the meantime
+            pass
+
+    def _ensure_supervisor(self):
+        """Build the supervisor into the tools directory once, using the C++ image's compiler
+
+        It is linked statically, so it runs in the images of every language, with or without a C library of their own.
+        """
+        with self._tools_lock:
+            binary = os.path.join(settings.SANDBOX_TOOLS_DIR, "supervisor")
+            if self._tools_ready and os.path.exists(binary):
+                return
+            os.makedirs(settings.SANDBOX_TOOLS_DIR, exist_ok=True)
+            shutil.copy(SUPERVISOR_SOURCE, os.path.join(settings.SANDBOX_TOOLS_DIR, "supervisor.c"))
+            self.client.containers.run(
+                image=settings.SANDBOX_IMAGE,
+                command=["gcc", "-O2", "-static", "-o", f"{TOOLS_MOUNT}/supervisor", f"{TOOLS_MOUNT}/supervisor.c"],
+                volumes={settings.SANDBOX_TOOLS_DIR: {"bind": TOOLS_MOUNT, "mode": "rw"}},
+                remove=True,
+                network_disabled=True
+            )
+            self._tools_ready = True
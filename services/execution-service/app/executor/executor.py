@@ -0,0 +1,557 @@
+import os
+import queue
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+from app.executor.backend import SandboxBackend, Workspace
+from app.executor.compile_cache import CompileCache
+from app.executor.compiler import CompileServerClient
+from app.executor.languages import CHECKER, CPP_FLAGS, LANGUAGES, Language, get_language
+from app.executor.scheduler import CoreScheduler, default_cpus
+from app.executor.test_data import TestSet, TestStage, write_test_set
+from app.executor.test_order import FailureStats
+from app.metrics import CHECKER_FAILURES_TOTAL, COMPILE_SECONDS, RUNTIME_STARTUP_SECONDS
+
+COMPILE_TIMEOUT_SECONDS = 30
+# Tests of the empty program that measure a runtime's startup; the fastest run counts
+STARTUP_SAMPLES = 3
+
+# Result of a test that was not run because an earlier test already failed (fail-fast)
+SKIPPED_RESULT = {"status": "skipped", "execution_time_ms": 0, "error_message": "Skipped after an earlier failure"}
+
+def create_backend(name: str) -> SandboxBackend:
+    """Instantiate the sandbox backend selected by EXECUTOR_BACKEND"""
+    if name == "native":
+        from app.executor.native_backend import NativeBackend
+        return NativeBackend()
+    if name == "docker":
+        from app.executor.docker_backend import DockerBackend
+        return DockerBackend()
+    raise ValueError(f"Unknown executor backend: {name}")
+
+class Executor:
+    """Judges submissions in two stages that can run on separate worker pools
+    
+    compile() builds the artifact (a binary, bytecode or a jar, see languages.py)
+    into the artifact store under the content hash of its source, toolchain and
+    compile command; run() fetches it from there by that hash and runs it
+    against a test set.
+    """
+    
+    def __init__(self, backend: Optional[SandboxBackend] = None):
+        self.backend = backend or create_backend(settings.EXECUTOR_BACKEND)
+        self.compile_server: Optional[CompileServerClient] = None
+        self.scheduler = CoreScheduler(default_cpus(settings.JUDGE_CPUS))
+        self.failure_stats = FailureStats(settings.FAILURE_STATS_MAX_TESTS)
+        self.test_stage: Optional[TestStage] = None
+        # language -> CPU time its runtime takes to start, not charged to solutions
+        self.startup_ms: Dict[str, int] = {}
+        
+        if settings.TEST_DATA_STAGE_ENABLED:
+            try:
+                self.test_stage = TestStage(
+                    settings.TEST_DATA_STAGE_DIR, settings.TEST_DATA_STAGE_MAX_BYTES, settings.TEST_DATA_STAGE_IDLE_SECONDS
+                )
+            except OSError as e:
+                print(f"Warning: Test data is copied into every workspace, staging is not available: {e}")
+        
+        try:
+            self.artifacts = CompileCache(settings.COMPILE_CACHE_DIR, settings.COMPILE_CACHE_MAX_BYTES)
+        except OSError as e:
+            print(f"Warning: Artifact store falls back to a temporary directory: {e}")
+            self.artifacts = CompileCache(tempfile.mkdtemp(prefix="codeforces-artifacts-"), settings.COMPILE_CACHE_MAX_BYTES)
+        
+        if settings.COMPILE_SERVER_ENABLED:
+            self.compile_server = CompileServerClient(
+                lambda: self.backend.start_compile_server(["g++"] + CPP_FLAGS, settings.COMPILE_SERVER_JOBS),
+                self.backend.stop_compile_server
+            )
+    
+    def start(self):
+        """Start warming sandboxes and the compile server, and measure runtime startup"""
+        self.backend.start()
+        if self.test_stage:
+            self.test_stage.start()
+        if self.compile_server and self.backend.is_available():
+            self.compile_server.start()
+        if self.backend.is_available():
+            self.measure_startup()
+    
+    def measure_startup(self):
+        """Measure the CPU time the runtimes of compensate_startup languages take to run an empty program
+        
+        Measured once per node, on its own hardware and sandboxes, and taken off
+        the CPU time of every test in that language. Until a language is
+        measured, or if measuring fails, nothing is taken off.
+        """
+        for name in settings.ENABLED_LANGUAGES:
+            language = LANGUAGES[name]
+            if not language.compensate_startup or not self.backend.language_available(language):
+                continue
+            try:
+                compiled = self.compile(language.startup_program, name)
+                if compiled["status"] != "compiled":
+                    raise RuntimeError(compiled["error_message"])
+                with tempfile.TemporaryDirectory() as directory:
+                    test_set = write_test_set(directory, [{"input_data": "", "expected_output": ""}] * STARTUP_SAMPLES)
+                    result = self.run(compiled["artifact"], test_set, memory_limit_mb=settings.MAX_MEMORY_MB,
+                                      checker_mode="none", language=name)
+                times = [test["execution_time_ms"] for test in result["results"] if test.get("status") == "passed"]
+                if not times:
+                    raise RuntimeError(result.get("error_message") or "the empty program did not run")
+                self.startup_ms[name] = min(times)
+                RUNTIME_STARTUP_SECONDS.labels(language=name).set(self.startup_ms[name] / 1000)
+                print(f"{name} runtime starts in {self.startup_ms[name]} ms of CPU time")
+            except Exception as e:
+                print(f"Warning: Could not measure {name} startup, it is charged to solutions: {e}")
+    
+    def shutdown(self):
+        """Release sandboxes and the compile server"""
+        if self.compile_server:
+            self.compile_server.shutdown()
+        self.backend.shutdown()
+    
+    def compile(self, code: str, language: str = "cpp") -> Dict:
+        """Compile stage: build code in one of the registered languages into the artifact store
+        
+        Returns {"status": "compiled", "artifact": <content hash>}, or a status of
+        "compilation_error" or "error" (the judge failed) with an error_message.
+        A language this node does not judge is a compilation error.
+        """
+        try:
+            spec = get_language(language)
+        except ValueError as e:
+            return {"status": "compilation_error", "error_message": str(e)}
+        return self._build(code, spec)
+    
+    def compile_checker(self, source: str) -> Dict:
+        """Build a problem's custom checker into the artifact store, see compile() for the result"""
+        return self._build(source, CHECKER)
+    
+    def _build(self, code: str, spec: Language) -> Dict:
+        if not self.backend.is_available():
+            return {"status": "error", "error_message": self.backend.unavailable_message}
+        if not self.backend.language_available(spec):
+            return {"status": "error", "error_message": f"{spec.name} is not available in the {self.backend.name} sandbox"}
+        
+        compile_start = time.monotonic()
+        artifact = CompileCache.key(code, self.backend.compiler_digest(spec), spec.compile_command)
+        # Reuse the artifact of identical source
+        if settings.COMPILE_CACHE_ENABLED and self.artifacts.lookup(artifact):
+            compile_result, compile_path = {"success": True}, "cache"
+        else:
+            try:
+                compile_result, compile_path = self._compile_code(code, artifact, spec)
+            except Exception as e:
+                return {"status": "error", "error_message": f"Sandbox not available: {e}"}
+        COMPILE_SECONDS.labels(
+            language=spec.name, path=compile_path, result="success" if compile_result["success"] else "error"
+        ).observe(time.monotonic() - compile_start)
+        
+        if not compile_result["success"]:
+            return {"status": "compilation_error", "error_message": compile_result["error"]}
+        return {"status": "compiled", "artifact": artifact}
+    
+    def run(self, artifact: str, test_set: TestSet, time_limit_seconds: int = 2, memory_limit_mb: int = 256, judging_policy: str = "ioi",
+            checker_mode: str = "exact", checker_tolerance: float = 1e-6, language: str = "cpp",
+            checker_artifact: Optional[str] = None) -> Dict:
+        """Run stage: run a compiled artifact from the artifact store against the test cases of a test set
+        
+        Limits are the problem's, multiplied by the language's time and memory
+        multipliers. Startup time of the language's runtime is not counted.
+        
+        With the "icpc" judging policy remaining tests are skipped after the first
+        test that does not pass, and tests that often fail are run first
+        (ADAPTIVE_TEST_ORDER); "ioi" runs every test for partial scoring. Results
+        are always reported in the test set's order.
+        
+        Output is checked while it is produced (see supervisor.c): checker_mode
+        "exact" compares it with surrounding whitespace stripped, "tokens" compares
+        whitespace-separated tokens and "float" additionally accepts numbers within
+        checker_tolerance (absolute or relative) of the expected value. "custom"
+        runs the problem's checker, checker_artifact from compile_checker(), on
+        the whole output of every test instead. If the checker fails, the run
+        is an error of the judge.
+        """
+        checker = (checker_mode, checker_tolerance)
+        fail_fast = judging_policy == "icpc"
+        if not self.backend.is_available():
+            return {
+                "status": "error",
+                "error_message": self.backend.unavailable_message,
+                "test_cases_passed": 0,
+                "total_test_cases": test_set.count,
+                "results": []
+            }
+        
+        try:
+            spec = get_language(language)
+            time_limit = time_limit_seconds * spec.time_multiplier
+            memory_limit = int(memory_limit_mb * spec.memory_multiplier)
+            sandbox_start = time.monotonic()
+            with self.backend.workspace(spec) as workspace, self._staged_tests(workspace, test_set) as input_dir:
+                if not self.artifacts.get(artifact, os.path.join(workspace.work_dir, spec.artifact_file)):
+                    # Evicted since it was compiled, the redelivered submission compiles it again
+                    raise RuntimeError(f"artifact {artifact} is no longer in the artifact store")
+                if checker_mode == "custom":
+                    self._install_checker(workspace, checker_artifact)
+                sandbox_start_seconds = time.monotonic() - sandbox_start
+                result = self._judge(workspace, test_set, input_dir, time_limit, memory_limit, fail_fast, checker)
+                result["sandbox_start_seconds"] = sandbox_start_seconds
+                return result
+        except Exception as e:
+            return {
+                "status": "error",
+                "error_message": f"Sandbox not available: {e}",
+                "test_cases_passed": 0,
+                "total_test_cases": test_set.count,
+                "results": []
+            }
+    
+    def _install_checker(self, workspace: Workspace, checker_artifact: Optional[str]):
+        """Place the compiled checker in the workspace, where only the supervisor's user can run it"""
+        if checker_artifact is None:
+            raise RuntimeError("custom checker mode without a compiled checker")
+        path = os.path.join(workspace.work_dir, CHECKER.artifact_file)
+        if not self.artifacts.get(checker_artifact, path):
+            raise RuntimeError(f"checker {checker_artifact} is no longer in the artifact store")
+        os.chmod(path, 0o700)
+    
+    @contextmanager
+    def _staged_tests(self, workspace: Workspace, test_set: TestSet) -> Iterator[Optional[str]]:
+        """Sandbox path of the shared, read-only copy of a cached test set, or None to copy the tests into the workspace"""
+        staged_dir = None
+        if self.test_stage and test_set.key is not None:
+            try:
+                staged_dir = self.test_stage.acquire(test_set)
+            except OSError as e:
+                # E.g. tmpfs full, the run still works from a copy of its own
+                print(f"Warning: Could not stage tests {test_set.key}: {e}")
+        if staged_dir is None:
+            yield None
+            return
+        try:
+            yield self.backend.staged_tests_path(workspace, staged_dir)
+        finally:
+            self.test_stage.release(test_set.key)
+    
+    def _judge(self, workspace: Workspace, test_set: TestSet, input_dir: Optional[str], time_limit_seconds: float, memory_limit_mb: int, fail_fast: bool, checker: Tuple[str, float]) -> Dict:
+        """Run the binary placed in the given workspace against every test, reading staged tests from input_dir if given"""
+        results = []
+        if fail_fast and settings.ADAPTIVE_TEST_ORDER:
+            order = self.failure_stats.order(test_set.test_case_ids)
+        else:
+            order = list(range(test_set.count))
+        
+        # Execute test cases in parallel on dedicated cores
+        cores = self.scheduler.acquire(min(test_set.count, settings.MAX_PARALLEL_TESTS))
+        try:
+            if settings.EXECUTION_MODE == "per_test" and self.backend.supports_per_test:
+                results = self._run_test_cases(workspace, test_set, input_dir, order, time_limit_seconds, memory_limit_mb, cores, fail_fast, checker)
+            else:
+                results = self._run_session(workspace, test_set, input_dir, order, time_limit_seconds, memory_limit_mb, cores, fail_fast, checker)
+        finally:
+            self.scheduler.release(cores)
+        checker_failures = sum(1 for r in results if r.pop("checker_failed", False))
+        if checker_failures:
+            CHECKER_FAILURES_TOTAL.inc(checker_failures)
+        judge_errors = [r for r in results if r.pop("judge_error", False)]
+        if judge_errors:
+            # Not the solution's fault; reported like any other judge failure
+            return {
+                "status": "error",
+                "error_message": judge_errors[0]["error_message"],
+                "test_cases_passed": 0,
+                "total_test_cases": test_set.count,
+                "results": []
+            }
+        self.failure_stats.record(test_set.test_case_ids, results)
+        total_passed = sum(1 for r in results if r["status"] == "passed")
+        
+        # Determine overall status
+        if total_passed == test_set.count:
+            overall_status = "accepted"
+        elif any(r["status"] == "timeout" for r in results):
+            overall_status = "time_limit_exceeded"
+        elif any(r["status"] == "error" for r in results):
+            overall_status = "runtime_error"
+        else:
+            overall_status = "wrong_answer"
+        
+        # Calculate average execution time
+        execution_times = [r["execution_time_ms"] for r in results if r.get("execution_time_ms")]
+        avg_execution_time = sum(execution_times) / len(execution_times) if execution_times else 0
+        
+        # Calculate max memory used
+        memory_used = max([r.get("memory_used_mb", 0) for r in results], default=0)
+        
+        return {
+            "status": overall_status,
+            "test_cases_passed": total_passed,
+            "total_test_cases": test_set.count,
+            "execution_time_ms": int(avg_execution_time),
+            "memory_used_mb": memory_used,
+            "results": results
+        }
+    
+    def _compile_code(self, code: str, artifact: str, language: Language) -> Tuple[Dict, str]:
+        """Compile code and store the artifact in the artifact store under artifact
+        
+        C++ goes to the warm compile server when it is up; everything else, and
+        C++ while the server is down, is compiled in a sandbox of its own.
+        Returns the result and which of the two compiled it ("server" or "sandbox").
+        """
+        with tempfile.TemporaryDirectory() as staging_dir:
+            binary_path = os.path.join(staging_dir, language.artifact_file)
+            result = None
+            compile_path = "server"
+            if self.compile_server and language.name == "cpp":
+                result = self.compile_server.compile(code, binary_path, COMPILE_TIMEOUT_SECONDS, settings.MAX_MEMORY_MB)
+            if result is None:
+                compile_path = "sandbox"
+                with self.backend.workspace(language) as workspace:
+                    with open(os.path.join(workspace.work_dir, language.source_file), "w") as f:
+                        f.write(code)
+                    command = language.compile_args(workspace.sandbox_dir)
+                    result = self.backend.compile(workspace, command, COMPILE_TIMEOUT_SECONDS)
+                    if result["success"]:
+                        shutil.copy2(os.path.join(workspace.work_dir, language.artifact_file), binary_path)
+            if result["success"]:
+                self.artifacts.put(artifact, binary_path)
+        return result, compile_path
+    
+    def _run_test_cases(self, workspace: Workspace, test_set: TestSet, input_dir: Optional[str], order: List[int], time_limit: int, memory_limit: int, cores: List[int], fail_fast: bool, checker: Tuple[str, float]) -> List[Dict]:
+        """Run each test case in its own sandbox, one per core at a time, starting them in the given order"""
+        tests_dir = self._write_tests(workspace, test_set, input_dir)
+        free_cores: "queue.Queue[int]" = queue.Queue()
+        for cpu in cores:
+            free_cores.put(cpu)
+        failed = threading.Event()
+        
+        def run(index: int) -> Dict:
+            cpu = free_cores.get()
+            try:
+                if fail_fast and failed.is_set():
+                    return SKIPPED_RESULT.copy()
+                command, timeout = self._supervisor_command(workspace, input_dir, [index], time_limit, memory_limit, cpu, False, checker)
+                try:
+                    stdout = self.backend.run_isolated(
+                        workspace, command, timeout, memory_limit, cpu if settings.JUDGE_PIN_CPUS else None
+                    )
+                    report = self._parse_supervisor_output(stdout.decode("utf-8", errors="replace")).get(index)
+                except Exception as e:
+                    return {"status": "error", "execution_time_ms": 0, "error_message": str(e)}
+                result = self._build_result(tests_dir, index, report, test_set, time_limit, memory_limit)
+                if result["status"] != "passed":
+                    failed.set()
+                return result
+            finally:
+                free_cores.put(cpu)
+        
+        results: List[Dict] = [{}] * test_set.count
+        with ThreadPoolExecutor(max_workers=len(cores)) as pool:
+            for index, result in zip(order, pool.map(run, order)):
+                results[index] = result
+        return results
+    
+    def _run_session(self, workspace: Workspace, test_set: TestSet, input_dir: Optional[str], order: List[int], time_limit: int, memory_limit: int, cores: List[int], fail_fast: bool, checker: Tuple[str, float]) -> List[Dict]:
+        """Run all test cases inside one sandbox, one supervisor per core working through a shard of tests
+        
+        Shards are dealt from the given order, and each supervisor runs its tests in that order.
+        """
+        if not test_set.count:
+            return []
+        
+        tests_dir = self._write_tests(workspace, test_set, input_dir)
+        commands = []
+        session_timeout = 0
+        for shard_index, cpu in enumerate(cores):
+            shard = order[shard_index::len(cores)]
+            if not shard:
+                continue
+            command, shard_timeout = self._supervisor_command(workspace, input_dir, shard, time_limit, memory_limit, cpu, fail_fast, checker)
+            commands.append(f"timeout {shard_timeout} {shlex.join(command)}")
+            session_timeout = max(session_timeout, shard_timeout)
+        # Supervisors write whole lines with a single write, so shard reports do not interleave
+        script = " & ".join(commands) + " & wait"
+        
+        try:
+            stdout = self.backend.run(workspace, script, session_timeout, memory_limit * len(commands))
+            reports = self._parse_supervisor_output(stdout.decode("utf-8", errors="replace"))
+        except Exception as e:
+            return [
+                {"status": "error", "execution_time_ms": 0, "error_message": str(e)}
+                for _ in range(test_set.count)
+            ]
+        
+        return [
+            self._build_result(tests_dir, index, reports.get(index), test_set, time_limit, memory_limit)
+            for index in range(test_set.count)
+        ]
+    
+    def _write_tests(self, workspace: Workspace, test_set: TestSet, input_dir: Optional[str]) -> str:
+        """Create tests/ for the supervisor's outputs, with the test inputs and expected outputs unless they are staged
+        
+        tests/ is only accessible to the supervisor; solutions run as SANDBOX_RUN_UID
+        and merely need to traverse the workspace to execute the binary.
+        """
+        tests_dir = os.path.join(workspace.work_dir, "tests")
+        os.makedirs(tests_dir, exist_ok=True)
+        os.chmod(tests_dir, 0o700)
+        os.chmod(workspace.work_dir, 0o711)
+        if input_dir is None:
+            test_set.install(tests_dir)
+        return tests_dir
+    
+    def _supervisor_command(self, workspace: Workspace, input_dir: Optional[str], indices: List[int], time_limit: float, memory_limit: int, cpu: int, fail_fast: bool, checker: Tuple[str, float]) -> Tuple[List[str], int]:
+        """Supervisor command line running the given tests, and a timeout covering all of them"""
+        language = workspace.language
+        startup_ms = self.startup_ms.get(language.name, 0)
+        time_limit_ms = int(time_limit * 1000)
+        wall_limit_ms = int(time_limit_ms * settings.WALL_TIME_LIMIT_FACTOR) + settings.WALL_TIME_LIMIT_EXTRA_MS + startup_ms
+        # Every test may use up to its wall-clock limit
+        timeout = len(indices) * wall_limit_ms // 1000 + 30
+        pinned_cpu = cpu if settings.JUDGE_PIN_CPUS else -1
+        checker_mode, checker_tolerance = checker
+        command = [
+            self.backend.supervisor_path(workspace),
+            "-t", str(time_limit_ms), "-w", str(wall_limit_ms), "-m", str(memory_limit), "-p", str(pinned_cpu),
+            "-u", str(settings.SANDBOX_RUN_UID), "-o", str(settings.MAX_OUTPUT_SIZE_BYTES)
+        ]
+        if checker_mode == "custom":
+            command += [
+                "-k", f"{workspace.sandbox_dir}/{CHECKER.artifact_file}",
+                "-K", str(settings.CHECKER_TIME_LIMIT_MS), "-M", str(settings.CHECKER_MEMORY_MB)
+            ]
+            # Every test may be followed by a checker run
+            timeout += len(indices) * settings.CHECKER_TIME_LIMIT_MS // 1000
+        else:
+            command += ["-c", checker_mode, "-e", repr(float(checker_tolerance))]
+        if input_dir:
+            command += ["-i", input_dir]
+        if fail_fast:
+            command.append("-f")
+        if startup_ms:
+            command += ["-s", str(startup_ms)]
+        if not language.limit_address_space:
+            command.append("-R")
+        # The runtime gets the problem's own memory limit, e.g. as the JVM's heap size
+        run_args = language.run_args(workspace.sandbox_dir, int(memory_limit / language.memory_multiplier))
+        for arg in run_args[1:]:
+            command += ["-a", arg]
+        command += [run_args[0], f"{workspace.sandbox_dir}/tests"] + [str(index) for index in indices]
+        return command, timeout
+    
+    @staticmethod
+    def _parse_supervisor_output(output: str) -> Dict[int, Dict]:
+        """Parse the per-test report lines printed by the supervisor"""
+        reports = {}
+        for line in output.splitlines():
+            parts = line.split()
+            if len(parts) != 6 or not parts[0].isdigit():
+                continue
+            reports[int(parts[0])] = {
+                "verdict": parts[1],
+                "cpu_ms": int(parts[2]),
+                "wall_ms": int(parts[3]),
+                "peak_kb": int(parts[4]),
+                "exit_code": int(parts[5])
+            }
+        return reports
+    
+    @staticmethod
+    def _build_result(tests_dir: str, index: int, report: Optional[Dict], test_set: TestSet, time_limit: float, memory_limit: int) -> Dict:
+        """Turn a supervisor report into the per-test result dict
+        
+        execution_time_ms is CPU time (user + sys) of the run, memory_used_mb its peak RSS.
+        """
+        if report is None:
+            # Supervisor never reached this test, the sandbox ran out of time
+            return {
+                "status": "timeout",
+                "execution_time_ms": int(time_limit * 1000),
+                "error_message": "Execution timeout"
+            }
+        memory_used = round(report["peak_kb"] / 1024, 2)
+        
+        if report["verdict"] == "SKIP":
+            return SKIPPED_RESULT.copy()
+        if report["verdict"] == "IE":
+            return {
+                "status": "error",
+                "judge_error": True,
+                "execution_time_ms": 0,
+                "error_message": f"Sandbox could not switch to uid {settings.SANDBOX_RUN_UID}, the solution was not run"
+            }
+        if report["verdict"] == "TLE":
+            return {
+                "status": "timeout",
+                "execution_time_ms": report["cpu_ms"],
+                "wall_time_ms": report["wall_ms"],
+                "memory_used_mb": memory_used,
+                "error_message": "Execution timeout"
+            }
+        if report["verdict"] == "OLE":
+            return {
+                "status": "error",
+                "execution_time_ms": report["cpu_ms"],
+                "memory_used_mb": memory_used,
+                "error_message": f"Output limit exceeded ({settings.MAX_OUTPUT_SIZE_BYTES} bytes)"
+            }
+        if report["verdict"] == "MLE":
+            return {
+                "status": "error",
+                "execution_time_ms": report["cpu_ms"],
+                "memory_used_mb": memory_used,
+                "error_message": f"Memory limit exceeded ({memory_limit} MB)"
+            }
+        if report["verdict"] == "RE":
+            stderr_output = ""
+            err_file = os.path.join(tests_dir, f"{index}.err")
+            if os.path.exists(err_file):
+                with open(err_file, "r", errors="replace") as f:
+                    stderr_output = f.read(1000)
+            return {
+                "status": "error",
+                "execution_time_ms": report["cpu_ms"],
+                "memory_used_mb": memory_used,
+                "error_message": f"Runtime error (exit code {report['exit_code']})" + (f": {stderr_output}" if stderr_output else "")
+            }
+        
+        # Custom checkers explain their verdict in <i>.chk
+        checker_message = None
+        checker_file = os.path.join(tests_dir, f"{index}.chk")
+        if os.path.exists(checker_file):
+            with open(checker_file, "r", errors="replace") as f:
+                checker_message = f.read(1000).strip() or None
+        if report["verdict"] == "CF":
+            return {
+                "status": "error",
+                "checker_failed": True,
+                "judge_error": True,
+                "execution_time_ms": report["cpu_ms"],
+                "error_message": f"Checker failed on test {index + 1}" + (f": {checker_message}" if checker_message else "")
+            }
+        
+        # The supervisor already checked the output (OK or WA) and kept only its beginning
+        with open(os.path.join(tests_dir, f"{index}.out"), "r", errors="replace") as f:
+            actual_output = f.read(1000).strip()
+        expected_output_stripped = test_set.expected_output(index).strip()
+        
+        result = {
+            "status": "passed" if report["verdict"] == "OK" else "failed",
+            "execution_time_ms": report["cpu_ms"],
+            "wall_time_ms": report["wall_ms"],
+            "memory_used_mb": memory_used,
+            "actual_output": actual_output[:1000],  # Limit output size
+            "expected_output": expected_output_stripped[:1000]
+        }
+        if result["status"] == "failed" and checker_message:
+            result["error_message"] = checker_message
+        return result
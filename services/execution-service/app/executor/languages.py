@@ -0,0 +1,117 @@
+from typing import Dict, List
+
+from app.config import settings
+
+
+class Language:
+    """How submissions in one language are built and run
+
+    Commands are argument lists; "{dir}" stands for the workspace directory as
+    seen inside the sandbox and "{memory_mb}" for the problem's memory limit.
+    The compile command turns source_file into artifact_file, which is what
+    the artifact store keeps and the run command executes.
+
+    Time and memory limits are multiplied by time_multiplier and
+    memory_multiplier for this language. Runtimes with compensate_startup have
+    the CPU time of running startup_program, measured once per node, taken
+    off every test (see Executor.measure_startup), so interpreter or JVM
+    startup is not charged to the solution.
+    """
+
+    def __init__(self, name: str, source_file: str, artifact_file: str, compile_command: List[str],
+                 run_command: List[str], image: str, version_command: List[str], time_multiplier: float = 1.0,
+                 memory_multiplier: float = 1.0, limit_address_space: bool = True, compensate_startup: bool = False,
+                 startup_program: str = ""):
+        self.name = name
+        self.source_file = source_file
+        self.artifact_file = artifact_file
+        self.compile_command = compile_command
+        self.run_command = run_command
+        # Docker image of this language's sandboxes
+        self.image = image
+        # Prints the toolchain version, identifying it on the native backend
+        self.version_command = version_command
+        self.time_multiplier = time_multiplier
+        self.memory_multiplier = memory_multiplier
+        # Off for runtimes that reserve much more address space than they use
+        self.limit_address_space = limit_address_space
+        self.compensate_startup = compensate_startup
+        self.startup_program = startup_program
+
+    def compile_args(self, sandbox_dir: str) -> List[str]:
+        return [arg.format(dir=sandbox_dir) for arg in self.compile_command]
+
+    def run_args(self, sandbox_dir: str, memory_limit_mb: int) -> List[str]:
+        return [arg.format(dir=sandbox_dir, memory_mb=memory_limit_mb) for arg in self.run_command]
+
+
+CPP_FLAGS = ["-std=c++17", "-O2"]
+
+LANGUAGES: Dict[str, Language] = {
+    "cpp": Language(
+        name="cpp",
+        source_file="main.cpp",
+        artifact_file="main",
+        compile_command=["g++", "-o", "{dir}/main", "{dir}/main.cpp"] + CPP_FLAGS,
+        run_command=["{dir}/main"],
+        image=settings.SANDBOX_IMAGE,
+        version_command=["g++", "--version"]
+    ),
+    "python": Language(
+        name="python",
+        source_file="main.py",
+        artifact_file="main.pyc",
+        # Byte-compiled once, so syntax errors are compilation errors and tests skip parsing
+        compile_command=[
+            "python3", "-c", "import py_compile, sys; py_compile.compile(sys.argv[1], sys.argv[2], doraise=True)",
+            "{dir}/main.py", "{dir}/main.pyc"
+        ],
+        run_command=["python3", "{dir}/main.pyc"],
+        image=settings.PYTHON_SANDBOX_IMAGE,
+        version_command=["python3", "--version"],
+        time_multiplier=3.0,
+        compensate_startup=True,
+        startup_program="pass\n"
+    ),
+    "java": Language(
+        name="java",
+        source_file="Main.java",
+        artifact_file="main.jar",
+        compile_command=[
+            "sh", "-c",
+            "javac -encoding UTF-8 -d {dir}/classes {dir}/Main.java"
+            " && jar --create --file {dir}/main.jar --main-class Main -C {dir}/classes ."
+        ],
+        # The heap gets the problem's memory limit, memory_multiplier leaves room for the JVM itself
+        run_command=[
+            "java", "-Xmx{memory_mb}m", "-Xss64m", "-XX:+UseSerialGC", "-XX:-UsePerfData", "-jar", "{dir}/main.jar"
+        ],
+        image=settings.JAVA_SANDBOX_IMAGE,
+        version_command=["javac", "-version"],
+        time_multiplier=2.0,
+        memory_multiplier=2.0,
+        limit_address_space=False,
+        compensate_startup=True,
+        startup_program="public class Main { public static void main(String[] args) {} }\n"
+    ),
+}
+
+
+# Custom checkers of problems, in C++ and linked statically, so they run in the sandbox of every
+# language; not a submission language, get_language does not return it
+CHECKER = Language(
+    name="checker",
+    source_file="checker.cpp",
+    artifact_file="checker",
+    compile_command=["g++", "-static", "-o", "{dir}/checker", "{dir}/checker.cpp"] + CPP_FLAGS,
+    run_command=["{dir}/checker"],
+    image=settings.SANDBOX_IMAGE,
+    version_command=["g++", "--version"]
+)
+
+
+def get_language(name: str) -> Language:
+    """Language of a submission, ValueError if it is unknown or not enabled on this node"""
+    if name not in LANGUAGES or name not in settings.ENABLED_LANGUAGES:
+        raise ValueError(f"Unsupported language: {name}")
+    return LANGUAGES[name]
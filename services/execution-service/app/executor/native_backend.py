@@ -0,0 +1,300 @@
+import glob
+import hashlib
+import os
+import pwd
+import resource
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.executor.backend import SandboxBackend, Workspace
+from app.executor.compiler import COMPILE_SERVER_SOURCE, pch_script, wait_for_socket
+from app.executor.languages import Language
+from app.executor.pool import SUPERVISOR_SOURCE
+
+
+class NativeBackend(SandboxBackend):
+    """Compiles and runs submissions as plain subprocesses, without a container runtime
+
+    Isolation comes from Linux primitives: every command is started through
+    unshare(1) with new user, mount, network, IPC, UTS and PID namespaces
+    (NATIVE_UNSHARE_FLAGS), the supervisor applies rlimits and a seccomp filter
+    to each run, and with NATIVE_CGROUP_ROOT set each run gets its own cgroup v2
+    for memory limiting and CPU/memory accounting. Languages use the toolchains
+    installed on this host.
+
+    Commands see a private root filesystem instead of the host's: an empty
+    tmpfs with the toolchain (NATIVE_ROOT_PATHS) and a fresh /proc mounted
+    read-only, a few devices, a private /tmp, and the workspace read-write,
+    switched to with pivot_root. Test data, caches and other workspaces on this
+    host are not in it. Root inside the user namespace is the service user and
+    runs the supervisor; solutions and compiles on the compile server run as
+    SANDBOX_RUN_UID, which maps to a subordinate host id that owns nothing. The
+    backend refuses to run unless a probe at startup shows that a solution
+    cannot read the expected answers.
+    """
+
+    name = "native"
+
+    def __init__(self):
+        self._digests: Dict[str, str] = {}
+        self._error: Optional[str] = None
+        self._compile_server: Optional[subprocess.Popen] = None
+        self.supervisor = os.path.join(settings.NATIVE_WORK_DIR, "supervisor")
+        # Mount point of the private root, only ever mounted on inside the namespaces
+        self._root_dir = os.path.join(settings.NATIVE_WORK_DIR, "root")
+        self._root_paths = sorted({path for pattern in settings.NATIVE_ROOT_PATHS for path in glob.glob(pattern)})
+        self._pivot_root = shutil.which("pivot_root", path="/usr/sbin:/sbin:/usr/bin:/bin")
+        self._prefix = ["unshare"] + shlex.split(settings.NATIVE_UNSHARE_FLAGS)
+
+        if "--mount" not in self._prefix:
+            self._error = "NATIVE_UNSHARE_FLAGS must include --mount for the private root filesystem"
+            return
+        tools = ["gcc", "g++", "unshare"]
+        if "--user" in self._prefix:
+            tools += ["newuidmap", "newgidmap"]
+        for tool in tools:
+            if not shutil.which(tool):
+                self._error = f"{tool} not found"
+                return
+        if not self._pivot_root:
+            self._error = "pivot_root not found"
+            return
+        try:
+            if "--user" in self._prefix:
+                uid, gid = self._sandbox_host_ids()
+                self._prefix += [
+                    f"--map-users={uid},{settings.SANDBOX_RUN_UID},1",
+                    f"--map-groups={gid},{settings.SANDBOX_RUN_UID},1"
+                ]
+            os.makedirs(self._root_dir, exist_ok=True)
+            self._build_tool(SUPERVISOR_SOURCE, self.supervisor)
+            self._check_isolation()
+        except Exception as e:
+            self._error = f"could not set up the sandbox: {e}"
+
+    def is_available(self) -> bool:
+        return self._error is None
+
+    @property
+    def unavailable_message(self) -> str:
+        return f"Native sandbox not available: {self._error}"
+
+    def language_available(self, language: Language) -> bool:
+        tools = [language.version_command[0]] + [arg for arg in language.run_command[:1] if "{" not in arg]
+        return all(shutil.which(tool) for tool in tools)
+
+    @contextmanager
+    def workspace(self, language: Language) -> Iterator[Workspace]:
+        with tempfile.TemporaryDirectory(dir=settings.NATIVE_WORK_DIR) as temp_dir:
+            # Paths are the same inside and outside the sandbox; the handle lists the
+            # host paths besides the workspace that runs may read, e.g. staged tests
+            yield Workspace(temp_dir, temp_dir, language, handle=[self.supervisor])
+
+    def compiler_digest(self, language: Language) -> str:
+        if language.name not in self._digests:
+            # Some tools, like javac, print their version to stderr
+            result = subprocess.run(language.version_command, capture_output=True, check=True)
+            self._digests[language.name] = "native:" + hashlib.sha256(result.stdout + result.stderr).hexdigest()
+        return self._digests[language.name]
+
+    def supervisor_path(self, workspace: Workspace) -> str:
+        return self.supervisor
+
+    def staged_tests_path(self, workspace: Workspace, staged_dir: str) -> str:
+        workspace.handle.append(staged_dir)
+        return staged_dir
+
+    def start_compile_server(self, compiler: List[str], jobs: int) -> str:
+        """Run the compile server in its own namespaces, with the precompiled header built on this host"""
+        self.stop_compile_server()
+        server = os.path.join(settings.NATIVE_WORK_DIR, "compile_server")
+        self._build_tool(COMPILE_SERVER_SOURCE, server)
+        pch_dir = os.path.join(settings.NATIVE_WORK_DIR, "pch")
+        subprocess.run(["sh", "-c", pch_script(pch_dir, compiler)], capture_output=True, check=True, timeout=300)
+
+        # Only the server may list job directories, compiled code must not find other submissions
+        jobs_dir = os.path.join(settings.NATIVE_WORK_DIR, "compile-jobs")
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+        os.makedirs(jobs_dir, mode=0o711)
+        # The socket is created inside the private root, in a directory shared with this host
+        socket_dir = os.path.join(settings.NATIVE_WORK_DIR, "compile-server")
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        socket_path = os.path.join(socket_dir, "compile.sock")
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        process = subprocess.Popen(
+            self._confine(
+                [server, "-j", str(jobs), "-u", str(settings.SANDBOX_RUN_UID), "-d", jobs_dir, socket_path]
+                + compiler + ["-I", pch_dir],
+                writable=[jobs_dir, socket_dir], readable=[server, pch_dir], cwd=jobs_dir
+            ),
+            env={"PATH": os.environ.get("PATH", "/usr/bin:/bin")},
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        self._compile_server = process
+        try:
+            wait_for_socket(socket_path, lambda: process.poll() is None)
+        except Exception:
+            self.stop_compile_server()
+            raise
+        return socket_path
+
+    def stop_compile_server(self):
+        process, self._compile_server = self._compile_server, None
+        if process is not None and process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+    def compile(self, workspace: Workspace, command: List[str], timeout: int) -> Dict:
+        try:
+            exit_code, _, stderr = self._run_confined(
+                command, workspace, timeout, settings.MAX_MEMORY_MB,
+                # The JVM reserves far more address space than it uses
+                limit_memory=workspace.language.limit_address_space
+            )
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        if exit_code is None:
+            return {"success": False, "error": f"Compilation timed out after {timeout} seconds"}
+        if exit_code != 0:
+            return {"success": False, "error": stderr.decode(errors="replace")}
+        return {"success": True}
+
+    def run(self, workspace: Workspace, script: str, timeout: int, memory_limit_mb: int) -> bytes:
+        # Per-run limits are applied by the supervisor, not to the supervisor itself
+        _, stdout, _ = self._run_confined(["sh", "-c", script], workspace, timeout, memory_limit_mb)
+        return stdout
+
+    def _run_confined(self, command: List[str], workspace: Workspace, timeout: int, memory_limit_mb: int,
+                      limit_memory: bool = False) -> Tuple[Optional[int], bytes, bytes]:
+        """Run a command in the workspace inside fresh namespaces, killing its whole process group on timeout
+
+        Returns (exit_code, stdout, stderr); exit_code is None if the command timed out.
+        """
+        def limit():
+            if limit_memory:
+                limit_bytes = memory_limit_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+        env = {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "SUPERVISOR_CGROUP": settings.NATIVE_CGROUP_ROOT}
+        process = subprocess.Popen(
+            self._confine(command, writable=[workspace.work_dir], readable=workspace.handle, cwd=workspace.work_dir),
+            cwd=workspace.work_dir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            preexec_fn=limit,
+            start_new_session=True
+        )
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            # Output produced before the timeout is kept, e.g. reports of finished tests
+            stdout, stderr = process.communicate()
+            return None, stdout, stderr
+        return process.returncode, stdout, stderr
+
+    def _confine(self, command: List[str], writable: List[str], readable: List[str], cwd: str) -> List[str]:
+        """Command line running command in cwd inside fresh namespaces and the private root filesystem
+
+        Paths keep their host names inside; writable ones are mounted read-write,
+        readable ones read-only. Nothing else of the host filesystem is reachable
+        once the script has switched roots with pivot_root and detached the old one.
+        """
+        script = [
+            "set -e",
+            f"root={shlex.quote(self._root_dir)}",
+            'bind() {',
+            '    if [ -L "$2" ]; then mkdir -p "$root${2%/*}"; ln -s "$(readlink "$2")" "$root$2"; return; fi',
+            '    if [ -d "$2" ]; then mkdir -p "$root$2"; else mkdir -p "$root${2%/*}"; touch "$root$2"; fi',
+            '    mount --rbind "$2" "$root$2"',
+            '    if [ "$1" = ro ]; then mount -o remount,bind,ro "$root$2"; fi',
+            '}',
+            'mount -t tmpfs -o mode=0755 sandbox-root "$root"',
+            'mkdir "$root/tmp" "$root/proc" "$root/dev" "$root/.old-root"',
+            # Mounted before the binds, which may be below /tmp
+            f'mount -t tmpfs -o mode=1777,size={settings.MAX_MEMORY_MB}m sandbox-tmp "$root/tmp"',
+            'mount -t proc -o ro,nosuid,nodev,noexec proc "$root/proc"',
+            'for device in null zero full random urandom; do',
+            '    touch "$root/dev/$device" && mount --bind "/dev/$device" "$root/dev/$device"',
+            'done'
+        ]
+        script += [f"bind ro {shlex.quote(path)}" for path in self._root_paths + list(readable)]
+        script += [f"bind rw {shlex.quote(path)}" for path in writable]
+        script += [
+            'cd "$root"',
+            f"{shlex.quote(self._pivot_root)} . .old-root",
+            "umount -l /.old-root",
+            "rmdir /.old-root",
+            "mount -o remount,ro /",
+            f"cd {shlex.quote(cwd)}",
+            'exec "$@"'
+        ]
+        return self._prefix + ["sh", "-c", "\n".join(script), "sandbox"] + command
+
+    def _check_isolation(self):
+        """Raise unless a solution runs as SANDBOX_RUN_UID and cannot read the answers next to it
+
+        Runs `cat 0.ans` as a solution the way Executor does: a runtime error is
+        expected, IE means the supervisor could not switch users and OK that the
+        answers are readable.
+        """
+        with tempfile.TemporaryDirectory(dir=settings.NATIVE_WORK_DIR) as temp_dir:
+            workspace = Workspace(temp_dir, temp_dir, None, handle=[self.supervisor])
+            tests_dir = os.path.join(temp_dir, "tests")
+            os.makedirs(tests_dir)
+            for name in ["0.in", "0.ans"]:
+                with open(os.path.join(tests_dir, name), "w") as f:
+                    f.write("secret\n")
+            os.chmod(temp_dir, 0o711)
+            os.chmod(tests_dir, 0o700)
+            command = [
+                self.supervisor, "-u", str(settings.SANDBOX_RUN_UID), "-c", "tokens",
+                "-a", os.path.join(tests_dir, "0.ans"), "cat", tests_dir, "0"
+            ]
+            _, stdout, stderr = self._run_confined(command, workspace, 30, settings.MAX_MEMORY_MB)
+        verdicts = [line.split()[1] for line in stdout.decode(errors="replace").splitlines() if len(line.split()) == 6]
+        if verdicts == ["IE"]:
+            raise RuntimeError(f"solutions cannot be switched to uid {settings.SANDBOX_RUN_UID}")
+        if verdicts != ["RE"]:
+            raise RuntimeError(
+                "solutions can read the expected answers" if verdicts
+                else f"sandbox does not start: {stderr.decode(errors='replace').strip()}"
+            )
+
+    @staticmethod
+    def _sandbox_host_ids() -> Tuple[int, int]:
+        """Host uid and gid that SANDBOX_RUN_UID maps to"""
+        if settings.NATIVE_SANDBOX_HOST_ID >= 0:
+            return settings.NATIVE_SANDBOX_HOST_ID, settings.NATIVE_SANDBOX_HOST_ID
+        names = {str(os.getuid()), pwd.getpwuid(os.getuid()).pw_name}
+        ids = []
+        for path in ["/etc/subuid", "/etc/subgid"]:
+            ranges = []
+            if os.path.exists(path):
+                with open(path) as f:
+                    ranges = [line.strip().split(":") for line in f if line.count(":") == 2]
+            starts = [int(start) for name, start, count in ranges if name in names and int(count) > 0]
+            if not starts:
+                raise RuntimeError(f"no subordinate ids for the service user in {path}")
+            ids.append(starts[0])
+        return ids[0], ids[1]
+
+    def _build_tool(self, source: str, binary: str):
+        """Compile a helper such as the supervisor once, unless an up-to-date binary exists"""
+        if os.path.exists(binary) and os.path.getmtime(binary) >= os.path.getmtime(source):
+            return
+        tmp_path = f"{binary}.{os.getpid()}"
+        subprocess.run(["gcc", "-O2", "-o", tmp_path, source], capture_output=True, check=True, timeout=60)
+        os.replace(tmp_path, binary)
@@ -0,0 +1,247 @@
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.executor.languages import Language
+from app.metrics import (
+    SANDBOX_POOL_IDLE,
+    SANDBOX_POOL_IN_USE,
+    SANDBOX_POOL_ACQUIRE_TOTAL,
+    SANDBOX_POOL_WAIT_SECONDS,
+    SANDBOX_POOL_RELEASE_TOTAL,
+)
+
+POOL_LABEL = "codeforces.sandbox-pool"
+SUPERVISOR_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supervisor.c")
+# Where SANDBOX_TOOLS_DIR, holding the statically linked supervisor, is mounted read-only in sandboxes
+TOOLS_MOUNT = "/sandbox"
+# Where TEST_DATA_STAGE_DIR is mounted read-only in sandboxes
+STAGE_MOUNT = "/tests"
+# At most this much of a sandboxed command's stdout and of its stderr is kept
+STREAM_LIMIT_BYTES = 1024 * 1024
+# Kills every process of a sandbox but its init (sleep infinity) and empties /code and /tmp. Exits 3 if
+# a process is still listed afterwards: one that escaped its run (setsid, double fork), now a zombie of
+# an init that does not reap, or one that could not be killed. Runs as the image's user, root.
+SCRUB_SCRIPT = (
+    "kill -9 -1 2>/dev/null; "
+    "rm -rf /code/* /code/.[!.]* /tmp/* /tmp/.[!.]*; "
+    "for p in /proc/[0-9]*; do n=${p#/proc/}; [ \"$n\" = 1 ] || [ \"$n\" = $$ ] || exit 3; done"
+)
+
+
+def sandbox_volumes(work_dir: str) -> Dict[str, Dict[str, str]]:
+    """Volumes of a sandbox container: its work directory at /code, the tools, and staged test data if enabled"""
+    volumes = {
+        work_dir: {"bind": "/code", "mode": "rw"},
+        settings.SANDBOX_TOOLS_DIR: {"bind": TOOLS_MOUNT, "mode": "ro"}
+    }
+    if settings.TEST_DATA_STAGE_ENABLED:
+        volumes[settings.TEST_DATA_STAGE_DIR] = {"bind": STAGE_MOUNT, "mode": "ro"}
+    return volumes
+
+
+def read_streams(chunks: Iterable[Tuple[Optional[bytes], Optional[bytes]]]) -> Tuple[bytes, bytes]:
+    """Collect demultiplexed (stdout, stderr) chunks of an attached Docker stream into (stdout, stderr)
+
+    Each stream keeps its first STREAM_LIMIT_BYTES; the rest is read and
+    dropped, so a chatty command can neither block on a full pipe nor exhaust
+    this process's memory.
+    """
+    buffers = (bytearray(), bytearray())
+    for chunk in chunks:
+        for buffer, data in zip(buffers, chunk):
+            if data and len(buffer) < STREAM_LIMIT_BYTES:
+                buffer += data[:STREAM_LIMIT_BYTES - len(buffer)]
+    return bytes(buffers[0]), bytes(buffers[1])
+
+
+class Sandbox:
+    """A long-lived, network-disabled container with its own host work directory mounted at /code"""
+
+    def __init__(self, container, work_dir: str):
+        self.container = container
+        self.work_dir = work_dir
+        self.uses = 0
+        # Set once a command outlived its timeout and the container was killed; it is not reused
+        self.expired = False
+
+    def exec(self, command: List[str], timeout: Optional[float] = None) -> Tuple[int, bytes, bytes]:
+        """Run a command inside the sandbox and return (exit_code, stdout, stderr), both bounded by read_streams
+
+        Docker cannot kill a single exec, so a command still running after
+        timeout seconds kills the whole container: the sandbox is expired and
+        its pool replaces it on release. The exit code is then -1.
+        """
+        api = self.container.client.api
+        exec_id = api.exec_create(self.container.id, command, workdir="/code")["Id"]
+        timer = threading.Timer(timeout, self._expire) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            stdout, stderr = read_streams(api.exec_start(exec_id, stream=True, demux=True))
+        finally:
+            if timer:
+                timer.cancel()
+        exit_code = api.exec_inspect(exec_id)["ExitCode"]
+        return -1 if self.expired or exit_code is None else exit_code, stdout, stderr
+
+    def _expire(self):
+        self.expired = True
+        try:
+            self.container.kill()
+        except Exception:
+            # Exited in the meantime
+            pass
+
+
+class SandboxPool:
+    """Keeps a number of idle sandboxes of one language warm so executions do not pay container cold starts
+
+    The supervisor comes from SANDBOX_TOOLS_DIR, which must hold it before the
+    pool is started.
+    """
+
+    def __init__(self, client, size: int, language: Language):
+        self.client = client
+        self.size = size
+        self.language = language
+        self._idle: "queue.Queue[Sandbox]" = queue.Queue()
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._refill = threading.Event()
+        self._stopped = False
+        os.makedirs(settings.SANDBOX_POOL_DIR, exist_ok=True)
+
+    def start(self):
+        """Remove sandboxes left over by a previous process and start warming the pool"""
+        for container in self.client.containers.list(all=True, filters={"label": f"{POOL_LABEL}={self.language.name}"}):
+            try:
+                container.remove(force=True)
+            except Exception:
+                pass
+        threading.Thread(target=self._replenish_loop, daemon=True).start()
+        self._refill.set()
+
+    def acquire(self) -> Sandbox:
+        """Hand out an idle sandbox, creating one on demand if the pool is empty"""
+        start = time.monotonic()
+        try:
+            sandbox = self._idle.get_nowait()
+            SANDBOX_POOL_ACQUIRE_TOTAL.labels(language=self.language.name, result="hit").inc()
+            if settings.SANDBOX_POOL_PAUSE_IDLE:
+                sandbox.container.unpause()
+        except queue.Empty:
+            SANDBOX_POOL_ACQUIRE_TOTAL.labels(language=self.language.name, result="miss").inc()
+            sandbox = self._create()
+        SANDBOX_POOL_WAIT_SECONDS.observe(time.monotonic() - start)
+
+        with self._lock:
+            self._in_use += 1
+        self._update_gauges()
+        self._refill.set()
+        sandbox.uses += 1
+        return sandbox
+
+    def release(self, sandbox: Sandbox):
+        """Scrub a sandbox and return it to the pool, or replace it if it is worn out, expired or dirty"""
+        with self._lock:
+            self._in_use -= 1
+
+        if (self._stopped or sandbox.expired or sandbox.uses >= settings.SANDBOX_MAX_USES
+                or not self._scrub(sandbox)):
+            SANDBOX_POOL_RELEASE_TOTAL.labels(language=self.language.name, outcome="replaced").inc()
+            self._destroy(sandbox)
+        else:
+            SANDBOX_POOL_RELEASE_TOTAL.labels(language=self.language.name, outcome="recycled").inc()
+            if settings.SANDBOX_POOL_PAUSE_IDLE:
+                sandbox.container.pause()
+            self._idle.put(sandbox)
+        self._update_gauges()
+        self._refill.set()
+
+    def shutdown(self):
+        """Stop replenishing and remove all idle sandboxes"""
+        self._stopped = True
+        self._refill.set()
+        while True:
+            try:
+                self._destroy(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self._update_gauges()
+
+    def _replenish_loop(self):
+        while not self._stopped:
+            self._refill.wait()
+            self._refill.clear()
+            while not self._stopped and self._idle.qsize() < self.size:
+                try:
+                    sandbox = self._create()
+                except Exception as e:
+                    print(f"Sandbox pool: failed to create sandbox: {e}")
+                    time.sleep(5)
+                    continue
+                if settings.SANDBOX_POOL_PAUSE_IDLE:
+                    sandbox.container.pause()
+                self._idle.put(sandbox)
+                self._update_gauges()
+
+    def _create(self) -> Sandbox:
+        work_dir = os.path.join(settings.SANDBOX_POOL_DIR, uuid.uuid4().hex)
+        os.makedirs(work_dir)
+        # Room for MAX_PARALLEL_TESTS concurrent runs, each capped by the supervisor
+        memory_limit = int(settings.MAX_MEMORY_MB * self.language.memory_multiplier) * settings.MAX_PARALLEL_TESTS
+        container = self.client.containers.run(
+            image=self.language.image,
+            command=["sleep", "infinity"],
+            volumes=sandbox_volumes(work_dir),
+            mem_limit=f"{memory_limit + settings.SESSION_MEMORY_OVERHEAD_MB}m",
+            network_disabled=True,
+            labels={POOL_LABEL: self.language.name},
+            detach=True
+        )
+        sandbox = Sandbox(container, work_dir)
+
+        # The runtime is loaded once here, so the first run does not read it from disk
+        exit_code, _, stderr = sandbox.exec(self.language.version_command)
+        if exit_code != 0 or not self._scrub(sandbox):
+            self._destroy(sandbox)
+            raise RuntimeError(f"could not prepare sandbox: {stderr.decode(errors='replace')}")
+        return sandbox
+
+    def _scrub(self, sandbox: Sandbox) -> bool:
+        """Kill leftover processes and empty the sandbox, False if it must not be reused
+
+        Processes go first, so none can write into the work directory while it
+        is being emptied.
+        """
+        try:
+            exit_code, _, _ = sandbox.exec(["sh", "-c", SCRUB_SCRIPT], timeout=settings.SANDBOX_SCRUB_TIMEOUT_SECONDS)
+            if exit_code != 0:
+                return False
+            for entry in os.listdir(sandbox.work_dir):
+                path = os.path.join(sandbox.work_dir, entry)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            return True
+        except Exception as e:
+            print(f"Sandbox pool: scrub failed: {e}")
+            return False
+
+    def _destroy(self, sandbox: Sandbox):
+        try:
+            sandbox.container.remove(force=True)
+        except Exception:
+            pass
+        shutil.rmtree(sandbox.work_dir, ignore_errors=True)
+
+    def _update_gauges(self):
+        SANDBOX_POOL_IDLE.labels(language=self.language.name).set(self._idle.qsize())
+        SANDBOX_POOL_IN_USE.labels(language=self.language.name).set(self._in_use)
@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+from typing import List
+
+from app.metrics import JUDGE_CORES_BUSY, JUDGE_CORE_WAIT_SECONDS
+
+
+def parse_cpu_list(value: str) -> List[int]:
+    """Parse a cpuset-style list such as "2-5,8" into CPU ids"""
+    cpus = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+class CoreScheduler:
+    """Hands out dedicated CPUs of this node to test runs, shared by all concurrent executions"""
+
+    def __init__(self, cpus: List[int]):
+        self.cpus = cpus
+        self._free = list(cpus)
+        self._cond = threading.Condition()
+
+    def acquire(self, max_cores: int) -> List[int]:
+        """Block until at least one CPU is free, then take up to max_cores of them"""
+        start = time.monotonic()
+        with self._cond:
+            while not self._free:
+                self._cond.wait()
+            count = max(1, min(max_cores, len(self._free)))
+            cores, self._free = self._free[:count], self._free[count:]
+            JUDGE_CORES_BUSY.set(len(self.cpus) - len(self._free))
+        JUDGE_CORE_WAIT_SECONDS.observe(time.monotonic() - start)
+        return cores
+
+    def release(self, cores: List[int]):
+        """Return CPUs to the scheduler"""
+        with self._cond:
+            self._free.extend(cores)
+            JUDGE_CORES_BUSY.set(len(self.cpus) - len(self._free))
+            self._cond.notify_all()
+
+
+def default_cpus(configured: str) -> List[int]:
+    """CPUs to schedule on: the configured list, or every CPU this process may use"""
+    if configured:
+        return parse_cpu_list(configured)
+    return sorted(os.sched_getaffinity(0))
@@ -0,0 +1,885 @@
+/*
+ * In-sandbox supervisor for the "session" execution mode.
+ *
+ * Runs the compiled solution once per listed test case inside a single
+ * long-lived sandbox and prints one result line per test to stdout:
+ *
+ *   <index> <verdict> <cpu_ms> <wall_ms> <peak_kb> <exit_code>
+ *
+ * verdict is one of OK, WA, OLE, TLE, MLE, RE, SKIP, CF, IE. Test <i> reads
+ * <tests_dir>/<i>.in, and its stderr is written to <tests_dir>/<i>.err.
+ *
+ * The solution's stdout is streamed through a pipe and checked against
+ * <tests_dir>/<i>.ans while it is produced, so the run is killed with WA on
+ * the first mismatch, and with OLE once it has written more than
+ * output_limit bytes. Checker modes:
+ *
+ *   exact   output must equal the answer, ignoring leading and trailing whitespace
+ *   tokens  whitespace-separated tokens must be equal
+ *   float   like tokens, but numeric tokens may differ by the absolute or
+ *           relative error given with -e
+ *   none    no checking; the whole output (up to output_limit) is kept
+ *
+ * The first PREVIEW_BYTES of output are written to <tests_dir>/<i>.out so
+ * callers can show them; with "none", or when there is no .ans file, all of it.
+ *
+ * With -k, the problem's own checker decides instead: the whole output is
+ * kept, and after every run that would otherwise be OK the checker is run as
+ *
+ *   <checker> <i>.in <i>.out <i>.ans
+ *
+ * with its stdout and stderr going to <tests_dir>/<i>.chk. Exit code 0 means
+ * OK, 1 or 2 (testlib's wrong answer and presentation error) mean WA, and
+ * anything else, or exceeding the -K time limit (wall-clock) or the -M memory
+ * limit, is CF: the checker failed, which is the judge's fault rather than
+ * the solution's. The checker is trusted problem code that has to read the
+ * answers, so it keeps the supervisor's user; it still gets the seccomp filter.
+ *
+ * With -i, <i>.in and <i>.ans are read from input_dir instead of tests_dir,
+ * so one read-only copy of a problem's tests can be shared by every sandbox
+ * judging it; outputs still go to tests_dir. Answers are memory-mapped rather
+ * than copied, so concurrent runs of a test share the same page cache pages.
+ *
+ * Options -a add arguments after the binary, which is looked up in PATH, so
+ * interpreted languages run as e.g. "-a /code/main.pyc python3". Runtimes that
+ * reserve far more address space than they use (the JVM) are started with -R,
+ * which leaves out the address space limit; memory is then limited by the
+ * cgroup where available and checked against peak RSS afterwards. With -s,
+ * startup_ms of CPU time, the measured cost of starting the runtime, is not
+ * counted towards the time limit or in reported times.
+ *
+ * If cpu is not negative, every run is pinned to that CPU (when the sandbox
+ * allows it) so timings are not disturbed by other runs on the node.
+ *
+ * With -u, every run switches to that unprivileged uid/gid, without
+ * supplementary groups, before exec. The caller keeps tests_dir and input_dir
+ * private (mode 0700), so the solution cannot read expected answers or other
+ * tests' inputs. The switch is tried once before the first run; if it cannot
+ * be made, e.g. the supervisor is not root or a user namespace does not map
+ * the uid, no solution is started and every test is reported as IE, an
+ * internal error of the judge.
+ *
+ * With -f, the first non-OK verdict creates <tests_dir>/.abort and every
+ * supervisor sharing tests_dir reports its remaining tests as SKIP.
+ *
+ * Every run gets a seccomp filter that denies networking, tracing and system
+ * administration syscalls. If SUPERVISOR_CGROUP names a writable cgroup v2
+ * directory, each run is placed in its own child cgroup with memory.max set,
+ * and CPU time and peak memory are taken from cgroup accounting, so processes
+ * the solution forks are counted too.
+ *
+ * The time limit applies to CPU time (user + sys). wall_limit_ms is only a
+ * safety net that kills runs which sleep or block instead of computing.
+ *
+ * usage: supervisor [-t time_limit_ms] [-w wall_limit_ms] [-m memory_limit_mb]
+ *                   [-o output_limit_bytes] [-c exact|tokens|float|none]
+ *                   [-e tolerance] [-p cpu] [-u uid] [-i input_dir] [-f]
+ *                   [-a arg]... [-s startup_ms] [-R] [-k checker] [-K checker_time_limit_ms]
+ *                   [-M checker_memory_limit_mb] <binary> <tests_dir> <index>...
+ */
+#define _GNU_SOURCE
+#include <ctype.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <grp.h>
+#include <linux/audit.h>
+#include <linux/filter.h>
+#include <linux/seccomp.h>
+#include <sched.h>
+#include <signal.h>
+#include <stddef.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/prctl.h>
+#include <sys/resource.h>
+#include <sys/stat.h>
+#include <sys/syscall.h>
+#include <sys/time.h>
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+
+#if defined(__x86_64__)
+#define SANDBOX_AUDIT_ARCH AUDIT_ARCH_X86_64
+#elif defined(__aarch64__)
+#define SANDBOX_AUDIT_ARCH AUDIT_ARCH_AARCH64
+#endif
+
+#define DENY_SYSCALL(nr) \
+    BPF_JUMP(BPF_JMP | BPF_JEQ | BPF_K, (nr), 0, 1), \
+    BPF_STMT(BPF_RET | BPF_K, SECCOMP_RET_ERRNO | EPERM)
+
+static volatile pid_t child_pid = 0;
+static volatile sig_atomic_t wall_expired = 0;
+
+static void on_alarm(int sig)
+{
+    (void)sig;
+    wall_expired = 1;
+    if (child_pid > 0)
+        kill(-child_pid, SIGKILL);
+}
+
+static long elapsed_ms(const struct timespec *start)
+{
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (now.tv_sec - start->tv_sec) * 1000 + (now.tv_nsec - start->tv_nsec) / 1000000;
+}
+
+static int write_file(const char *path, const char *value)
+{
+    int fd = open(path, O_WRONLY);
+    ssize_t written;
+
+    if (fd < 0)
+        return -1;
+    written = write(fd, value, strlen(value));
+    close(fd);
+    return written < 0 ? -1 : 0;
+}
+
+/* Read "<key> <value>" from a flat-keyed cgroup file, or the single value if key is NULL */
+static long read_cgroup_value(const char *path, const char *key)
+{
+    char line[256];
+    long value = -1;
+    size_t key_len = key ? strlen(key) : 0;
+    FILE *f = fopen(path, "r");
+
+    if (!f)
+        return -1;
+    while (fgets(line, sizeof(line), f)) {
+        if (!key) {
+            value = atol(line);
+            break;
+        }
+        if (strncmp(line, key, key_len) == 0 && line[key_len] == ' ') {
+            value = atol(line + key_len + 1);
+            break;
+        }
+    }
+    fclose(f);
+    return value;
+}
+
+static void install_seccomp(void)
+{
+#ifdef SANDBOX_AUDIT_ARCH
+    struct sock_filter filter[] = {
+        BPF_STMT(BPF_LD | BPF_W | BPF_ABS, offsetof(struct seccomp_data, arch)),
+        BPF_JUMP(BPF_JMP | BPF_JEQ | BPF_K, SANDBOX_AUDIT_ARCH, 1, 0),
+        BPF_STMT(BPF_RET | BPF_K, SECCOMP_RET_KILL),
+        BPF_STMT(BPF_LD | BPF_W | BPF_ABS, offsetof(struct seccomp_data, nr)),
+#if defined(__x86_64__)
+        /* Reject the x32 ABI, which would bypass the syscall numbers below */
+        BPF_JUMP(BPF_JMP | BPF_JGE | BPF_K, 0x40000000, 0, 1),
+        BPF_STMT(BPF_RET | BPF_K, SECCOMP_RET_KILL),
+#endif
+        DENY_SYSCALL(__NR_socket),
+        DENY_SYSCALL(__NR_socketpair),
+        DENY_SYSCALL(__NR_ptrace),
+        DENY_SYSCALL(__NR_mount),
+        DENY_SYSCALL(__NR_umount2),
+        DENY_SYSCALL(__NR_pivot_root),
+        DENY_SYSCALL(__NR_chroot),
+        DENY_SYSCALL(__NR_unshare),
+        DENY_SYSCALL(__NR_setns),
+        DENY_SYSCALL(__NR_bpf),
+        DENY_SYSCALL(__NR_perf_event_open),
+        DENY_SYSCALL(__NR_keyctl),
+        DENY_SYSCALL(__NR_add_key),
+        DENY_SYSCALL(__NR_request_key),
+        DENY_SYSCALL(__NR_init_module),
+        DENY_SYSCALL(__NR_finit_module),
+        DENY_SYSCALL(__NR_delete_module),
+        DENY_SYSCALL(__NR_kexec_load),
+        DENY_SYSCALL(__NR_reboot),
+        DENY_SYSCALL(__NR_swapon),
+        DENY_SYSCALL(__NR_swapoff),
+        BPF_STMT(BPF_RET | BPF_K, SECCOMP_RET_ALLOW),
+    };
+    struct sock_fprog program = {
+        .len = (unsigned short)(sizeof(filter) / sizeof(filter[0])),
+        .filter = filter,
+    };
+
+    prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0);
+    if (prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, &program) < 0)
+        _exit(126);
+#endif
+}
+
+static void set_limit(int resource, rlim_t value)
+{
+    struct rlimit rl;
+    rl.rlim_cur = value;
+    rl.rlim_max = value;
+    setrlimit(resource, &rl);
+}
+
+/* Arguments given with -a, plus the binary and the terminating NULL */
+#define MAX_ARGS 64
+
+/* How much of a checked run's output is kept in <i>.out for display */
+#define PREVIEW_BYTES 4096
+/* Tokens longer than this are only compared exactly in float mode */
+#define NUMBER_MAX 127
+
+enum checker_mode { CHECK_NONE, CHECK_EXACT, CHECK_TOKENS, CHECK_FLOAT };
+
+struct checker {
+    enum checker_mode mode;
+    double tolerance;
+    const char *answer;
+    size_t answer_len;
+    void *map;              /* mapping of the answer file, answer points into it */
+    size_t map_len;
+    size_t pos;             /* next unmatched byte of the answer */
+    int mismatch;
+    /* exact mode */
+    int started;            /* past leading whitespace of the output */
+    size_t pending_ws;      /* whitespace since the last matched byte */
+    int ws_diverged;        /* pending whitespace differs from the answer */
+    /* token modes */
+    int in_token;
+    size_t token_start;     /* answer token the current output token is compared with */
+    size_t token_len;
+    size_t token_pos;       /* bytes of the current output token seen so far */
+    int token_equal;        /* those bytes equal the start of the answer token */
+    char token[NUMBER_MAX + 1];
+};
+
+static int is_space(char c)
+{
+    return isspace((unsigned char)c);
+}
+
+/* Map the expected answer; without one the run is not checked */
+static void checker_init(struct checker *ck, enum checker_mode mode, double tolerance, const char *path)
+{
+    struct stat st;
+    int fd;
+
+    memset(ck, 0, sizeof(*ck));
+    ck->mode = mode;
+    ck->tolerance = tolerance;
+    if (mode == CHECK_NONE)
+        return;
+
+    fd = open(path, O_RDONLY | O_CLOEXEC);
+    if (fd < 0 || fstat(fd, &st) < 0) {
+        if (fd >= 0)
+            close(fd);
+        ck->mode = CHECK_NONE;
+        return;
+    }
+    ck->answer = "";
+    if (st.st_size > 0) {
+        ck->map = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        if (ck->map == MAP_FAILED) {
+            ck->map = NULL;
+            ck->mode = CHECK_NONE;
+            close(fd);
+            return;
+        }
+        ck->map_len = st.st_size;
+        ck->answer = ck->map;
+        ck->answer_len = st.st_size;
+    }
+    close(fd);
+
+    if (mode == CHECK_EXACT) {
+        /* Leading and trailing whitespace is ignored, compare against the stripped answer */
+        while (ck->answer_len > 0 && is_space(ck->answer[ck->answer_len - 1]))
+            ck->answer_len--;
+        while (ck->answer_len > 0 && is_space(ck->answer[0])) {
+            ck->answer++;
+            ck->answer_len--;
+        }
+    }
+}
+
+static void checker_exact_byte(struct checker *ck, char c)
+{
+    if (!ck->started) {
+        if (is_space(c))
+            return;
+        ck->started = 1;
+    }
+    if (is_space(c)) {
+        /* Could still be trailing whitespace, so a difference only counts if more output follows */
+        if (ck->pos + ck->pending_ws >= ck->answer_len || ck->answer[ck->pos + ck->pending_ws] != c)
+            ck->ws_diverged = 1;
+        ck->pending_ws++;
+        return;
+    }
+    if (ck->ws_diverged) {
+        ck->mismatch = 1;
+        return;
+    }
+    ck->pos += ck->pending_ws;
+    ck->pending_ws = 0;
+    if (ck->pos >= ck->answer_len || ck->answer[ck->pos] != c)
+        ck->mismatch = 1;
+    else
+        ck->pos++;
+}
+
+/* Parse a whole token as a number */
+static int parse_number(const char *token, double *value)
+{
+    char *end;
+
+    *value = strtod(token, &end);
+    return end != token && *end == '\0';
+}
+
+static int numbers_close(const char *actual_token, const char *expected_token, double tolerance)
+{
+    double actual, expected, diff, scale;
+
+    if (!parse_number(actual_token, &actual) || !parse_number(expected_token, &expected))
+        return 0;
+    if (actual != actual || expected != expected)
+        return 0;
+    diff = actual > expected ? actual - expected : expected - actual;
+    scale = expected < 0 ? -expected : expected;
+    return diff <= tolerance || diff <= tolerance * scale;
+}
+
+static void checker_end_token(struct checker *ck)
+{
+    char expected[NUMBER_MAX + 1];
+
+    ck->in_token = 0;
+    if (ck->token_equal && ck->token_pos == ck->token_len)
+        return;
+    if (ck->mode == CHECK_FLOAT && ck->token_pos <= NUMBER_MAX && ck->token_len <= NUMBER_MAX) {
+        memcpy(expected, ck->answer + ck->token_start, ck->token_len);
+        expected[ck->token_len] = '\0';
+        ck->token[ck->token_pos] = '\0';
+        if (numbers_close(ck->token, expected, ck->tolerance))
+            return;
+    }
+    ck->mismatch = 1;
+}
+
+static void checker_token_byte(struct checker *ck, char c)
+{
+    if (is_space(c)) {
+        if (ck->in_token)
+            checker_end_token(ck);
+        return;
+    }
+
+    if (!ck->in_token) {
+        /* Find the answer token this output token has to match */
+        while (ck->pos < ck->answer_len && is_space(ck->answer[ck->pos]))
+            ck->pos++;
+        if (ck->pos >= ck->answer_len) {
+            ck->mismatch = 1;
+            return;
+        }
+        ck->token_start = ck->pos;
+        while (ck->pos < ck->answer_len && !is_space(ck->answer[ck->pos]))
+            ck->pos++;
+        ck->token_len = ck->pos - ck->token_start;
+        ck->token_pos = 0;
+        ck->token_equal = 1;
+        ck->in_token = 1;
+    }
+
+    if (ck->token_equal && (ck->token_pos >= ck->token_len || ck->answer[ck->token_start + ck->token_pos] != c)) {
+        ck->token_equal = 0;
+        /* Without float tolerance a differing byte settles it */
+        if (ck->mode != CHECK_FLOAT) {
+            ck->mismatch = 1;
+            return;
+        }
+    }
+    if (ck->token_pos < NUMBER_MAX)
+        ck->token[ck->token_pos] = c;
+    ck->token_pos++;
+}
+
+/* Feed output to the checker, return 0 once it can no longer match */
+static int checker_feed(struct checker *ck, const char *data, size_t len)
+{
+    size_t i;
+
+    if (ck->mode == CHECK_NONE)
+        return 1;
+    for (i = 0; i < len && !ck->mismatch; i++) {
+        if (ck->mode == CHECK_EXACT)
+            checker_exact_byte(ck, data[i]);
+        else
+            checker_token_byte(ck, data[i]);
+    }
+    return !ck->mismatch;
+}
+
+/* Called at end of output, return 1 if the whole output matched */
+static int checker_finish(struct checker *ck)
+{
+    if (ck->mode == CHECK_NONE || ck->mismatch)
+        return !ck->mismatch;
+    if (ck->mode == CHECK_EXACT)
+        return ck->pos == ck->answer_len;
+
+    if (ck->in_token)
+        checker_end_token(ck);
+    while (ck->pos < ck->answer_len && is_space(ck->answer[ck->pos]))
+        ck->pos++;
+    return !ck->mismatch && ck->pos == ck->answer_len;
+}
+
+static void checker_free(struct checker *ck)
+{
+    if (ck->map)
+        munmap(ck->map, ck->map_len);
+    ck->map = NULL;
+    ck->answer = NULL;
+}
+
+/* Switch to run_uid for uid and gid with no supplementary groups, fail unless all of it applied */
+static int drop_privileges(long run_uid)
+{
+    if (setgroups(0, NULL) < 0 || setgid((gid_t)run_uid) < 0 || setuid((uid_t)run_uid) < 0)
+        return -1;
+    return getuid() == (uid_t)run_uid && geteuid() == (uid_t)run_uid
+        && getgid() == (gid_t)run_uid && getegid() == (gid_t)run_uid ? 0 : -1;
+}
+
+/* Whether a child can drop to run_uid, tried before any solution is started */
+static int can_drop_privileges(long run_uid)
+{
+    int status;
+    pid_t pid = fork();
+
+    if (pid < 0)
+        return 0;
+    if (pid == 0)
+        _exit(drop_privileges(run_uid) < 0 ? 1 : 0);
+    while (waitpid(pid, &status, 0) < 0 && errno == EINTR)
+        ;
+    return WIFEXITED(status) && WEXITSTATUS(status) == 0;
+}
+
+static void run_child(char **args, const char *tests_dir, const char *input_dir, int index,
+                      long time_limit_ms, long memory_limit_mb, int limit_address_space, int cpu,
+                      const char *cgroup, int output_fd, long run_uid)
+{
+    char path[4096];
+    int fd;
+
+    /* Own process group, so anything the solution forks is killed with it */
+    setpgid(0, 0);
+    /* Ignored signals survive exec, restore the default the solution expects */
+    signal(SIGPIPE, SIG_DFL);
+
+    if (cgroup) {
+        snprintf(path, sizeof(path), "%s/cgroup.procs", cgroup);
+        if (write_file(path, "0") < 0)
+            _exit(126);
+    }
+
+    if (cpu >= 0) {
+        cpu_set_t set;
+        CPU_ZERO(&set);
+        CPU_SET(cpu, &set);
+        sched_setaffinity(0, sizeof(set), &set);
+    }
+
+    snprintf(path, sizeof(path), "%s/%d.in", input_dir, index);
+    fd = open(path, O_RDONLY);
+    if (fd < 0 || dup2(fd, STDIN_FILENO) < 0)
+        _exit(127);
+    close(fd);
+
+    if (dup2(output_fd, STDOUT_FILENO) < 0)
+        _exit(127);
+    close(output_fd);
+
+    snprintf(path, sizeof(path), "%s/%d.err", tests_dir, index);
+    fd = open(path, O_WRONLY | O_CREAT | O_TRUNC, 0644);
+    if (fd < 0 || dup2(fd, STDERR_FILENO) < 0)
+        _exit(127);
+    close(fd);
+
+    /* Everything in tests_dir and input_dir is opened, drop to a user that cannot read the answers */
+    if (run_uid >= 0 && drop_privileges(run_uid) < 0)
+        _exit(126);
+
+    /* CPU limit is rounded up to whole seconds; the exact check happens in the parent. */
+    set_limit(RLIMIT_CPU, (rlim_t)(time_limit_ms / 1000 + 1));
+    if (limit_address_space)
+        set_limit(RLIMIT_AS, (rlim_t)memory_limit_mb * 1024 * 1024);
+    set_limit(RLIMIT_STACK, (rlim_t)memory_limit_mb * 1024 * 1024);
+    set_limit(RLIMIT_CORE, 0);
+    install_seccomp();
+    execvp(args[0], args);
+    _exit(127);
+}
+
+/*
+ * Run the problem's checker on the output of test index, after the solution has exited.
+ * Returns "OK", "WA" or "CF" if the checker itself failed.
+ */
+static const char *run_checker(const char *checker, const char *tests_dir, const char *input_dir, int index,
+                               long time_limit_ms, long memory_limit_mb, int cpu)
+{
+    char in_path[4096], out_path[4096], ans_path[4096], chk_path[4096];
+    struct itimerval timer;
+    int status = 0;
+    pid_t pid;
+
+    snprintf(in_path, sizeof(in_path), "%s/%d.in", input_dir, index);
+    snprintf(out_path, sizeof(out_path), "%s/%d.out", tests_dir, index);
+    snprintf(ans_path, sizeof(ans_path), "%s/%d.ans", input_dir, index);
+    snprintf(chk_path, sizeof(chk_path), "%s/%d.chk", tests_dir, index);
+
+    wall_expired = 0;
+    pid = fork();
+    if (pid < 0)
+        return "CF";
+    if (pid == 0) {
+        char *args[] = { (char *)checker, in_path, out_path, ans_path, NULL };
+        int fd;
+
+        setpgid(0, 0);
+        signal(SIGPIPE, SIG_DFL);
+        if (cpu >= 0) {
+            cpu_set_t set;
+            CPU_ZERO(&set);
+            CPU_SET(cpu, &set);
+            sched_setaffinity(0, sizeof(set), &set);
+        }
+
+        fd = open("/dev/null", O_RDONLY);
+        if (fd < 0 || dup2(fd, STDIN_FILENO) < 0)
+            _exit(127);
+        close(fd);
+        fd = open(chk_path, O_WRONLY | O_CREAT | O_TRUNC, 0600);
+        if (fd < 0 || dup2(fd, STDOUT_FILENO) < 0 || dup2(fd, STDERR_FILENO) < 0)
+            _exit(127);
+        close(fd);
+
+        set_limit(RLIMIT_CPU, (rlim_t)(time_limit_ms / 1000 + 1));
+        set_limit(RLIMIT_AS, (rlim_t)memory_limit_mb * 1024 * 1024);
+        set_limit(RLIMIT_CORE, 0);
+        install_seccomp();
+        execv(checker, args);
+        _exit(127);
+    }
+
+    setpgid(pid, pid);
+    child_pid = pid;
+    memset(&timer, 0, sizeof(timer));
+    timer.it_value.tv_sec = time_limit_ms / 1000;
+    timer.it_value.tv_usec = (time_limit_ms % 1000) * 1000;
+    setitimer(ITIMER_REAL, &timer, NULL);
+
+    while (waitpid(pid, &status, 0) < 0 && errno == EINTR)
+        ;
+
+    memset(&timer, 0, sizeof(timer));
+    setitimer(ITIMER_REAL, &timer, NULL);
+    child_pid = 0;
+    kill(-pid, SIGKILL);
+
+    if (wall_expired || !WIFEXITED(status))
+        return "CF";
+    switch (WEXITSTATUS(status)) {
+    case 0: return "OK";
+    case 1:
+    case 2: return "WA";
+    default: return "CF";
+    }
+}
+
+/*
+ * Read the solution's output until it exits, checking it as it arrives.
+ * Returns "WA" or "OLE" if the run was cut short, NULL otherwise.
+ */
+static const char *stream_output(int pipe_fd, int preview_fd, struct checker *ck, long long output_limit)
+{
+    char buf[65536];
+    long long total = 0;
+    long long keep = ck->mode == CHECK_NONE ? output_limit : PREVIEW_BYTES;
+
+    for (;;) {
+        ssize_t n = read(pipe_fd, buf, sizeof(buf));
+
+        if (n < 0 && errno == EINTR)
+            continue;
+        if (n <= 0)
+            return NULL;
+
+        if (total + n > output_limit)
+            return "OLE";
+        if (preview_fd >= 0 && total < keep) {
+            size_t chunk = (size_t)(keep - total < n ? keep - total : n);
+            if (write(preview_fd, buf, chunk) < 0) {
+                close(preview_fd);
+                preview_fd = -1;
+            }
+        }
+        total += n;
+
+        if (!checker_feed(ck, buf, (size_t)n))
+            return "WA";
+    }
+}
+
+static enum checker_mode parse_checker(const char *name)
+{
+    if (strcmp(name, "none") == 0)
+        return CHECK_NONE;
+    if (strcmp(name, "tokens") == 0)
+        return CHECK_TOKENS;
+    if (strcmp(name, "float") == 0)
+        return CHECK_FLOAT;
+    return CHECK_EXACT;
+}
+
+int main(int argc, char **argv)
+{
+    char *args[MAX_ARGS + 2];
+    int arg_count = 0;
+    long startup_ms = 0;
+    int limit_address_space = 1;
+    const char *checker = NULL;
+    long checker_time_limit_ms = 10000;
+    long checker_memory_limit_mb = 1024;
+    const char *tests_dir;
+    const char *input_dir = NULL;
+    long time_limit_ms = 2000;
+    long memory_limit_mb = 256;
+    long wall_limit_ms = 0;
+    long long output_limit = 64LL * 1024 * 1024;
+    enum checker_mode checker_mode = CHECK_EXACT;
+    double tolerance = 1e-6;
+    int cpu = -1;
+    long run_uid = -1;
+    int fail_fast = 0;
+    const char *cgroup_root;
+    char abort_path[4096];
+    struct sigaction sa;
+    int opt;
+    int arg;
+
+    while ((opt = getopt(argc, argv, "t:w:m:o:c:e:p:u:i:fa:s:Rk:K:M:")) != -1) {
+        switch (opt) {
+        case 't': time_limit_ms = atol(optarg); break;
+        case 'w': wall_limit_ms = atol(optarg); break;
+        case 'm': memory_limit_mb = atol(optarg); break;
+        case 'o': output_limit = atoll(optarg); break;
+        case 'c': checker_mode = parse_checker(optarg); break;
+        case 'e': tolerance = atof(optarg); break;
+        case 'p': cpu = atoi(optarg); break;
+        case 'u': run_uid = atol(optarg); break;
+        case 'i': input_dir = optarg; break;
+        case 'f': fail_fast = 1; break;
+        case 'a':
+            if (arg_count < MAX_ARGS)
+                args[1 + arg_count++] = optarg;
+            break;
+        case 's': startup_ms = atol(optarg); break;
+        case 'R': limit_address_space = 0; break;
+        case 'k': checker = optarg; break;
+        case 'K': checker_time_limit_ms = atol(optarg); break;
+        case 'M': checker_memory_limit_mb = atol(optarg); break;
+        default: optind = argc; break;
+        }
+    }
+    if (argc - optind < 3) {
+        fprintf(stderr, "usage: %s [-t time_limit_ms] [-w wall_limit_ms] [-m memory_limit_mb] "
+                        "[-o output_limit_bytes] [-c exact|tokens|float|none] [-e tolerance] "
+                        "[-p cpu] [-u uid] [-i input_dir] [-f] [-a arg]... [-s startup_ms] [-R] "
+                        "[-k checker] [-K checker_time_limit_ms] [-M checker_memory_limit_mb] <binary> <tests_dir> <index>...\n", argv[0]);
+        return 2;
+    }
+    if (wall_limit_ms <= 0)
+        wall_limit_ms = time_limit_ms * 2 + 1000;
+    /* The checker reads the whole output from <i>.out */
+    if (checker)
+        checker_mode = CHECK_NONE;
+
+    args[0] = argv[optind];
+    args[1 + arg_count] = NULL;
+    tests_dir = argv[optind + 1];
+    if (!input_dir)
+        input_dir = tests_dir;
+    snprintf(abort_path, sizeof(abort_path), "%s/.abort", tests_dir);
+    cgroup_root = getenv("SUPERVISOR_CGROUP");
+    if (cgroup_root && !*cgroup_root)
+        cgroup_root = NULL;
+
+    memset(&sa, 0, sizeof(sa));
+    sa.sa_handler = on_alarm;
+    sigaction(SIGALRM, &sa, NULL);
+    /* A solution closing its stdout early must not take the supervisor down */
+    signal(SIGPIPE, SIG_IGN);
+
+    /* Never run a solution as the supervisor's user, which can read the answers */
+    if (run_uid >= 0 && !can_drop_privileges(run_uid)) {
+        fprintf(stderr, "cannot switch to uid %ld\n", run_uid);
+        for (arg = optind + 2; arg < argc; arg++)
+            printf("%d IE 0 0 0 0\n", atoi(argv[arg]));
+        return 0;
+    }
+
+    for (arg = optind + 2; arg < argc; arg++) {
+        int i = atoi(argv[arg]);
+        struct timespec start;
+        struct itimerval timer;
+        struct rusage usage;
+        struct checker ck;
+        char cgroup[4096];
+        char path[4200];
+        const char *run_cgroup = NULL;
+        const char *output_verdict;
+        int oom_killed = 0;
+        int status = 0;
+        int pipe_fds[2];
+        int preview_fd;
+        pid_t pid;
+        long cpu_ms, wall_ms, peak_kb;
+        int exit_code = 0;
+        const char *verdict;
+
+        if (fail_fast && access(abort_path, F_OK) == 0) {
+            printf("%d SKIP 0 0 0 0\n", i);
+            fflush(stdout);
+            continue;
+        }
+
+        if (cgroup_root) {
+            char limit[64];
+
+            snprintf(cgroup, sizeof(cgroup), "%s/run-%d-%d", cgroup_root, (int)getpid(), i);
+            if (mkdir(cgroup, 0755) == 0 || errno == EEXIST) {
+                snprintf(limit, sizeof(limit), "%ld", memory_limit_mb * 1024 * 1024);
+                snprintf(path, sizeof(path), "%s/memory.max", cgroup);
+                write_file(path, limit);
+                snprintf(path, sizeof(path), "%s/memory.swap.max", cgroup);
+                write_file(path, "0");
+                run_cgroup = cgroup;
+            }
+        }
+
+        snprintf(path, sizeof(path), "%s/%d.ans", input_dir, i);
+        checker_init(&ck, checker_mode, tolerance, path);
+        snprintf(path, sizeof(path), "%s/%d.out", tests_dir, i);
+        preview_fd = open(path, O_WRONLY | O_CREAT | O_TRUNC | O_CLOEXEC, 0644);
+
+        if (pipe2(pipe_fds, O_CLOEXEC) < 0) {
+            printf("%d RE 0 0 0 -1\n", i);
+            fflush(stdout);
+            checker_free(&ck);
+            if (preview_fd >= 0)
+                close(preview_fd);
+            continue;
+        }
+
+        wall_expired = 0;
+        clock_gettime(CLOCK_MONOTONIC, &start);
+
+        pid = fork();
+        if (pid < 0) {
+            printf("%d RE 0 0 0 -1\n", i);
+            fflush(stdout);
+            close(pipe_fds[0]);
+            close(pipe_fds[1]);
+            checker_free(&ck);
+            if (preview_fd >= 0)
+                close(preview_fd);
+            continue;
+        }
+        if (pid == 0) {
+            close(pipe_fds[0]);
+            run_child(args, tests_dir, input_dir, i, time_limit_ms + startup_ms, memory_limit_mb, limit_address_space,
+                      cpu, run_cgroup, pipe_fds[1], run_uid);
+        }
+
+        close(pipe_fds[1]);
+        setpgid(pid, pid);
+        child_pid = pid;
+        memset(&timer, 0, sizeof(timer));
+        timer.it_value.tv_sec = wall_limit_ms / 1000;
+        timer.it_value.tv_usec = (wall_limit_ms % 1000) * 1000;
+        setitimer(ITIMER_REAL, &timer, NULL);
+
+        /* Stop the run as soon as its output is known to be wrong or too large */
+        output_verdict = stream_output(pipe_fds[0], preview_fd, &ck, output_limit);
+        if (output_verdict)
+            kill(-pid, SIGKILL);
+        close(pipe_fds[0]);
+        if (preview_fd >= 0)
+            close(preview_fd);
+
+        while (wait4(pid, &status, 0, &usage) < 0 && errno == EINTR)
+            ;
+
+        memset(&timer, 0, sizeof(timer));
+        setitimer(ITIMER_REAL, &timer, NULL);
+        child_pid = 0;
+        kill(-pid, SIGKILL);
+
+        wall_ms = elapsed_ms(&start);
+        cpu_ms = (usage.ru_utime.tv_sec + usage.ru_stime.tv_sec) * 1000
+               + (usage.ru_utime.tv_usec + usage.ru_stime.tv_usec) / 1000;
+        peak_kb = usage.ru_maxrss;
+
+        if (run_cgroup) {
+            long value;
+
+            snprintf(path, sizeof(path), "%s/cpu.stat", run_cgroup);
+            if ((value = read_cgroup_value(path, "usage_usec")) >= 0)
+                cpu_ms = value / 1000;
+            snprintf(path, sizeof(path), "%s/memory.peak", run_cgroup);
+            if ((value = read_cgroup_value(path, NULL)) >= 0)
+                peak_kb = value / 1024;
+            snprintf(path, sizeof(path), "%s/memory.events", run_cgroup);
+            oom_killed = read_cgroup_value(path, "oom_kill") > 0;
+            rmdir(run_cgroup);
+        }
+
+        /* Runtime startup is not charged to the solution */
+        cpu_ms = cpu_ms > startup_ms ? cpu_ms - startup_ms : 0;
+
+        if (WIFEXITED(status))
+            exit_code = WEXITSTATUS(status);
+        else if (WIFSIGNALED(status))
+            exit_code = 128 + WTERMSIG(status);
+
+        /* Output verdicts win: the run was killed by us, not by a limit */
+        if (output_verdict)
+            verdict = output_verdict;
+        else if (wall_expired || cpu_ms > time_limit_ms
+            || (WIFSIGNALED(status) && WTERMSIG(status) == SIGXCPU))
+            verdict = "TLE";
+        else if (oom_killed || peak_kb > memory_limit_mb * 1024)
+            verdict = "MLE";
+        else if (exit_code != 0)
+            verdict = "RE";
+        else if (!checker_finish(&ck))
+            verdict = "WA";
+        else if (checker)
+            verdict = run_checker(checker, tests_dir, input_dir, i, checker_time_limit_ms, checker_memory_limit_mb, cpu);
+        else
+            verdict = "OK";
+        checker_free(&ck);
+
+        printf("%d %s %ld %ld %ld %d\n", i, verdict, cpu_ms, wall_ms, peak_kb, exit_code);
+        fflush(stdout);
+
+        if (fail_fast && strcmp(verdict, "OK") != 0)
+            close(open(abort_path, O_WRONLY | O_CREAT, 0644));
+    }
+
+    return 0;
+}
@@ -0,0 +1,377 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.metrics import (
+    TEST_DATA_CACHE_REQUESTS_TOTAL, TEST_DATA_CACHE_EVICTIONS_TOTAL, TEST_DATA_CACHE_BYTES, TEST_DATA_FETCH_SECONDS,
+    TEST_DATA_STAGE_REQUESTS_TOTAL, TEST_DATA_STAGE_EVICTIONS_TOTAL, TEST_DATA_STAGE_BYTES, TEST_DATA_STAGE_SECONDS
+)
+
+MANIFEST = "manifest.json"
+# Carries INTERNAL_SERVICE_TOKEN to contest-service routes serving hidden test data and checkers
+INTERNAL_TOKEN_HEADER = "X-Internal-Service-Token"
+
+
+class TestSet:
+    """Test cases of one problem stored as <index>.in / <index>.ans files in a directory"""
+
+    def __init__(self, directory: str, count: int, test_case_ids: Optional[List[Optional[str]]] = None,
+                 key: Optional[str] = None):
+        self.directory = directory
+        self.count = count
+        # contest-service ids of the test cases, for storing per-test results
+        self.test_case_ids = test_case_ids or [None] * count
+        # <problem_id>-<version> for test sets from TestDataCache, None for one-off test sets
+        self.key = key
+
+    def install(self, tests_dir: str):
+        """Copy the test files into a workspace's tests directory"""
+        for index in range(self.count):
+            for suffix in ("in", "ans"):
+                name = f"{index}.{suffix}"
+                shutil.copyfile(os.path.join(self.directory, name), os.path.join(tests_dir, name))
+
+    def expected_output(self, index: int, limit: int = 1000) -> str:
+        """Beginning of the expected output of a test, for display"""
+        with open(os.path.join(self.directory, f"{index}.ans"), "r", errors="replace") as f:
+            return f.read(limit)
+
+
+def write_test_set(directory: str, test_cases: List[Dict]) -> TestSet:
+    """Store test cases given inline (id / input_data / expected_output) as a TestSet in directory"""
+    os.makedirs(directory, exist_ok=True)
+    for index, test_case in enumerate(test_cases):
+        with open(os.path.join(directory, f"{index}.in"), "w") as f:
+            f.write(test_case["input_data"])
+        with open(os.path.join(directory, f"{index}.ans"), "w") as f:
+            f.write(test_case["expected_output"])
+    return TestSet(directory, len(test_cases), [test_case.get("id") for test_case in test_cases])
+
+
+class TestDataCache:
+    """On-disk cache of problem test data, fetched from contest-service once per test-set version
+
+    Entries are directories named <problem_id>-<version> and are evicted least
+    recently used first once the cache exceeds max_bytes. Entries in use by a
+    running execution are never evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, contest_service_url: str, fetch_timeout: int = 60, internal_token: str = ""):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.contest_service_url = contest_service_url
+        self.fetch_timeout = fetch_timeout
+        self.internal_token = internal_token
+        self._lock = threading.Lock()
+        # key -> (size in bytes, test case ids), least recently used first
+        self._entries: "OrderedDict[str, Tuple[int, List[Optional[str]]]]" = OrderedDict()
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @contextmanager
+    def open(self, problem_id: str, version: int) -> Iterator[TestSet]:
+        """Test set of a problem version, fetched first on a miss and pinned while in use"""
+        key, test_case_ids = self._ensure(problem_id, version)
+        try:
+            yield TestSet(self._path(key), len(test_case_ids), test_case_ids, key)
+        finally:
+            self._unpin(key)
+
+    def prefetch(self, problem_id: str, version: int):
+        """Fetch a test set ahead of the first submission that needs it"""
+        key, _ = self._ensure(problem_id, version, prefetch=True)
+        self._unpin(key)
+
+    def prefetch_active_contests(self):
+        """Prefetch the current test sets of every problem in active contests"""
+        contests = httpx.get(
+            f"{self.contest_service_url}/api/v1/contests/",
+            params={"active_only": True},
+            timeout=self.fetch_timeout
+        )
+        contests.raise_for_status()
+        for contest in contests.json():
+            problems = httpx.get(
+                f"{self.contest_service_url}/api/v1/problems/contest/{contest['id']}",
+                timeout=self.fetch_timeout
+            )
+            problems.raise_for_status()
+            for problem in problems.json():
+                try:
+                    self.prefetch(problem["id"], problem["test_set_version"])
+                except Exception as e:
+                    print(f"Warning: Could not prefetch tests of problem {problem['id']}: {e}")
+
+    def _ensure(self, problem_id: str, version: int, prefetch: bool = False) -> Tuple[str, List[Optional[str]]]:
+        """Make a test set available locally and pin it, return its key and test case ids"""
+        key = self._key(problem_id, version)
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+
+        # Concurrent executions of a new problem wait for a single download
+        with fetch_lock:
+            with self._lock:
+                cached = self._lookup(problem_id, version)
+                if cached is not None:
+                    self._entries.move_to_end(cached)
+                    self._pins[cached] = self._pins.get(cached, 0) + 1
+            if cached is not None:
+                if not prefetch:
+                    TEST_DATA_CACHE_REQUESTS_TOTAL.labels(result="hit").inc()
+                # Keep modification time as the recency order across restarts
+                os.utime(self._path(cached))
+                return cached, self._entries[cached][1]
+
+            if not prefetch:
+                TEST_DATA_CACHE_REQUESTS_TOTAL.labels(result="miss").inc()
+            return self._fetch(problem_id, version)
+
+    def _lookup(self, problem_id: str, version: int) -> Optional[str]:
+        """Key of the cached version, or else of the newest cached later version (lock held)
+
+        Submissions queued before their problem's tests changed are judged
+        against the newer tests, which is what contest-service serves anyway.
+        """
+        key = self._key(problem_id, version)
+        if key in self._entries:
+            return key
+        prefix = f"{problem_id}-"
+        newer = [
+            (int(cached[len(prefix):]), cached) for cached in self._entries
+            if cached.startswith(prefix) and int(cached[len(prefix):]) > version
+        ]
+        return max(newer)[1] if newer else None
+
+    def _fetch(self, problem_id: str, version: int) -> Tuple[str, List[Optional[str]]]:
+        start = time.monotonic()
+        response = httpx.get(
+            f"{self.contest_service_url}/api/v1/problems/{problem_id}/test-set/data",
+            headers={INTERNAL_TOKEN_HEADER: self.internal_token},
+            timeout=self.fetch_timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        TEST_DATA_FETCH_SECONDS.observe(time.monotonic() - start)
+        if data["version"] != version:
+            # Tests changed since the submission was queued, judge against the current ones
+            print(f"Warning: Problem {problem_id} test set is version {data['version']}, expected {version}")
+
+        key = self._key(problem_id, data["version"])
+        # Write under a temporary name so readers never see a partial test set
+        tmp_dir = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        test_set = write_test_set(tmp_dir, data["test_cases"])
+        with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+            json.dump({"problem_id": problem_id, "version": data["version"], "test_case_ids": test_set.test_case_ids}, f)
+        size = self._dir_size(tmp_dir)
+
+        with self._lock:
+            if key in self._entries:
+                # Fetched concurrently under the newer version's key
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_dir, self._path(key))
+                self._entries[key] = (size, test_set.test_case_ids)
+                self._total_bytes += size
+            self._entries.move_to_end(key)
+            self._pins[key] = self._pins.get(key, 0) + 1
+            self._evict()
+            TEST_DATA_CACHE_BYTES.set(self._total_bytes)
+            return key, self._entries[key][1]
+
+    def _unpin(self, key: str):
+        with self._lock:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+            self._evict()
+            TEST_DATA_CACHE_BYTES.set(self._total_bytes)
+
+    def _evict(self):
+        """Remove least recently used, unpinned entries until the cache fits (lock held)"""
+        for key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                return
+            if key in self._pins:
+                continue
+            size, _ = self._entries.pop(key)
+            self._total_bytes -= size
+            self._fetch_locks.pop(key, None)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            TEST_DATA_CACHE_EVICTIONS_TOTAL.inc()
+
+    def _load(self):
+        """Rebuild the index from disk, oldest modification time first"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if name.endswith(".tmp"):
+                    raise ValueError("partial download")
+                with open(os.path.join(path, MANIFEST)) as f:
+                    test_case_ids = json.load(f)["test_case_ids"]
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            entries.append((os.stat(path).st_mtime, name, self._dir_size(path), test_case_ids))
+        for _, name, size, test_case_ids in sorted(entries, key=lambda entry: entry[:2]):
+            self._entries[name] = (size, test_case_ids)
+            self._total_bytes += size
+        TEST_DATA_CACHE_BYTES.set(self._total_bytes)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    @staticmethod
+    def _key(problem_id: str, version: int) -> str:
+        return f"{problem_id}-{version}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+
+
+class TestStage:
+    """Read-only copies of test sets on tmpfs, shared by every sandbox judging the same problem version
+
+    A test set is copied into stage_dir by the first run that needs it, and
+    later runs point the supervisor at that copy instead of copying the tests
+    into their own workspace. Entries are reference-counted; once unused for
+    idle_seconds, or while the stage exceeds max_bytes, they are removed,
+    least recently used first. Directories are private to this process's user
+    and files are read-only, so solutions cannot read them and judges cannot
+    change them.
+    """
+
+    def __init__(self, stage_dir: str, max_bytes: int, idle_seconds: int):
+        self.stage_dir = stage_dir
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # key -> [size in bytes, references, monotonic time it became unused], least recently used first
+        self._entries: "OrderedDict[str, List]" = OrderedDict()
+        self._total_bytes = 0
+        self._stage_locks: Dict[str, threading.Lock] = {}
+        # Copies of a previous process are not tracked; sandboxes mount stage_dir itself, so keep it
+        os.makedirs(stage_dir, mode=0o700, exist_ok=True)
+        os.chmod(stage_dir, 0o700)
+        for name in os.listdir(stage_dir):
+            shutil.rmtree(os.path.join(stage_dir, name), ignore_errors=True)
+        TEST_DATA_STAGE_BYTES.set(0)
+
+    def start(self):
+        """Remove idle entries in the background, so an idle node gives its memory back"""
+        threading.Thread(target=self._sweep_loop, daemon=True).start()
+
+    def acquire(self, test_set: TestSet) -> str:
+        """Directory holding the staged copy of a cached test set, staged first if needed; release() it after use"""
+        key = test_set.key
+        with self._lock:
+            stage_lock = self._stage_locks.setdefault(key, threading.Lock())
+
+        # Concurrent runs of a new problem version wait for a single copy
+        with stage_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] += 1
+                    self._entries.move_to_end(key)
+            if entry is not None:
+                TEST_DATA_STAGE_REQUESTS_TOTAL.labels(result="hit").inc()
+                return self._path(key)
+
+            TEST_DATA_STAGE_REQUESTS_TOTAL.labels(result="miss").inc()
+            start = time.monotonic()
+            tmp_dir, size = self._materialize(test_set)
+            TEST_DATA_STAGE_SECONDS.observe(time.monotonic() - start)
+            with self._lock:
+                if key in self._entries:
+                    # Staged concurrently by a run that waited on an evicted entry's lock
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    self._entries[key][1] += 1
+                else:
+                    os.replace(tmp_dir, self._path(key))
+                    self._entries[key] = [size, 1, None]
+                    self._total_bytes += size
+                self._entries.move_to_end(key)
+                self._evict()
+                TEST_DATA_STAGE_BYTES.set(self._total_bytes)
+            return self._path(key)
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries[key]
+            entry[1] -= 1
+            if not entry[1]:
+                entry[2] = time.monotonic()
+            self._evict()
+            TEST_DATA_STAGE_BYTES.set(self._total_bytes)
+
+    @contextmanager
+    def open(self, test_set: TestSet) -> Iterator[str]:
+        """Staged directory of a test set, kept while in use"""
+        path = self.acquire(test_set)
+        try:
+            yield path
+        finally:
+            self.release(test_set.key)
+
+    def _materialize(self, test_set: TestSet) -> Tuple[str, int]:
+        """Copy a test set's files under a temporary name in the stage, return that directory and their size"""
+        # Renamed into place by the caller, so runs never see a partial test set
+        tmp_dir = f"{self._path(test_set.key)}.{threading.get_ident()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir, mode=0o700)
+        size = 0
+        try:
+            for index in range(test_set.count):
+                for suffix in ("in", "ans"):
+                    name = f"{index}.{suffix}"
+                    target = os.path.join(tmp_dir, name)
+                    shutil.copyfile(os.path.join(test_set.directory, name), target)
+                    os.chmod(target, 0o400)
+                    size += os.path.getsize(target)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return tmp_dir, size
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(max(1, self.idle_seconds // 2))
+            with self._lock:
+                self._evict()
+                TEST_DATA_STAGE_BYTES.set(self._total_bytes)
+
+    def _evict(self):
+        """Remove unused entries that idled too long, then least recently used ones until the stage fits (lock held)"""
+        now = time.monotonic()
+        for key in list(self._entries):
+            size, references, unused_since = self._entries[key]
+            if references:
+                continue
+            if now - unused_since >= self.idle_seconds:
+                reason = "idle"
+            elif self._total_bytes > self.max_bytes:
+                reason = "size"
+            else:
+                continue
+            del self._entries[key]
+            self._total_bytes -= size
+            self._stage_locks.pop(key, None)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            TEST_DATA_STAGE_EVICTIONS_TOTAL.labels(reason=reason).inc()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.stage_dir, key)
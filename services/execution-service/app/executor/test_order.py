@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Counts of a test are halved once it was run this often, so recent submissions weigh more
+MAX_RUNS = 1000
+# Results that count as the test catching a wrong solution
+FAILED_STATUSES = ("failed", "timeout", "error")
+
+
+class FailureStats:
+    """Failure rates of individual test cases, to run the tests most likely to fail first
+
+    Tests are identified by their contest-service id, so statistics follow a
+    test across test-set versions. At most max_tests tests are tracked, least
+    recently judged first to go. A test without statistics counts as failing
+    half of the time, so newly added tests run early.
+    """
+
+    def __init__(self, max_tests: int):
+        self.max_tests = max_tests
+        self._lock = threading.Lock()
+        # test case id -> [runs, failures], least recently judged first
+        self._tests: "OrderedDict[str, List[int]]" = OrderedDict()
+
+    def order(self, test_case_ids: List[Optional[str]]) -> List[int]:
+        """Indices of the tests, most likely to fail first; ties keep the canonical order"""
+        with self._lock:
+            rates = [self._failure_rate(test_case_id) for test_case_id in test_case_ids]
+        return sorted(range(len(test_case_ids)), key=lambda index: -rates[index])
+
+    def record(self, test_case_ids: List[Optional[str]], results: List[Dict]):
+        """Count the outcome of every test that ran; skipped tests tell nothing"""
+        with self._lock:
+            for test_case_id, result in zip(test_case_ids, results):
+                if test_case_id is None or result["status"] == "skipped":
+                    continue
+                counts = self._tests.pop(test_case_id, None) or [0, 0]
+                counts[0] += 1
+                if result["status"] in FAILED_STATUSES:
+                    counts[1] += 1
+                if counts[0] >= MAX_RUNS:
+                    counts = [counts[0] // 2, counts[1] // 2]
+                self._tests[test_case_id] = counts
+            while len(self._tests) > self.max_tests:
+                self._tests.popitem(last=False)
+
+    def _failure_rate(self, test_case_id: Optional[str]) -> float:
+        runs, failures = self._tests.get(test_case_id, (0, 0)) if test_case_id is not None else (0, 0)
+        # Smoothed, so a test that failed in its only run does not jump ahead of one failing often
+        return (failures + 1) / (runs + 2)
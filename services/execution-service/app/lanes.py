@@ -0,0 +1,75 @@
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+def lane_queue(lane: str) -> str:
+    """Queue a priority lane is published to; live contest traffic keeps SUBMISSION_QUEUE itself"""
+    return settings.SUBMISSION_QUEUE if lane == "contest" else f"{settings.SUBMISSION_QUEUE}.{lane}"
+
+
+class LaneScheduler:
+    """Weighted fair choice between priority lanes, round-robin between users within a lane
+
+    Every lane has a virtual clock that advances by 1 / weight per item taken
+    from it, and the non-empty lane with the smallest clock goes next. Under
+    contention lanes therefore get judge capacity in proportion to their
+    weights, while an idle lane's capacity goes to the others. A lane that was
+    empty resumes at the current virtual time instead of catching up on the
+    turns it missed. Within a lane users take turns, so one user's burst only
+    delays that user's own submissions.
+
+    Not thread-safe; SubmissionWorker only uses it on the connection thread.
+    """
+
+    def __init__(self, weights: Dict[str, float]):
+        for lane, weight in weights.items():
+            if weight <= 0:
+                raise ValueError(f"Lane {lane} must have a positive weight, got {weight}")
+        self.weights = weights
+        # lane -> user -> items, users in turn order
+        self._queues: Dict[str, "OrderedDict[str, Deque[Any]]"] = {lane: OrderedDict() for lane in weights}
+        self._sizes = {lane: 0 for lane in weights}
+        self._clocks = {lane: 0.0 for lane in weights}
+        self._now = 0.0
+
+    def push(self, lane: str, user: str, item: Any):
+        if not self._sizes[lane]:
+            self._clocks[lane] = max(self._clocks[lane], self._now)
+        self._queues[lane].setdefault(user, deque()).append(item)
+        self._sizes[lane] += 1
+
+    def pop(self) -> Optional[Tuple[str, Any]]:
+        """Take the next item, return (lane, item), or None if every lane is empty"""
+        waiting = [lane for lane in self._queues if self._sizes[lane]]
+        if not waiting:
+            return None
+        lane = min(waiting, key=lambda candidate: self._clocks[candidate])
+        self._now = self._clocks[lane]
+        self._clocks[lane] += 1 / self.weights[lane]
+
+        users = self._queues[lane]
+        user, items = next(iter(users.items()))
+        item = items.popleft()
+        # The user goes to the back of the lane's turn order
+        del users[user]
+        if items:
+            users[user] = items
+        self._sizes[lane] -= 1
+        return lane, item
+
+    def size(self, lane: str) -> int:
+        return self._sizes[lane]
+
+    def items(self, lane: str) -> List[Any]:
+        """Items waiting in a lane, without removing them"""
+        return [item for queued in self._queues[lane].values() for item in queued]
+
+    def clear(self) -> List[Any]:
+        """Remove and return every waiting item"""
+        items = [item for users in self._queues.values() for queued in users.values() for item in queued]
+        for lane in self._queues:
+            self._queues[lane].clear()
+            self._sizes[lane] = 0
+        return items
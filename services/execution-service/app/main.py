@@ -1,9 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
 import uvicorn
 
-from app.worker import start_worker
+from app.worker import worker, executor, run_prefetcher
+from app.custom_runs import custom_runner
+from app.routers import runs, poison
 from app.config import settings
 
 app = FastAPI(
@@ -21,6 +23,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Include routers
+app.include_router(runs.router, prefix="/api/v1/runs", tags=["runs"])
+app.include_router(poison.router, prefix="/api/v1/poison", tags=["poison"])
+
 # Prometheus metrics endpoint
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
@@ -28,21 +34,43 @@ app.mount("/metrics", metrics_app)
 @app.on_event("startup")
 async def startup_event():
     # Start background worker to process submissions (non-blocking)
-    import asyncio
     import threading
     
-    def run_worker():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(start_worker())
+    executor.start()
     
-    thread = threading.Thread(target=run_worker, daemon=True)
+    thread = threading.Thread(target=worker.run, daemon=True)
     thread.start()
+    
+    if settings.TEST_DATA_PREFETCH_INTERVAL_SECONDS > 0:
+        threading.Thread(target=run_prefetcher, daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Let running submissions finish and publish their results before sandboxes go away
+    import asyncio
+    
+    await asyncio.get_running_loop().run_in_executor(None, worker.stop, settings.WORKER_DRAIN_TIMEOUT_SECONDS + 10)
+    custom_runner.shutdown()
+    executor.shutdown()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "execution-service"}
 
+@app.get("/autoscaling")
+async def autoscaling():
+    """Judge backlog of the cluster as seen by this node, for autoscalers polling over HTTP
+    
+    desired_replicas is the number of judges that would drain the current
+    backlog within AUTOSCALE_TARGET_DRAIN_SECONDS.
+    """
+    if not worker.autoscaling:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Worker is not connected to the broker yet"
+        )
+    return worker.autoscaling
+
 @app.get("/")
 async def root():
     return {"message": "Execution Service API", "version": "1.0.0"}
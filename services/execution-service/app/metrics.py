@@ -0,0 +1,245 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Worker stages
+WORKER_STAGE_QUEUED = Gauge(
+    "execution_worker_stage_queued",
+    "Submissions waiting for a worker of a stage (compile or run)",
+    ["stage"]
+)
+WORKER_STAGE_BUSY = Gauge(
+    "execution_worker_stage_busy",
+    "Workers of a stage (compile or run) currently processing a submission",
+    ["stage"]
+)
+WORKER_STAGE_WAIT_SECONDS = Histogram(
+    "execution_worker_stage_wait_seconds",
+    "Time a submission waited for a worker of a stage (compile or run)",
+    ["stage"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Judging phases of a submission, by language and problem
+JUDGE_PHASE_SECONDS = Histogram(
+    "execution_phase_seconds",
+    "Time a submission spent in a judging phase: queue (publish to compile start), compile, "
+    "sandbox_start, test (wall time of each test run, output checked while it is produced) and run (whole run stage)",
+    ["phase", "language", "problem"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+# Priority lanes
+LANE_QUEUE_DEPTH = Gauge(
+    "execution_lane_queue_depth",
+    "Submissions ready in a priority lane's broker queue",
+    ["lane"]
+)
+LANE_WAITING = Gauge(
+    "execution_lane_waiting",
+    "Submissions of a priority lane prefetched by this node and waiting for a worker",
+    ["lane"]
+)
+LANE_WAIT_SECONDS = Histogram(
+    "execution_lane_wait_seconds",
+    "Time a prefetched submission waited for its turn, by priority lane",
+    ["lane"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+
+LANE_QUEUE_LAG_SECONDS = Histogram(
+    "execution_lane_queue_lag_seconds",
+    "Time from publishing a submission to its delivery to a judge, by priority lane",
+    ["lane"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+LANE_OLDEST_MESSAGE_AGE_SECONDS = Gauge(
+    "execution_lane_oldest_message_age_seconds",
+    "Age of the oldest submission of a priority lane waiting on this node, 0 if none",
+    ["lane"]
+)
+LANE_COMPLETED_TOTAL = Counter(
+    "execution_lane_completed_total",
+    "Submissions judged and settled, by priority lane",
+    ["lane"]
+)
+WORKER_STAGE_COMPLETED_TOTAL = Counter(
+    "execution_worker_stage_completed_total",
+    "Submissions that finished a stage (compile or run)",
+    ["stage"]
+)
+
+# Failed submissions, retried with backoff and finally parked in the poison queue
+MESSAGE_RETRIES_TOTAL = Counter(
+    "execution_message_retries_total",
+    "Submissions whose judging failed, by priority lane and outcome (retried after a delay, or poisoned)",
+    ["lane", "outcome"]
+)
+POISON_QUEUE_DEPTH = Gauge(
+    "execution_poison_queue_depth",
+    "Submissions parked in a priority lane's poison queue",
+    ["lane"]
+)
+POISON_REPLAYED_TOTAL = Counter(
+    "execution_poison_replayed_total",
+    "Poisoned submissions put back into their priority lane",
+    ["lane"]
+)
+BROKER_RECONNECTS_TOTAL = Counter(
+    "execution_broker_reconnects_total",
+    "Times the worker lost its broker connection and reconnected"
+)
+
+# Autoscaling
+BACKLOG_SUBMISSIONS = Gauge(
+    "execution_backlog_submissions",
+    "Submissions ready in the broker queues of all priority lanes"
+)
+THROUGHPUT_PER_SECOND = Gauge(
+    "execution_throughput_per_second",
+    "Submissions this node settled per second over the autoscaling window"
+)
+BACKLOG_DRAIN_SECONDS = Gauge(
+    "execution_backlog_drain_seconds",
+    "Estimated time for all judges together to drain the backlog at their recent throughput"
+)
+BACKLOG_REPLICA_SECONDS = Gauge(
+    "execution_backlog_replica_seconds",
+    "Estimated time for a single judge to drain the backlog; divided by a target drain time it gives the replicas needed"
+)
+
+# Custom-input runs
+CUSTOM_RUN_SECONDS = Histogram(
+    "execution_custom_run_seconds",
+    "Time to compile and run a custom-input run, including waiting for a worker, by outcome",
+    ["status"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+)
+CUSTOM_RUNS_REJECTED_TOTAL = Counter(
+    "execution_custom_runs_rejected_total",
+    "Custom-input runs turned away because every worker and pending slot was taken"
+)
+
+# Sandbox pool
+SANDBOX_POOL_IDLE = Gauge(
+    "execution_sandbox_pool_idle",
+    "Pre-warmed sandboxes waiting to be handed out, by language",
+    ["language"]
+)
+SANDBOX_POOL_IN_USE = Gauge(
+    "execution_sandbox_pool_in_use",
+    "Sandboxes currently handed out to executions, by language",
+    ["language"]
+)
+SANDBOX_POOL_ACQUIRE_TOTAL = Counter(
+    "execution_sandbox_pool_acquire_total",
+    "Sandbox acquisitions, by language and whether a warm sandbox was available",
+    ["language", "result"]
+)
+SANDBOX_POOL_WAIT_SECONDS = Histogram(
+    "execution_sandbox_pool_wait_seconds",
+    "Time spent acquiring a sandbox from the pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+SANDBOX_POOL_RELEASE_TOTAL = Counter(
+    "execution_sandbox_pool_release_total",
+    "Sandboxes returned to the pool, by language and whether they were recycled or replaced",
+    ["language", "outcome"]
+)
+
+# Compilation cache
+COMPILE_CACHE_REQUESTS_TOTAL = Counter(
+    "execution_compile_cache_requests_total",
+    "Compilation cache lookups, by hit or miss",
+    ["result"]
+)
+COMPILE_CACHE_EVICTIONS_TOTAL = Counter(
+    "execution_compile_cache_evictions_total",
+    "Binaries evicted from the compilation cache"
+)
+COMPILE_CACHE_BYTES = Gauge(
+    "execution_compile_cache_bytes",
+    "Total size of binaries held in the compilation cache"
+)
+
+# Compilation
+COMPILE_SECONDS = Histogram(
+    "execution_compile_seconds",
+    "Time to obtain a submission's artifact, by language, source (cache, server or sandbox) and result",
+    ["language", "path", "result"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 1.5, 2, 3, 5, 7.5, 10, 20, 30)
+)
+RUNTIME_STARTUP_SECONDS = Gauge(
+    "execution_runtime_startup_seconds",
+    "CPU time a language's runtime takes to start, measured on this node and not charged to solutions",
+    ["language"]
+)
+COMPILE_SERVER_UP = Gauge(
+    "execution_compile_server_up",
+    "Whether the warm compile server is accepting jobs"
+)
+COMPILE_SERVER_RESTARTS_TOTAL = Counter(
+    "execution_compile_server_restarts_total",
+    "Compile server restarts after it stopped answering"
+)
+
+# Core scheduling
+JUDGE_CORES_BUSY = Gauge(
+    "execution_judge_cores_busy",
+    "CPUs currently assigned to test runs"
+)
+JUDGE_CORE_WAIT_SECONDS = Histogram(
+    "execution_judge_core_wait_seconds",
+    "Time spent waiting for a free CPU before running tests",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Test data cache
+TEST_DATA_CACHE_REQUESTS_TOTAL = Counter(
+    "execution_test_data_cache_requests_total",
+    "Test data lookups by executions, by hit or miss",
+    ["result"]
+)
+TEST_DATA_CACHE_EVICTIONS_TOTAL = Counter(
+    "execution_test_data_cache_evictions_total",
+    "Test sets evicted from the local cache"
+)
+TEST_DATA_CACHE_BYTES = Gauge(
+    "execution_test_data_cache_bytes",
+    "Total size of test data held in the local cache"
+)
+TEST_DATA_FETCH_SECONDS = Histogram(
+    "execution_test_data_fetch_seconds",
+    "Time spent downloading a test set from contest-service",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+# Test data staged on tmpfs and shared by the runs of a problem
+TEST_DATA_STAGE_REQUESTS_TOTAL = Counter(
+    "execution_test_data_stage_requests_total",
+    "Runs using staged test data, by whether the test set was staged already (hit) or copied first (miss)",
+    ["result"]
+)
+TEST_DATA_STAGE_EVICTIONS_TOTAL = Counter(
+    "execution_test_data_stage_evictions_total",
+    "Staged test sets removed, by reason (idle or size)",
+    ["reason"]
+)
+TEST_DATA_STAGE_BYTES = Gauge(
+    "execution_test_data_stage_bytes",
+    "Total size of the test data staged on tmpfs"
+)
+TEST_DATA_STAGE_SECONDS = Histogram(
+    "execution_test_data_stage_seconds",
+    "Time spent copying a test set into the stage",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+# Custom checkers, compiled once per problem checker version
+CHECKER_CACHE_REQUESTS_TOTAL = Counter(
+    "execution_checker_cache_requests_total",
+    "Lookups of compiled custom checkers, by whether the checker version was compiled on this node already (hit) or fetched and compiled first (miss)",
+    ["result"]
+)
+CHECKER_FAILURES_TOTAL = Counter(
+    "execution_checker_failures_total",
+    "Tests on which a custom checker crashed, ran out of its limits or exited with an unknown code"
+)
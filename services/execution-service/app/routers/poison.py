@@ -0,0 +1,46 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.config import settings
+from app.lanes import lane_queue
+from app.metrics import POISON_REPLAYED_TOTAL
+from app.retries import PoisonQueue
+from app.schemas.poison import PoisonQueueResponse, ReplayResponse
+
+router = APIRouter()
+
+def _poison_queue(lane: str) -> PoisonQueue:
+    if lane not in settings.LANE_WEIGHTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown lane: {lane}"
+        )
+    return PoisonQueue(lane_queue(lane))
+
+async def _call(fn, *args):
+    """Run a blocking broker call off the event loop"""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Broker not available: {e}"
+        )
+
+@router.get("/{lane}", response_model=PoisonQueueResponse)
+async def inspect_poison_queue(lane: str, limit: int = Query(20, ge=1, le=500)):
+    """Show the first submissions of a lane that kept failing after every retry, leaving them queued"""
+    queue = _poison_queue(lane)
+    depth = await _call(queue.depth)
+    messages = await _call(queue.inspect, limit)
+    return PoisonQueueResponse(lane=lane, depth=depth, messages=messages)
+
+@router.post("/{lane}/replay", response_model=ReplayResponse)
+async def replay_poison_queue(lane: str, limit: int = Query(100, ge=1, le=10000)):
+    """Put the first poisoned submissions of a lane back into the lane, with fresh retries
+    
+    Meant for after the cause was fixed, e.g. a broken checker or an unavailable sandbox image.
+    """
+    replayed = await _call(_poison_queue(lane).replay, limit)
+    POISON_REPLAYED_TOTAL.labels(lane=lane).inc(replayed)
+    return ReplayResponse(lane=lane, replayed=replayed)
@@ -0,0 +1,57 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, status
+
+from app.config import settings
+from app.custom_runs import CustomRunBusy, custom_runner
+from app.schemas.run import CustomRunCreate, CustomRunResponse
+
+router = APIRouter()
+
+@router.post("/", response_model=CustomRunResponse)
+async def create_run(run_data: CustomRunCreate):
+    """Compile and run code against custom input or sample tests, without judging or storing it
+    
+    Limits are capped at CUSTOM_RUN_MAX_TIME_LIMIT_SECONDS and
+    CUSTOM_RUN_MAX_MEMORY_MB. Called by submission-service, which
+    authenticates the user.
+    """
+    if len(run_data.tests) > settings.CUSTOM_RUN_MAX_TESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.CUSTOM_RUN_MAX_TESTS} tests per run"
+        )
+    if sum(len(test.input_data.encode()) for test in run_data.tests) > settings.CUSTOM_RUN_MAX_INPUT_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Input is limited to {settings.CUSTOM_RUN_MAX_INPUT_BYTES} bytes"
+        )
+    if run_data.checker_mode == "custom" and not run_data.problem_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The custom checker mode requires problem_id"
+        )
+    
+    try:
+        future = custom_runner.submit(
+            run_data.code,
+            [test.model_dump() for test in run_data.tests],
+            time_limit_seconds=min(run_data.time_limit_seconds, settings.CUSTOM_RUN_MAX_TIME_LIMIT_SECONDS),
+            memory_limit_mb=min(run_data.memory_limit_mb, settings.CUSTOM_RUN_MAX_MEMORY_MB),
+            checker_mode=run_data.checker_mode,
+            checker_tolerance=run_data.checker_tolerance,
+            language=run_data.language,
+            checker=(run_data.problem_id, run_data.checker_version) if run_data.checker_mode == "custom" else None
+        )
+    except CustomRunBusy:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many runs in progress, try again shortly"
+        )
+    
+    result = await asyncio.wrap_future(future)
+    if result["status"] == "error":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=result["error_message"]
+        )
+    return result
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class PoisonedMessage(BaseModel):
+    submission_id: Optional[str] = None
+    retries: int
+    last_error: Optional[str] = None
+    poisoned_at: Optional[float] = None
+    published_at: Optional[int] = None
+    # Beginning of the message as queued
+    body: str
+
+class PoisonQueueResponse(BaseModel):
+    lane: str
+    depth: int
+    messages: List[PoisonedMessage] = []
+
+class ReplayResponse(BaseModel):
+    lane: str
+    replayed: int
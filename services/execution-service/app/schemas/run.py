@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class CustomRunTest(BaseModel):
+    input_data: str
+    # Given for sample tests, which are then checked; custom input only shows the output
+    expected_output: Optional[str] = None
+
+class CustomRunCreate(BaseModel):
+    code: str = Field(..., min_length=1)
+    language: str = Field(default="cpp", pattern="^(cpp|python|java)$")
+    tests: List[CustomRunTest] = Field(..., min_length=1)
+    time_limit_seconds: int = Field(default=2, ge=1)
+    memory_limit_mb: int = Field(default=256, ge=1)
+    checker_mode: Optional[str] = Field(None, pattern="^(exact|tokens|float|custom)$")
+    checker_tolerance: float = Field(default=1e-6, ge=0)
+    # Identify the problem's checker with the "custom" checker mode
+    problem_id: Optional[str] = None
+    checker_version: int = Field(default=1, ge=1)
+
+class CustomRunTestResult(BaseModel):
+    status: str
+    execution_time_ms: Optional[int] = None
+    memory_used_mb: Optional[float] = None
+    output: Optional[str] = None
+    expected_output: Optional[str] = None
+    error_message: Optional[str] = None
+
+class CustomRunResponse(BaseModel):
+    status: str
+    error_message: Optional[str] = None
+    tests: List[CustomRunTestResult] = []
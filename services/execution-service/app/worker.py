@@ -1,72 +1,485 @@
+import functools
+import math
 import pika
 import json
-import httpx
-import asyncio
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
 from app.config import settings
-from app.executor.cpp_executor import CppExecutor
+from app.executor.checkers import CheckerCache
+from app.executor.executor import Executor
+from app.executor.test_data import TestDataCache, TestSet, write_test_set
+from app.lanes import LaneScheduler, lane_queue
+from app.metrics import (
+    JUDGE_PHASE_SECONDS, WORKER_STAGE_QUEUED, WORKER_STAGE_BUSY, WORKER_STAGE_WAIT_SECONDS, WORKER_STAGE_COMPLETED_TOTAL,
+    LANE_QUEUE_DEPTH, LANE_WAITING, LANE_WAIT_SECONDS, LANE_QUEUE_LAG_SECONDS, LANE_OLDEST_MESSAGE_AGE_SECONDS,
+    LANE_COMPLETED_TOTAL, BACKLOG_SUBMISSIONS, THROUGHPUT_PER_SECOND, BACKLOG_DRAIN_SECONDS, BACKLOG_REPLICA_SECONDS,
+    MESSAGE_RETRIES_TOTAL, POISON_QUEUE_DEPTH, BROKER_RECONNECTS_TOTAL
+)
+from app.retries import declare_retry_queues, poison_queue, retry_later
 
-executor = CppExecutor()
+executor = Executor()
+test_data = TestDataCache(
+    settings.TEST_DATA_CACHE_DIR,
+    settings.TEST_DATA_CACHE_MAX_BYTES,
+    settings.CONTEST_SERVICE_URL,
+    settings.TEST_DATA_FETCH_TIMEOUT_SECONDS,
+    settings.INTERNAL_SERVICE_TOKEN
+)
+checkers = CheckerCache(
+    executor,
+    settings.CONTEST_SERVICE_URL,
+    settings.CHECKER_CACHE_MAX_ENTRIES,
+    settings.TEST_DATA_FETCH_TIMEOUT_SECONDS,
+    settings.INTERNAL_SERVICE_TOKEN
+)
 
-async def process_submission(message_body: str):
-    """Process a submission from the queue"""
-    try:
-        data = json.loads(message_body)
-        submission_id = data["submission_id"]
-        problem_id = data["problem_id"]
-        code = data["code"]
-        test_cases = data["test_cases"]
-        
-        # Execute code
-        result = executor.execute(
-            code=code,
-            test_cases=test_cases,
-            time_limit_seconds=2,  # Default, should come from problem config
-            memory_limit_mb=256  # Default, should come from problem config
-        )
-        
-        # Update submission status via submission service
-        # In a real implementation, this would be done via HTTP or message queue
-        print(f"Submission {submission_id} processed: {result['status']}")
-        
-        return result
-    except Exception as e:
-        print(f"Error processing submission: {e}")
-        return None
+@contextmanager
+def open_test_set(data: Dict) -> Iterator[TestSet]:
+    """Test set a queued submission is judged against"""
+    if "test_cases" in data:
+        # Message from a publisher that still embeds the tests
+        with tempfile.TemporaryDirectory() as directory:
+            yield write_test_set(directory, data["test_cases"])
+        return
+    with test_data.open(data["problem_id"], data["test_set_version"]) as test_set:
+        yield test_set
 
-async def start_worker():
-    """Start the message queue worker"""
-    connection = None
-    channel = None
-    
+def run_prefetcher():
+    """Keep the test data of active contests in the local cache"""
     while True:
         try:
-            # Connect to RabbitMQ
-            connection = pika.BlockingConnection(
-                pika.URLParameters(settings.RABBITMQ_URL)
+            test_data.prefetch_active_contests()
+        except Exception as e:
+            print(f"Warning: Test data prefetch failed: {e}")
+        time.sleep(settings.TEST_DATA_PREFETCH_INTERVAL_SECONDS)
+
+# Per-test fields kept in result events; expected outputs are known to contest-service already
+RESULT_TEST_FIELDS = ("status", "execution_time_ms", "memory_used_mb", "actual_output", "error_message")
+
+def compile_submission(message_body: str) -> Tuple[Dict, Dict]:
+    """Compile stage: build a queued submission's binary, return the message and the compile outcome
+    
+    For problems with a custom checker the outcome also carries the compiled
+    checker, built here on the first submission of each checker version.
+    """
+    data = json.loads(message_body)
+    timestamps = data.setdefault("phase_timestamps", {})
+    timestamps["compile_started"] = time.time()
+    if "queued" in timestamps:
+        _observe_phase(data, "queue", timestamps["compile_started"] - timestamps["queued"])
+    compiled = executor.compile(data["code"], data.get("language", "cpp"))
+    if compiled["status"] == "compiled" and data.get("checker_mode") == "custom":
+        compiled["checker"] = checkers.artifact(data["problem_id"], data.get("checker_version", 1))
+    timestamps["compiled"] = time.time()
+    _observe_phase(data, "compile", timestamps["compiled"] - timestamps["compile_started"])
+    return data, compiled
+
+def _observe_phase(data: Dict, phase: str, seconds: float):
+    JUDGE_PHASE_SECONDS.labels(
+        phase=phase, language=data.get("language", "cpp"), problem=data["problem_id"]
+    ).observe(max(0.0, seconds))
+
+def run_submission(data: Dict, compiled: Dict) -> Dict:
+    """Run stage: judge a compiled submission against its tests, return the result event to publish"""
+    submission_id = data["submission_id"]
+    time_limit_seconds = data.get("time_limit_seconds", 2)
+    judging_policy = data.get("judging_policy", settings.DEFAULT_JUDGING_POLICY)
+    timestamps = data.setdefault("phase_timestamps", {})
+    timestamps["run_started"] = time.time()
+    
+    with open_test_set(data) as test_set:
+        if compiled["status"] == "compiled":
+            result = executor.run(
+                compiled["artifact"],
+                test_set=test_set,
+                time_limit_seconds=time_limit_seconds,
+                memory_limit_mb=data.get("memory_limit_mb", 256),
+                judging_policy=judging_policy,
+                checker_mode=data.get("checker_mode", "exact"),
+                checker_tolerance=data.get("checker_tolerance", 1e-6),
+                language=data.get("language", "cpp"),
+                checker_artifact=compiled.get("checker")
             )
+        else:
+            result = {
+                "status": compiled["status"],
+                "error_message": compiled["error_message"],
+                "test_cases_passed": 0,
+                "total_test_cases": test_set.count,
+                "results": []
+            }
+        test_case_ids = test_set.test_case_ids
+    
+    if result["status"] == "error":
+        # The judge itself failed (e.g. no sandbox), leave the submission to be retried
+        raise RuntimeError(result["error_message"])
+    
+    timestamps["judged"] = time.time()
+    if compiled["status"] == "compiled":
+        _observe_phase(data, "run", timestamps["judged"] - timestamps["run_started"])
+        _observe_phase(data, "sandbox_start", result.get("sandbox_start_seconds", 0))
+        for test in result["results"]:
+            if test["status"] != "skipped":
+                _observe_phase(data, "test", test.get("wall_time_ms", test.get("execution_time_ms", 0)) / 1000)
+    
+    print(f"Submission {submission_id} processed: {result['status']}")
+    return {
+        "submission_id": submission_id,
+        "status": result["status"],
+        "test_cases_passed": result["test_cases_passed"],
+        "total_test_cases": result["total_test_cases"],
+        "execution_time_ms": result.get("execution_time_ms"),
+        "memory_used_mb": result.get("memory_used_mb"),
+        "error_message": result.get("error_message"),
+        # Echoed for scoring, which runs after submission-service stored the result
+        "points": data.get("points", 100),
+        "time_limit_ms": time_limit_seconds * 1000,
+        "judging_policy": judging_policy,
+        # Results of a rejudge are held back by submission-service until the whole job is judged
+        "rejudge_job_id": data.get("rejudge_job_id"),
+        # Lets submission-service drop a result a rejudge on newer tests has replaced already
+        "test_set_version": data.get("test_set_version"),
+        "language": data.get("language", "cpp"),
+        "phase_timestamps": timestamps,
+        "results": [
+            {"test_case_id": test_case_id, **{field: test[field] for field in RESULT_TEST_FIELDS if test.get(field) is not None}}
+            for test_case_id, test in zip(test_case_ids, result["results"])
+        ]
+    }
+
+class SubmissionWorker:
+    """Consumes submissions and judges them in a compile stage and a run stage
+    
+    Each stage has its own queue and thread pool (COMPILE_WORKERS and
+    RUN_WORKERS), and the binary passes from one to the other through the
+    executor's artifact store, so a burst of slow compiles does not hold up
+    runs and a burst of time limit exceeded runs does not hold up compiles.
+    Submissions that fail to compile skip the run stage.
+    
+    Submissions arrive on one queue per priority lane (LANE_WEIGHTS) and wait
+    in a LaneScheduler until there is room in the pipeline, so at most
+    COMPILE_WORKERS + RUN_WORKERS are in the stages at once and a backlog in one
+    lane, such as a large rejudge, cannot hold up live contest submissions.
+    
+    pika connections are not thread-safe, so judging runs on the pools while
+    publishing and acknowledging stay on the connection's thread. A submission
+    is acknowledged only after its result was confirmed by the broker, so work
+    interrupted by a crash or restart is redelivered. A submission whose
+    judging fails is acknowledged once it was republished to a delay queue
+    (see retries.py), so it comes back after a backoff without holding up the
+    lane, and ends up in the lane's poison queue if it keeps failing.
+    
+    Every LANE_DEPTH_INTERVAL_SECONDS the worker estimates how far behind
+    judging is: the backlog in the broker, the age of the oldest submission
+    waiting here and the time to drain the backlog at the recent throughput.
+    The estimate is exported as metrics and kept in autoscaling for GET
+    /autoscaling.
+    """
+    
+    def __init__(self):
+        self._compile_pool = ThreadPoolExecutor(max_workers=settings.COMPILE_WORKERS, thread_name_prefix="compile")
+        self._run_pool = ThreadPoolExecutor(max_workers=settings.RUN_WORKERS, thread_name_prefix="run")
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+        # Submissions handed to the pools whose judging has not finished. Kept across reconnects, as
+        # the pools are: judging goes on after its connection is lost, and still takes up workers.
+        self._in_flight = 0
+        # Settles queued on the current connection and not yet run
+        self._settling = 0
+        self._in_flight_lock = threading.Lock()
+        # Deliveries waiting for room in the pipeline, only touched on the connection thread
+        self._lanes = LaneScheduler(settings.LANE_WEIGHTS)
+        # When submissions were settled within the autoscaling window, only touched on the connection thread
+        self._settled_at: Deque[float] = deque()
+        self._connected_at = 0.0
+        # Latest backlog estimate, replaced as a whole
+        self.autoscaling: Dict = {}
+    
+    def run(self):
+        """Consume until stop() is called, reconnecting with exponential backoff on broker errors"""
+        delay = 1
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self._consume()
+                except Exception as e:
+                    if self._stopping.is_set():
+                        break
+                    # A connection that lasted a while starts backing off afresh
+                    if self._connected_at and time.monotonic() - self._connected_at > settings.RECONNECT_MAX_DELAY_SECONDS:
+                        delay = 1
+                    print(f"Worker error: {e}, reconnecting in {delay} seconds...")
+                    BROKER_RECONNECTS_TOTAL.inc()
+                    self._stopping.wait(delay)
+                    delay = min(delay * 2, settings.RECONNECT_MAX_DELAY_SECONDS)
+        finally:
+            self._compile_pool.shutdown(wait=False, cancel_futures=True)
+            self._run_pool.shutdown(wait=False, cancel_futures=True)
+            self._stopped.set()
+    
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Stop taking submissions and wait for running ones to be settled"""
+        self._stopping.set()
+        return self._stopped.wait(timeout)
+    
+    def _consume(self):
+        connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
+        self._connected_at = time.monotonic()
+        # Settles queued on a previous connection never run
+        with self._in_flight_lock:
+            self._settling = 0
+        # Delivery tags of a previous connection are void, the broker redelivers those
+        self._lanes.clear()
+        try:
             channel = connection.channel()
-            channel.queue_declare(queue=settings.SUBMISSION_QUEUE, durable=True)
+            channel.queue_declare(queue=settings.RESULT_QUEUE, durable=True)
+            # basic_publish waits for the broker to confirm the result is stored
+            channel.confirm_delivery()
+            # Applies to each lane's consumer separately
+            channel.basic_qos(prefetch_count=settings.WORKER_PREFETCH)
+            consumer_tags = []
+            for lane in settings.LANE_WEIGHTS:
+                channel.queue_declare(queue=lane_queue(lane), durable=True)
+                declare_retry_queues(channel, lane_queue(lane))
+                consumer_tags.append(channel.basic_consume(
+                    queue=lane_queue(lane),
+                    on_message_callback=functools.partial(self._on_message, connection, lane)
+                ))
             
-            print(f"Worker started, listening on queue: {settings.SUBMISSION_QUEUE}")
+            print(f"Worker started, listening on lanes: {', '.join(settings.LANE_WEIGHTS)}")
+            depth_updated = 0.0
+            while not self._stopping.is_set():
+                connection.process_data_events(time_limit=1)
+                # Judging left over from a lost connection settles nowhere, admit submissions in its place
+                self._dispatch(connection, channel)
+                if time.monotonic() - depth_updated >= settings.LANE_DEPTH_INTERVAL_SECONDS:
+                    self._update_backlog(channel)
+                    depth_updated = time.monotonic()
             
-            # Consume messages
-            def callback(ch, method, properties, body):
-                asyncio.create_task(process_submission(body.decode()))
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-            
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(
-                queue=settings.SUBMISSION_QUEUE,
-                on_message_callback=callback
-            )
-            
-            channel.start_consuming()
-        except Exception as e:
-            print(f"Worker error: {e}, retrying in 5 seconds...")
-            await asyncio.sleep(5)
+            # Drain: take no new submissions, hand back the ones still waiting for a
+            # worker and settle the ones already being judged. Anything left
+            # unacknowledged is redelivered once the connection closes.
+            for consumer_tag in consumer_tags:
+                channel.basic_cancel(consumer_tag)
+            for method, *_ in self._lanes.clear():
+                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            self._update_lane_gauges()
+            deadline = time.monotonic() + settings.WORKER_DRAIN_TIMEOUT_SECONDS
+            while (self._in_flight or self._settling) and time.monotonic() < deadline:
+                connection.process_data_events(time_limit=1)
+            print(f"Worker stopped, {self._in_flight} submissions left for redelivery")
         finally:
-            if channel and channel.is_open:
-                channel.close()
-            if connection and not connection.is_closed:
+            if connection.is_open:
                 connection.close()
+    
+    def _on_message(self, connection, lane: str, channel, method, properties, body: bytes):
+        try:
+            user = str(json.loads(body).get("user_id", ""))
+        except (ValueError, AttributeError):
+            user = ""
+        # Publishers stamp submissions with the time they were queued
+        published_at = properties.timestamp or time.time()
+        LANE_QUEUE_LAG_SECONDS.labels(lane=lane).observe(max(0.0, time.time() - published_at))
+        self._lanes.push(lane, user, (method, properties, body, time.monotonic(), published_at))
+        self._dispatch(connection, channel)
+    
+    def _dispatch(self, connection, channel):
+        """Move waiting submissions into the pipeline while it has room, in lane schedule order"""
+        while self._in_flight < settings.COMPILE_WORKERS + settings.RUN_WORKERS:
+            picked = self._lanes.pop()
+            if picked is None:
+                break
+            lane, (method, properties, body, received_at, _) = picked
+            LANE_WAIT_SECONDS.labels(lane=lane).observe(time.monotonic() - received_at)
+            self._start(connection, channel, lane, method, properties, body)
+        self._update_lane_gauges()
+    
+    def _start(self, connection, channel, lane: str, method, properties, body: bytes):
+        with self._in_flight_lock:
+            self._in_flight += 1
+        
+        def done(future):
+            with self._in_flight_lock:
+                # Freed before the settle runs, so the settle admits the next submission
+                self._in_flight -= 1
+                try:
+                    connection.add_callback_threadsafe(
+                        lambda: self._settle(connection, channel, lane, method, properties, body, future)
+                    )
+                    self._settling += 1
+                except Exception:
+                    # Connection is gone, the broker redelivers the submission
+                    pass
+        
+        def compiled(future):
+            try:
+                data, outcome = future.result()
+            except Exception:
+                done(future)
+                return
+            if outcome["status"] == "compiled":
+                self._submit("run", self._run_pool, run_submission, data, outcome).add_done_callback(done)
+                return
+            # Nothing to run, finish on the compile thread
+            finished = Future()
+            try:
+                finished.set_result(run_submission(data, outcome))
+            except Exception as e:
+                finished.set_exception(e)
+            done(finished)
+        
+        self._submit("compile", self._compile_pool, compile_submission, body.decode()).add_done_callback(compiled)
+    
+    def _submit(self, stage: str, pool: ThreadPoolExecutor, fn, *args) -> Future:
+        """Queue work for a stage's pool, tracking queue depth, wait time and busy workers"""
+        queued_at = time.monotonic()
+        WORKER_STAGE_QUEUED.labels(stage=stage).inc()
+        
+        def task():
+            WORKER_STAGE_QUEUED.labels(stage=stage).dec()
+            WORKER_STAGE_WAIT_SECONDS.labels(stage=stage).observe(time.monotonic() - queued_at)
+            WORKER_STAGE_BUSY.labels(stage=stage).inc()
+            try:
+                return fn(*args)
+            finally:
+                WORKER_STAGE_BUSY.labels(stage=stage).dec()
+                WORKER_STAGE_COMPLETED_TOTAL.labels(stage=stage).inc()
+        
+        return pool.submit(task)
+    
+    def _settle(self, connection, channel, lane: str, method, properties, body: bytes, future):
+        """Publish the result, acknowledge the submission and admit the next one (connection thread)"""
+        with self._in_flight_lock:
+            self._settling -= 1
+        self._settled_at.append(time.monotonic())
+        LANE_COMPLETED_TOTAL.labels(lane=lane).inc()
+        try:
+            self._publish_result(channel, lane, method, properties, body, future)
+        finally:
+            if not self._stopping.is_set():
+                self._dispatch(connection, channel)
+    
+    def _update_lane_gauges(self):
+        for lane in settings.LANE_WEIGHTS:
+            LANE_WAITING.labels(lane=lane).set(self._lanes.size(lane))
+    
+    def _update_backlog(self, channel):
+        """Export lane queue depths and estimate how long judging the backlog takes (connection thread)
+        
+        The broker's consumer count tells how many judges share the backlog.
+        Throughput is this node's; while there is a backlog judges are busy,
+        so it approximates the capacity of one judge.
+        """
+        now = time.monotonic()
+        lanes = {}
+        backlog = 0
+        judges = 1
+        for lane in settings.LANE_WEIGHTS:
+            declared = channel.queue_declare(queue=lane_queue(lane), durable=True, passive=True)
+            LANE_QUEUE_DEPTH.labels(lane=lane).set(declared.method.message_count)
+            poisoned = channel.queue_declare(queue=poison_queue(lane_queue(lane)), durable=True, passive=True)
+            POISON_QUEUE_DEPTH.labels(lane=lane).set(poisoned.method.message_count)
+            backlog += declared.method.message_count
+            judges = max(judges, declared.method.consumer_count)
+            
+            waiting = self._lanes.items(lane)
+            oldest_age = max((time.time() - published_at for *_, published_at in waiting), default=0.0)
+            LANE_OLDEST_MESSAGE_AGE_SECONDS.labels(lane=lane).set(max(0.0, oldest_age))
+            lanes[lane] = {
+                "ready": declared.method.message_count,
+                "waiting": len(waiting),
+                "oldest_message_age_seconds": round(max(0.0, oldest_age), 3)
+            }
+        
+        while self._settled_at and self._settled_at[0] < now - settings.AUTOSCALE_WINDOW_SECONDS:
+            self._settled_at.popleft()
+        window = min(settings.AUTOSCALE_WINDOW_SECONDS, now - self._connected_at)
+        throughput = len(self._settled_at) / window if self._settled_at and window > 0 else None
+        replica_seconds = backlog / (throughput or settings.AUTOSCALE_ASSUMED_THROUGHPUT)
+        drain_seconds = replica_seconds / judges
+        
+        BACKLOG_SUBMISSIONS.set(backlog)
+        THROUGHPUT_PER_SECOND.set(throughput or 0)
+        BACKLOG_REPLICA_SECONDS.set(replica_seconds)
+        BACKLOG_DRAIN_SECONDS.set(drain_seconds)
+        self.autoscaling = {
+            "backlog": backlog,
+            "in_flight": self._in_flight,
+            "lanes": lanes,
+            "judges": judges,
+            "throughput_per_second": round(throughput, 3) if throughput is not None else None,
+            "estimated_drain_seconds": round(drain_seconds, 1),
+            "replica_seconds": round(replica_seconds, 1),
+            "desired_replicas": max(1, math.ceil(replica_seconds / settings.AUTOSCALE_TARGET_DRAIN_SECONDS)),
+            "updated_at": time.time()
+        }
+    
+    def _publish_result(self, channel, lane: str, method, properties, body: bytes, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error processing submission: {e}")
+            self._retry(channel, lane, method, properties, body, e)
+            return
+        
+        try:
+            channel.basic_publish(
+                exchange="",
+                routing_key=settings.RESULT_QUEUE,
+                body=json.dumps(result),
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                )
+            )
+        except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+            print(f"Result of submission {result['submission_id']} not stored: {e}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+    
+    def _retry(self, channel, lane: str, method, properties, body: bytes, error: Exception):
+        """Hand a failed submission to its lane's next delay queue or the poison queue (connection thread)"""
+        try:
+            outcome = retry_later(channel, lane_queue(lane), properties, body, error)
+        except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+            # Not taken over by the broker, so keep the original and try it again
+            print(f"Failed submission could not be queued for a retry: {e}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        MESSAGE_RETRIES_TOTAL.labels(lane=lane, outcome=outcome).inc()
+        if outcome == "poisoned":
+            self._report_rejudge_failure(channel, body, error)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+    
+    def _report_rejudge_failure(self, channel, body: bytes, error: Exception):
+        """Tell submission-service that a rejudge lost a submission to the poison queue, so the job fails (connection thread)"""
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return
+        if not isinstance(data, dict) or not data.get("rejudge_job_id"):
+            return
+        try:
+            channel.basic_publish(
+                exchange="",
+                routing_key=settings.RESULT_QUEUE,
+                body=json.dumps({
+                    "type": "rejudge_failed",
+                    "rejudge_job_id": data["rejudge_job_id"],
+                    "submission_id": data.get("submission_id"),
+                    "error_message": str(error)[:1000]
+                }),
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                )
+            )
+        except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+            # The job still fails once REJUDGE_TIMEOUT_SECONDS have passed
+            print(f"Failure of rejudge {data['rejudge_job_id']} not reported: {e}")
 
+worker = SubmissionWorker()
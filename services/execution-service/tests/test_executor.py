@@ -0,0 +1,41 @@
+from app.config import settings
+from app.executor.executor import Executor
+
+parse = Executor._parse_supervisor_output
+
+
+def build(report):
+    return Executor._build_result("/nonexistent", 0, report, None, 2, 256)
+
+def test_parse_supervisor_output():
+    reports = parse("0 OK 12 15 2048 0\n1 TLE 2000 2100 4096 0\n")
+    assert reports == {
+        0: {"verdict": "OK", "cpu_ms": 12, "wall_ms": 15, "peak_kb": 2048, "exit_code": 0},
+        1: {"verdict": "TLE", "cpu_ms": 2000, "wall_ms": 2100, "peak_kb": 4096, "exit_code": 0},
+    }
+
+def test_parse_supervisor_output_skips_other_lines():
+    # Anything else on stdout is not a report
+    reports = parse("warning: something\n3 RE 1 1 100 139\n\nx OK 1 1 1 0\n2 OK 1 1\n0 MLE 5 5 300000 0\n")
+    assert sorted(reports) == [0, 3]
+    assert reports[3]["exit_code"] == 139
+    assert reports[0]["verdict"] == "MLE"
+
+def test_parse_supervisor_output_internal_error():
+    reports = parse("0 IE 0 0 0 0\n1 IE 0 0 0 0\n")
+    assert [report["verdict"] for report in reports.values()] == ["IE", "IE"]
+
+def test_internal_error_is_a_judge_error():
+    result = build(parse("0 IE 0 0 0 0")[0])
+    assert result["status"] == "error"
+    assert result["judge_error"] is True
+    assert str(settings.SANDBOX_RUN_UID) in result["error_message"]
+
+def test_missing_report_is_a_timeout():
+    # The supervisor never reached the test, the sandbox ran out of time
+    result = build(None)
+    assert result["status"] == "timeout"
+    assert result["execution_time_ms"] == 2000
+
+def test_skipped_test():
+    assert build(parse("0 SKIP 0 0 0 0")[0])["status"] == "skipped"
@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pytest
+
+from app.lanes import LaneScheduler
+
+
+def drain(scheduler, count=None):
+    popped = []
+    while count is None or len(popped) < count:
+        picked = scheduler.pop()
+        if picked is None:
+            break
+        popped.append(picked)
+    return popped
+
+def test_pop_empty():
+    scheduler = LaneScheduler({"contest": 1})
+    assert scheduler.pop() is None
+    assert scheduler.size("contest") == 0
+
+def test_rejects_non_positive_weight():
+    with pytest.raises(ValueError):
+        LaneScheduler({"contest": 1, "rejudge": 0})
+
+def test_lanes_share_in_proportion_to_weights():
+    scheduler = LaneScheduler({"contest": 3, "rejudge": 1})
+    for i in range(40):
+        scheduler.push("contest", "alice", f"c{i}")
+        scheduler.push("rejudge", "bob", f"r{i}")
+    lanes = Counter(lane for lane, _ in drain(scheduler, 20))
+    assert lanes == {"contest": 15, "rejudge": 5}
+
+def test_idle_lane_capacity_goes_to_others():
+    scheduler = LaneScheduler({"contest": 16, "rejudge": 1})
+    for i in range(5):
+        scheduler.push("rejudge", "staff", i)
+    assert [lane for lane, _ in drain(scheduler)] == ["rejudge"] * 5
+
+def test_empty_lane_does_not_catch_up_on_missed_turns():
+    scheduler = LaneScheduler({"contest": 1, "rejudge": 1})
+    for i in range(10):
+        scheduler.push("rejudge", "staff", i)
+    drain(scheduler, 8)
+    # contest was idle for 8 turns, it resumes sharing rather than taking the next 8 in a row
+    for i in range(4):
+        scheduler.push("contest", "alice", i)
+    assert "rejudge" in [lane for lane, _ in drain(scheduler, 3)]
+
+def test_users_take_turns_within_a_lane():
+    scheduler = LaneScheduler({"contest": 1})
+    for i in range(3):
+        scheduler.push("contest", "alice", f"a{i}")
+    scheduler.push("contest", "bob", "b0")
+    scheduler.push("contest", "carol", "c0")
+    assert [item for _, item in drain(scheduler)] == ["a0", "b0", "c0", "a1", "a2"]
+
+def test_size_items_and_clear():
+    scheduler = LaneScheduler({"contest": 2, "rejudge": 1})
+    scheduler.push("contest", "alice", 1)
+    scheduler.push("contest", "bob", 2)
+    scheduler.push("rejudge", "staff", 3)
+    assert scheduler.size("contest") == 2
+    assert scheduler.items("contest") == [1, 2]
+    assert sorted(scheduler.clear()) == [1, 2, 3]
+    assert scheduler.size("contest") == 0
+    assert scheduler.size("rejudge") == 0
+    assert scheduler.pop() is None
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from app.config import settings
+from app.retries import ERROR_HEADER, POISONED_AT_HEADER, QUEUE_HEADER, RETRIES_HEADER, retry_later
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append((routing_key, body, properties))
+
+
+def fail(channel, retries):
+    headers = {RETRIES_HEADER: retries, "trace": "abc"} if retries is not None else None
+    properties = SimpleNamespace(headers=headers, timestamp=1700000000)
+    return retry_later(channel, "submissions", properties, b"{}", RuntimeError("judge crashed"))
+
+def test_first_failure_goes_to_shortest_delay():
+    channel = FakeChannel()
+    assert fail(channel, None) == "retried"
+    queue, body, properties = channel.published[0]
+    assert queue == f"submissions.retry.{settings.RETRY_DELAYS_SECONDS[0]}s"
+    assert body == b"{}"
+    assert properties.headers[RETRIES_HEADER] == 1
+    assert properties.headers[ERROR_HEADER] == "judge crashed"
+    assert properties.headers[QUEUE_HEADER] == "submissions"
+    assert properties.timestamp == 1700000000
+
+def test_each_failure_backs_off_further():
+    channel = FakeChannel()
+    for retries in range(len(settings.RETRY_DELAYS_SECONDS)):
+        assert fail(channel, retries) == "retried"
+    assert [queue for queue, _, _ in channel.published] == [
+        f"submissions.retry.{delay}s" for delay in settings.RETRY_DELAYS_SECONDS
+    ]
+    # Headers of the original message are kept
+    assert all(properties.headers["trace"] == "abc" for _, _, properties in channel.published)
+
+def test_poisoned_once_delays_are_used_up():
+    channel = FakeChannel()
+    assert fail(channel, len(settings.RETRY_DELAYS_SECONDS)) == "poisoned"
+    queue, _, properties = channel.published[0]
+    assert queue == "submissions.poison"
+    assert properties.headers[RETRIES_HEADER] == len(settings.RETRY_DELAYS_SECONDS) + 1
+    assert POISONED_AT_HEADER in properties.headers
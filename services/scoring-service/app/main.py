@@ -5,6 +5,7 @@ import uvicorn
 
 from app.database import init_db
 from app.worker import start_worker
+from app.routers import poison
 from app.config import settings
 
 app = FastAPI(
@@ -21,6 +22,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(poison.router, prefix="/api/v1/poison", tags=["poison"])
+
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
 
@@ -28,15 +31,9 @@ app.mount("/metrics", metrics_app)
 async def startup_event():
     init_db()
     # Start background worker (non-blocking)
-    import asyncio
     import threading
     
-    def run_worker():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(start_worker())
-    
-    thread = threading.Thread(target=run_worker, daemon=True)
+    thread = threading.Thread(target=start_worker, daemon=True)
     thread.start()
 
 @app.get("/health")
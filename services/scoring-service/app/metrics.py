@@ -0,0 +1,29 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Scoring phases of a submission, by language and problem
+SCORING_PHASE_SECONDS = Histogram(
+    "scoring_phase_seconds",
+    "Time a submission spent in a scoring phase: queue (result stored to scoring start), "
+    "score (leaderboard entry update) and leaderboard (rank recalculation)",
+    ["phase", "language", "problem"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Failed scoring events, retried with backoff and finally parked in the poison queue
+SCORING_RETRIES_TOTAL = Counter(
+    "scoring_message_retries_total",
+    "Scoring events whose processing failed, by outcome (retried after a delay, or poisoned)",
+    ["outcome"]
+)
+SCORING_POISON_QUEUE_DEPTH = Gauge(
+    "scoring_poison_queue_depth",
+    "Scoring events parked in the poison queue, as of the last inspection"
+)
+SCORING_POISON_REPLAYED_TOTAL = Counter(
+    "scoring_poison_replayed_total",
+    "Poisoned scoring events put back into the scoring queue"
+)
+SCORING_BROKER_RECONNECTS_TOTAL = Counter(
+    "scoring_broker_reconnects_total",
+    "Times the worker lost its broker connection and reconnected"
+)
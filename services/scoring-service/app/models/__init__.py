@@ -1,2 +1,3 @@
 from app.models.leaderboard_entry import LeaderboardEntry
+from app.models.scored_submission import ScoredSubmission
 
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Numeric, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ScoredSubmission(Base):
+    """A submission already counted into its contest's leaderboard entry"""
+    __tablename__ = "scored_submissions"
+    
+    submission_id = Column(UUID(as_uuid=True), primary_key=True)
+    contest_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    score = Column(Numeric(10, 2), nullable=False)
+    scored_at = Column(DateTime(timezone=True), server_default=func.now())
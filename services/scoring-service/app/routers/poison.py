@@ -0,0 +1,34 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.config import settings
+from app.metrics import SCORING_POISON_QUEUE_DEPTH, SCORING_POISON_REPLAYED_TOTAL
+from app.schemas.poison import PoisonQueueResponse, ReplayResponse
+from app.services.retries import PoisonQueue
+
+router = APIRouter()
+poison_queue = PoisonQueue(settings.SCORING_QUEUE)
+
+async def _call(fn, *args):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Broker not available: {e}"
+        )
+
+@router.get("/", response_model=PoisonQueueResponse)
+async def inspect_poison_queue(limit: int = Query(20, ge=1, le=500)):
+    """Show the first scoring events that kept failing after every retry, leaving them queued"""
+    depth = await _call(poison_queue.depth)
+    SCORING_POISON_QUEUE_DEPTH.set(depth)
+    messages = await _call(poison_queue.inspect, limit)
+    return PoisonQueueResponse(depth=depth, messages=messages)
+
+@router.post("/replay", response_model=ReplayResponse)
+async def replay_poison_queue(limit: int = Query(100, ge=1, le=10000)):
+    """Put the first poisoned scoring events back into the scoring queue, with fresh retries"""
+    replayed = await _call(poison_queue.replay, limit)
+    SCORING_POISON_REPLAYED_TOTAL.inc(replayed)
+    return ReplayResponse(replayed=replayed)
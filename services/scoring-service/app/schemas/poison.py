@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class PoisonedEvent(BaseModel):
+    submission_id: Optional[str] = None
+    retries: int
+    last_error: Optional[str] = None
+    poisoned_at: Optional[float] = None
+    published_at: Optional[int] = None
+    body: str
+
+class PoisonQueueResponse(BaseModel):
+    depth: int
+    messages: List[PoisonedEvent] = []
+
+class ReplayResponse(BaseModel):
+    replayed: int
@@ -0,0 +1,134 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+import pika
+
+from app.config import settings
+
+# Headers a failed message carries through the retry and poison queues
+RETRIES_HEADER = "retries"
+ERROR_HEADER = "last_error"
+QUEUE_HEADER = "failed_queue"
+POISONED_AT_HEADER = "poisoned_at"
+
+
+def retry_queue(queue: str, delay_seconds: int) -> str:
+    return f"{queue}.retry.{delay_seconds}s"
+
+
+def poison_queue(queue: str) -> str:
+    return f"{queue}.poison"
+
+
+def declare_retry_queues(channel, queue: str):
+    """Declare the delay queues, which dead-letter back into queue after their TTL, and the poison queue"""
+    for delay in settings.RETRY_DELAYS_SECONDS:
+        channel.queue_declare(queue=retry_queue(queue, delay), durable=True, arguments={
+            "x-message-ttl": delay * 1000,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": queue
+        })
+    channel.queue_declare(queue=poison_queue(queue), durable=True)
+
+
+def retry_later(channel, queue: str, properties, body: bytes, error: Exception) -> str:
+    """Republish a failed message to its next delay queue, or to the poison queue once the delays are used up
+
+    Returns "retried" or "poisoned". The caller acks the original delivery only after this returned.
+    """
+    headers = dict(properties.headers or {})
+    retries = int(headers.get(RETRIES_HEADER, 0))
+    headers.update({RETRIES_HEADER: retries + 1, ERROR_HEADER: str(error)[:1000], QUEUE_HEADER: queue})
+    if retries < len(settings.RETRY_DELAYS_SECONDS):
+        target, outcome = retry_queue(queue, settings.RETRY_DELAYS_SECONDS[retries]), "retried"
+    else:
+        headers[POISONED_AT_HEADER] = time.time()
+        target, outcome = poison_queue(queue), "poisoned"
+    channel.basic_publish(
+        exchange="",
+        routing_key=target,
+        body=body,
+        properties=pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            headers=headers,
+            timestamp=properties.timestamp
+        )
+    )
+    return outcome
+
+
+class PoisonQueue:
+    """Inspection and replay of a poison queue, over a connection of its own per call"""
+
+    def __init__(self, queue: str):
+        self.queue = queue
+
+    def depth(self) -> int:
+        with self._channel() as channel:
+            return channel.queue_declare(queue=poison_queue(self.queue), durable=True, passive=True).method.message_count
+
+    def inspect(self, limit: int) -> List[Dict]:
+        """The first limit poisoned messages, left in the queue"""
+        messages = []
+        # Unacknowledged gets go back to the queue in order when the connection closes
+        with self._channel() as channel:
+            for _ in range(limit):
+                method, properties, body = channel.basic_get(queue=poison_queue(self.queue), auto_ack=False)
+                if method is None:
+                    break
+                messages.append(self._describe(properties, body))
+        return messages
+
+    def replay(self, limit: int) -> int:
+        """Move the first limit poisoned messages back into the work queue with their retries reset
+
+        Returns how many were moved.
+        """
+        replayed = 0
+        with self._channel() as channel:
+            channel.confirm_delivery()
+            for _ in range(limit):
+                method, properties, body = channel.basic_get(queue=poison_queue(self.queue), auto_ack=False)
+                if method is None:
+                    break
+                headers = {
+                    key: value for key, value in (properties.headers or {}).items()
+                    if key not in (RETRIES_HEADER, ERROR_HEADER, QUEUE_HEADER, POISONED_AT_HEADER)
+                }
+                channel.basic_publish(
+                    exchange="",
+                    routing_key=self.queue,
+                    body=body,
+                    properties=pika.BasicProperties(delivery_mode=2, headers=headers, timestamp=properties.timestamp)
+                )
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+                replayed += 1
+        return replayed
+
+    def _describe(self, properties, body: bytes) -> Dict:
+        headers = properties.headers or {}
+        message: Dict = {
+            "retries": headers.get(RETRIES_HEADER, 0),
+            "last_error": headers.get(ERROR_HEADER),
+            "poisoned_at": headers.get(POISONED_AT_HEADER),
+            "published_at": properties.timestamp,
+            "body": body[:settings.POISON_PREVIEW_BYTES].decode("utf-8", errors="replace")
+        }
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            message["submission_id"] = data.get("submission_id")
+        return message
+
+    @contextmanager
+    def _channel(self) -> Iterator:
+        connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
+        try:
+            yield connection.channel()
+        finally:
+            if connection.is_open:
+                connection.close()
@@ -6,13 +6,21 @@ def calculate_score(
     total_test_cases: int,
     execution_time_ms: int,
     problem_points: int = 100,
-    time_limit_ms: int = 2000
+    time_limit_ms: int = 2000,
+    judging_policy: str = "ioi"
 ) -> Decimal:
     """
     Calculate score based on:
     1. Correctness (percentage of test cases passed)
     2. Execution time (faster = higher score)
+    
+    ICPC problems are judged fail-fast, so test_cases_passed is only meaningful
+    for accepted submissions and anything else scores zero. IOI problems run
+    every test and keep partial scoring.
     """
+    if judging_policy == "icpc" and test_cases_passed < total_test_cases:
+        return Decimal('0.00')
+    
     # Factor 1: Correctness (0-100% of problem points)
     correctness_score = (test_cases_passed / total_test_cases) * problem_points if total_test_cases > 0 else 0
     
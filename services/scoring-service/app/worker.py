@@ -1,71 +1,171 @@
 import pika
 import json
-import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import delete, insert, text
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.leaderboard_entry import LeaderboardEntry
+from app.models.scored_submission import ScoredSubmission
 from app.services.scoring import calculate_score
+from app.services.retries import declare_retry_queues, retry_later
+from app.metrics import SCORING_PHASE_SECONDS, SCORING_RETRIES_TOTAL, SCORING_BROKER_RECONNECTS_TOTAL
 from app.config import settings
 
-async def process_scoring(message_body: str):
-    """Process scoring from execution results"""
+def process_scoring(message_body: str):
+    """Process scoring from execution results
+    
+    Raises if the event cannot be scored. Each submission is counted once:
+    it is recorded in scored_submissions in the transaction that adds its
+    score to the leaderboard entry, and an event for a recorded submission,
+    such as a redelivery or a retry of an event whose commit went through, is
+    skipped. A failed event rolls back as a whole and can be retried.
+    """
+    data = json.loads(message_body)
+    if data.get("type") == "rebuild_leaderboard":
+        return rebuild_leaderboard(data["contest_id"], datetime.fromisoformat(data["evaluated_before"]))
+    submission_id = data["submission_id"]
+    contest_id = data["contest_id"]
+    user_id = data["user_id"]
+    problem_id = data["problem_id"]
+    test_cases_passed = data["test_cases_passed"]
+    total_test_cases = data["total_test_cases"]
+    execution_time_ms = data.get("execution_time_ms", 0)
+    problem_points = data.get("problem_points", 100)
+    time_limit_ms = data.get("time_limit_ms", 2000)
+    judging_policy = data.get("judging_policy", "ioi")
+    labels = {"language": data.get("language", "cpp"), "problem": problem_id}
+    stored_at = data.get("phase_timestamps", {}).get("stored")
+    if stored_at:
+        SCORING_PHASE_SECONDS.labels(phase="queue", **labels).observe(max(0.0, time.time() - stored_at))
+    score_started = time.monotonic()
+    
+    # Calculate score
+    score = calculate_score(
+        test_cases_passed=test_cases_passed,
+        total_test_cases=total_test_cases,
+        execution_time_ms=execution_time_ms,
+        problem_points=problem_points,
+        time_limit_ms=time_limit_ms,
+        judging_policy=judging_policy
+    )
+    
+    # Update leaderboard
+    db = SessionLocal()
     try:
-        data = json.loads(message_body)
-        submission_id = data["submission_id"]
-        contest_id = data["contest_id"]
-        user_id = data["user_id"]
-        problem_id = data["problem_id"]
-        test_cases_passed = data["test_cases_passed"]
-        total_test_cases = data["total_test_cases"]
-        execution_time_ms = data.get("execution_time_ms", 0)
-        problem_points = data.get("problem_points", 100)
-        time_limit_ms = data.get("time_limit_ms", 2000)
+        if db.get(ScoredSubmission, submission_id) is not None:
+            print(f"Submission {submission_id} was already scored, skipping")
+            return {"score": float(score), "duplicate": True}
+        # Flushed first: a concurrent event for the same submission waits on the key, fails once this
+        # commits and is skipped on its retry
+        db.add(ScoredSubmission(submission_id=submission_id, contest_id=contest_id, score=score))
+        db.flush()
         
-        # Calculate score
-        score = calculate_score(
-            test_cases_passed=test_cases_passed,
-            total_test_cases=total_test_cases,
-            execution_time_ms=execution_time_ms,
-            problem_points=problem_points,
-            time_limit_ms=time_limit_ms
-        )
+        entry = db.query(LeaderboardEntry).filter(
+            LeaderboardEntry.contest_id == contest_id,
+            LeaderboardEntry.user_id == user_id
+        ).first()
         
-        # Update leaderboard
-        db = SessionLocal()
-        try:
-            entry = db.query(LeaderboardEntry).filter(
-                LeaderboardEntry.contest_id == contest_id,
-                LeaderboardEntry.user_id == user_id
-            ).first()
-            
-            if not entry:
-                entry = LeaderboardEntry(
-                    contest_id=contest_id,
-                    user_id=user_id,
-                    total_score=score,
-                    total_submissions=1,
-                    total_accepted=1 if test_cases_passed == total_test_cases else 0
+        if not entry:
+            entry = LeaderboardEntry(
+                contest_id=contest_id,
+                user_id=user_id,
+                total_score=score,
+                total_submissions=1,
+                total_accepted=1 if test_cases_passed == total_test_cases else 0
+            )
+            db.add(entry)
+        else:
+            entry.total_score += score
+            entry.total_submissions += 1
+            if test_cases_passed == total_test_cases:
+                entry.total_accepted += 1
+        
+        # Committed with the ranks
+        db.flush()
+        SCORING_PHASE_SECONDS.labels(phase="score", **labels).observe(time.monotonic() - score_started)
+        
+        # Recalculate ranks
+        ranks_started = time.monotonic()
+        _recalculate_ranks(db, contest_id)
+        SCORING_PHASE_SECONDS.labels(phase="leaderboard", **labels).observe(time.monotonic() - ranks_started)
+        
+    finally:
+        # Uncommitted changes of a failed event are rolled back
+        db.close()
+    
+    print(f"Scored submission {submission_id}: {score}")
+    return {"score": float(score)}
+
+def rebuild_leaderboard(contest_id: str, evaluated_before: datetime):
+    """Recompute a contest's leaderboard from its submissions, e.g. after a rejudge
+    
+    Every submission evaluated up to evaluated_before, or already counted by
+    a scoring event, is scored again, and the contest's entries and
+    scored_submissions are replaced in one transaction so readers never see a
+    half-built leaderboard. Submissions evaluated later are added by their own
+    scoring events.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            text("""
+                SELECT s.id, s.user_id, s.test_cases_passed, s.total_test_cases, s.execution_time_ms, s.submitted_at,
+                    p.points, p.time_limit_seconds, lower(COALESCE(p.judging_policy, c.judging_policy)::text) AS judging_policy
+                FROM submissions s
+                JOIN problems p ON p.id = s.problem_id
+                JOIN contests c ON c.id = s.contest_id
+                WHERE s.contest_id = :contest_id AND (
+                    s.evaluated_at <= :evaluated_before
+                    OR s.id IN (SELECT submission_id FROM scored_submissions WHERE contest_id = :contest_id)
                 )
-                db.add(entry)
-            else:
-                entry.total_score += score
-                entry.total_submissions += 1
-                if test_cases_passed == total_test_cases:
-                    entry.total_accepted += 1
-            
-            db.commit()
-            
-            # Recalculate ranks
-            _recalculate_ranks(db, contest_id)
-            
-        finally:
-            db.close()
+            """),
+            {"contest_id": contest_id, "evaluated_before": evaluated_before}
+        )
         
-        print(f"Scored submission {submission_id}: {score}")
-        return {"score": float(score)}
-    except Exception as e:
-        print(f"Error processing scoring: {e}")
-        return None
+        entries = defaultdict(lambda: {
+            "total_score": Decimal("0.00"), "total_submissions": 0, "total_accepted": 0, "last_submission_at": None
+        })
+        scored = []
+        for row in rows:
+            entry = entries[row.user_id]
+            score = calculate_score(
+                test_cases_passed=row.test_cases_passed,
+                total_test_cases=row.total_test_cases,
+                execution_time_ms=row.execution_time_ms or 0,
+                problem_points=row.points,
+                time_limit_ms=row.time_limit_seconds * 1000,
+                judging_policy=row.judging_policy
+            )
+            scored.append({"submission_id": row.id, "contest_id": contest_id, "score": score})
+            entry["total_score"] += score
+            entry["total_submissions"] += 1
+            if row.test_cases_passed == row.total_test_cases:
+                entry["total_accepted"] += 1
+            if entry["last_submission_at"] is None or row.submitted_at > entry["last_submission_at"]:
+                entry["last_submission_at"] = row.submitted_at
+        
+        ranked = sorted(entries.items(), key=lambda item: (-item[1]["total_score"], item[1]["last_submission_at"]))
+        db.execute(delete(LeaderboardEntry).where(LeaderboardEntry.contest_id == contest_id))
+        db.execute(delete(ScoredSubmission).where(ScoredSubmission.contest_id == contest_id))
+        if scored:
+            db.execute(insert(ScoredSubmission), scored)
+        if ranked:
+            db.execute(
+                insert(LeaderboardEntry),
+                [
+                    {"contest_id": contest_id, "user_id": user_id, "rank": rank, **entry}
+                    for rank, (user_id, entry) in enumerate(ranked, start=1)
+                ]
+            )
+        db.commit()
+    finally:
+        db.close()
+    
+    print(f"Rebuilt leaderboard of contest {contest_id}: {len(ranked)} entries")
+    return {"entries": len(ranked)}
 
 def _recalculate_ranks(db: Session, contest_id: str):
     """Recalculate ranks for a contest"""
@@ -81,22 +181,50 @@ def _recalculate_ranks(db: Session, contest_id: str):
     
     db.commit()
 
-async def start_worker():
-    """Start the scoring worker"""
+def start_worker():
+    """Start the scoring worker, reconnecting with exponential backoff on broker errors
+    
+    Events are scored one at a time and acknowledged afterwards. An event that
+    fails is acknowledged once it was handed to a delay queue, and is parked in
+    the poison queue after its last retry, so it neither blocks the events
+    behind it nor gets lost.
+    """
+    delay = 1
     while True:
+        connected_at = time.monotonic()
         try:
             connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
-            channel = connection.channel()
-            channel.queue_declare(queue=settings.SCORING_QUEUE, durable=True)
-            
-            def callback(ch, method, properties, body):
-                asyncio.create_task(process_scoring(body.decode()))
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-            
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(queue=settings.SCORING_QUEUE, on_message_callback=callback)
-            channel.start_consuming()
+            try:
+                channel = connection.channel()
+                channel.queue_declare(queue=settings.SCORING_QUEUE, durable=True)
+                declare_retry_queues(channel, settings.SCORING_QUEUE)
+                # Retries are only acknowledged once the broker confirmed it holds them
+                channel.confirm_delivery()
+                channel.basic_qos(prefetch_count=1)
+                channel.basic_consume(queue=settings.SCORING_QUEUE, on_message_callback=_on_message)
+                channel.start_consuming()
+            finally:
+                if connection.is_open:
+                    connection.close()
         except Exception as e:
-            print(f"Worker error: {e}, retrying in 5 seconds...")
-            await asyncio.sleep(5)
+            # A connection that lasted a while starts backing off afresh
+            if time.monotonic() - connected_at > settings.RECONNECT_MAX_DELAY_SECONDS:
+                delay = 1
+            print(f"Worker error: {e}, reconnecting in {delay} seconds...")
+            SCORING_BROKER_RECONNECTS_TOTAL.inc()
+            time.sleep(delay)
+            delay = min(delay * 2, settings.RECONNECT_MAX_DELAY_SECONDS)
 
+def _on_message(channel, method, properties, body: bytes):
+    try:
+        process_scoring(body.decode())
+    except Exception as e:
+        print(f"Error processing scoring: {e}")
+        try:
+            outcome = retry_later(channel, settings.SCORING_QUEUE, properties, body, e)
+        except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as publish_error:
+            print(f"Failed scoring event could not be queued for a retry: {publish_error}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            return
+        SCORING_RETRIES_TOTAL.labels(outcome=outcome).inc()
+    channel.basic_ack(delivery_tag=method.delivery_tag)
@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+from app.services.scoring import calculate_score
+
+
+def test_icpc_accepted_scores_like_ioi():
+    icpc = calculate_score(10, 10, 1500, problem_points=100, time_limit_ms=2000, judging_policy="icpc")
+    ioi = calculate_score(10, 10, 1500, problem_points=100, time_limit_ms=2000, judging_policy="ioi")
+    assert icpc == ioi == Decimal("100.00")
+
+def test_icpc_partial_scores_zero():
+    # Fail-fast judging stops at the first failed test, so the passed count says nothing
+    assert calculate_score(9, 10, 100, judging_policy="icpc") == Decimal("0.00")
+    assert calculate_score(0, 10, 0, judging_policy="icpc") == Decimal("0.00")
+
+def test_icpc_accepted_keeps_time_bonus():
+    # Half the bonus window: (0.5 - 0.25) * 0.2 * 100
+    assert calculate_score(5, 5, 500, problem_points=100, time_limit_ms=2000, judging_policy="icpc") == Decimal("105.00")
+
+def test_ioi_partial_scoring():
+    assert calculate_score(3, 10, 1500, problem_points=100, time_limit_ms=2000, judging_policy="ioi") == Decimal("30.00")
+
+def test_no_tests_scores_zero():
+    assert calculate_score(0, 0, 0, judging_policy="ioi") == Decimal("0.00")
@@ -33,6 +33,7 @@ CREATE TABLE contests (
     is_active BOOLEAN DEFAULT TRUE,
     registration_open BOOLEAN DEFAULT TRUE,
     max_participants INTEGER,
+    judging_policy VARCHAR(10) NOT NULL DEFAULT 'ioi' CHECK (judging_policy IN ('icpc', 'ioi')),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     CHECK (end_time > start_time)
@@ -54,6 +55,12 @@ CREATE TABLE problems (
     memory_limit_mb INTEGER NOT NULL DEFAULT 256,
     points INTEGER NOT NULL DEFAULT 100,
     order_index INTEGER NOT NULL,
+    judging_policy VARCHAR(10) CHECK (judging_policy IN ('icpc', 'ioi')),
+    checker_mode VARCHAR(10) NOT NULL DEFAULT 'exact' CHECK (checker_mode IN ('exact', 'tokens', 'float', 'custom')),
+    checker_tolerance DOUBLE PRECISION NOT NULL DEFAULT 0.000001,
+    checker_source TEXT,
+    checker_version INTEGER NOT NULL DEFAULT 1,
+    test_set_version INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -95,7 +102,7 @@ CREATE TABLE submissions (
     problem_id UUID NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
     user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     code TEXT NOT NULL,
-    language VARCHAR(10) NOT NULL DEFAULT 'cpp' CHECK (language = 'cpp'),
+    language VARCHAR(10) NOT NULL DEFAULT 'cpp' CHECK (language IN ('cpp', 'python', 'java')),
     status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'accepted', 'wrong_answer', 'time_limit_exceeded', 'runtime_error', 'compilation_error')),
     execution_time_ms INTEGER,
     memory_used_mb DECIMAL(10, 2),
@@ -103,8 +110,15 @@ CREATE TABLE submissions (
     total_test_cases INTEGER DEFAULT 0,
     score DECIMAL(10, 2) DEFAULT 0,
     error_message TEXT,
+    -- Identical code judged under the same tests and limits gets the same verdict
+    test_set_version INTEGER,
+    code_hash CHAR(64),
+    -- Unix times a submission reached each phase: accepted, queued, compile_started,
+    -- compiled, run_started, judged, stored
+    phase_timestamps JSONB,
     submitted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    evaluated_at TIMESTAMP WITH TIME ZONE
+    evaluated_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX idx_submissions_contest_id ON submissions(contest_id);
@@ -113,13 +127,14 @@ CREATE INDEX idx_submissions_user_id ON submissions(user_id);
 CREATE INDEX idx_submissions_status ON submissions(status);
 CREATE INDEX idx_submissions_submitted_at ON submissions(submitted_at);
 CREATE INDEX idx_submissions_contest_user ON submissions(contest_id, user_id);
+CREATE INDEX idx_submissions_code_hash ON submissions(problem_id, test_set_version, code_hash) WHERE evaluated_at IS NOT NULL;
 
 -- Submission results table (detailed test case results)
 CREATE TABLE submission_results (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     submission_id UUID NOT NULL REFERENCES submissions(id) ON DELETE CASCADE,
     test_case_id UUID NOT NULL REFERENCES test_cases(id) ON DELETE CASCADE,
-    status VARCHAR(20) NOT NULL CHECK (status IN ('passed', 'failed', 'timeout', 'error')),
+    status VARCHAR(20) NOT NULL CHECK (status IN ('passed', 'failed', 'timeout', 'error', 'skipped')),
     execution_time_ms INTEGER,
     memory_used_mb DECIMAL(10, 2),
     actual_output TEXT,
@@ -130,6 +145,37 @@ CREATE TABLE submission_results (
 CREATE INDEX idx_submission_results_submission_id ON submission_results(submission_id);
 CREATE INDEX idx_submission_results_test_case_id ON submission_results(test_case_id);
 
+-- Rejudge jobs (staff re-evaluation of a problem or contest)
+CREATE TABLE rejudge_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    contest_id UUID NOT NULL REFERENCES contests(id) ON DELETE CASCADE,
+    problem_id UUID REFERENCES problems(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'enqueueing' CHECK (status IN ('enqueueing', 'judging', 'completed', 'failed')),
+    enqueued_submissions INTEGER NOT NULL DEFAULT 0,
+    judged_submissions INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    created_by UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX idx_rejudge_jobs_contest_id ON rejudge_jobs(contest_id);
+
+-- New results of rejudged submissions, swapped into submissions once the whole job is judged
+CREATE TABLE rejudge_results (
+    job_id UUID NOT NULL REFERENCES rejudge_jobs(id) ON DELETE CASCADE,
+    submission_id UUID NOT NULL REFERENCES submissions(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('accepted', 'wrong_answer', 'time_limit_exceeded', 'runtime_error', 'compilation_error')),
+    test_cases_passed INTEGER NOT NULL DEFAULT 0,
+    total_test_cases INTEGER NOT NULL DEFAULT 0,
+    execution_time_ms INTEGER,
+    memory_used_mb DECIMAL(10, 2),
+    error_message TEXT,
+    test_set_version INTEGER,
+    results JSONB NOT NULL DEFAULT '[]',
+    PRIMARY KEY (job_id, submission_id)
+);
+
 -- Leaderboard entries table (denormalized for performance)
 CREATE TABLE leaderboard_entries (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -149,6 +195,16 @@ CREATE INDEX idx_leaderboard_user_id ON leaderboard_entries(user_id);
 CREATE INDEX idx_leaderboard_score ON leaderboard_entries(contest_id, total_score DESC, last_submission_at ASC);
 CREATE INDEX idx_leaderboard_rank ON leaderboard_entries(contest_id, rank);
 
+-- Submissions counted into leaderboard_entries, so a scoring event delivered twice is counted once
+CREATE TABLE scored_submissions (
+    submission_id UUID PRIMARY KEY REFERENCES submissions(id) ON DELETE CASCADE,
+    contest_id UUID NOT NULL REFERENCES contests(id) ON DELETE CASCADE,
+    score DECIMAL(10, 2) NOT NULL,
+    scored_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_scored_submissions_contest_id ON scored_submissions(contest_id);
+
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
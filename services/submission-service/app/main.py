@@ -4,7 +4,8 @@ from prometheus_client import make_asgi_app
 import uvicorn
 
 from app.database import init_db
-from app.routers import submissions
+from app.routers import poison, rejudge, runs, submissions
+from app.services.results import result_consumer
 from app.config import settings
 
 app = FastAPI(
@@ -23,7 +24,10 @@ app.add_middleware(
 )
 
 # Include routers
+app.include_router(rejudge.router, prefix="/api/v1/submissions/rejudge", tags=["rejudge"])
+app.include_router(runs.router, prefix="/api/v1/submissions/runs", tags=["runs"])
 app.include_router(submissions.router, prefix="/api/v1/submissions", tags=["submissions"])
+app.include_router(poison.router, prefix="/api/v1/poison", tags=["poison"])
 
 # Prometheus metrics endpoint
 metrics_app = make_asgi_app()
@@ -31,7 +35,17 @@ app.mount("/metrics", metrics_app)
 
 @app.on_event("startup")
 async def startup_event():
+    import threading
+    
     init_db()
+    # Store execution results and forward them to scoring (non-blocking)
+    threading.Thread(target=result_consumer.run, daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    import asyncio
+    
+    await asyncio.get_running_loop().run_in_executor(None, result_consumer.stop, 10)
 
 @app.get("/health")
 async def health_check():
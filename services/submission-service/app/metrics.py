@@ -0,0 +1,25 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Phases of a submission handled here, by language and problem; judging phases
+# are exported by execution-service and scoring phases by scoring-service
+SUBMISSION_PHASE_SECONDS = Histogram(
+    "submission_phase_seconds",
+    "Time a submission spent in a phase: accept (create request), result_write (judged to stored) "
+    "and total (accepted to stored)",
+    ["phase", "language", "problem"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+
+RESULT_RETRIES_TOTAL = Counter(
+    "result_message_retries_total",
+    "Execution results that could not be stored, by outcome (retried after a delay, or poisoned)",
+    ["outcome"]
+)
+RESULT_POISON_QUEUE_DEPTH = Gauge(
+    "result_poison_queue_depth",
+    "Execution results parked in the poison queue, as of the last inspection"
+)
+RESULT_POISON_REPLAYED_TOTAL = Counter(
+    "result_poison_replayed_total",
+    "Poisoned execution results put back into the result queue"
+)
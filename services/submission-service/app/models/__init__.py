@@ -1,5 +1,5 @@
 from app.models.submission import Submission, SubmissionStatus
 from app.models.submission_result import SubmissionResult, TestCaseStatus
+from app.models.rejudge import RejudgeJob, RejudgeResult, RejudgeStatus
 
-__all__ = ["Submission", "SubmissionStatus", "SubmissionResult", "TestCaseStatus"]
-
+__all__ = ["Submission", "SubmissionStatus", "SubmissionResult", "TestCaseStatus", "RejudgeJob", "RejudgeResult", "RejudgeStatus"]
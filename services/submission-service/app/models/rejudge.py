@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, ForeignKey, Text, Numeric, DateTime, String, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+import enum
+
+from app.database import Base
+
+class RejudgeStatus(str, enum.Enum):
+    ENQUEUEING = "enqueueing"  # Submissions are being queued for judging
+    JUDGING = "judging"  # All queued, waiting for the remaining results
+    COMPLETED = "completed"  # New results swapped in
+    FAILED = "failed"
+
+class RejudgeJob(Base):
+    __tablename__ = "rejudge_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    contest_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    # Rejudges the whole contest when not set
+    problem_id = Column(UUID(as_uuid=True))
+    status = Column(SQLEnum(RejudgeStatus, values_callable=lambda statuses: [s.value for s in statuses]), nullable=False, default=RejudgeStatus.ENQUEUEING)
+    enqueued_submissions = Column(Integer, nullable=False, default=0)
+    judged_submissions = Column(Integer, nullable=False, default=0)
+    error_message = Column(Text)
+    created_by = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    completed_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<RejudgeJob {self.id}>"
+
+class RejudgeResult(Base):
+    """New result of a rejudged submission, held back until the whole job is judged"""
+    __tablename__ = "rejudge_results"
+
+    job_id = Column(UUID(as_uuid=True), ForeignKey("rejudge_jobs.id", ondelete="CASCADE"), primary_key=True)
+    submission_id = Column(UUID(as_uuid=True), primary_key=True)
+    status = Column(String(20), nullable=False)
+    test_cases_passed = Column(Integer, nullable=False, default=0)
+    total_test_cases = Column(Integer, nullable=False, default=0)
+    execution_time_ms = Column(Integer)
+    memory_used_mb = Column(Numeric(10, 2))
+    error_message = Column(Text)
+    # Test set the submission was rejudged on, becomes the submission's
+    test_set_version = Column(Integer)
+    # Per-test results as in the execution result event
+    results = Column(JSONB, nullable=False, default=list)
+
+    def __repr__(self):
+        return f"<RejudgeResult {self.job_id} {self.submission_id}>"
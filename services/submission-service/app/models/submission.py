@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, Integer, ForeignKey, Text, Numeric, DateTime, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -25,15 +25,22 @@ class Submission(Base):
     user_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     code = Column(Text, nullable=False)
     language = Column(String(10), nullable=False, default="cpp")
-    status = Column(SQLEnum(SubmissionStatus), nullable=False, default=SubmissionStatus.PENDING, index=True)
+    status = Column(SQLEnum(SubmissionStatus, values_callable=lambda statuses: [s.value for s in statuses]), nullable=False, default=SubmissionStatus.PENDING, index=True)
     execution_time_ms = Column(Integer)
     memory_used_mb = Column(Numeric(10, 2))
     test_cases_passed = Column(Integer, default=0)
     total_test_cases = Column(Integer, default=0)
     score = Column(Numeric(10, 2), default=0)
     error_message = Column(Text)
+    test_set_version = Column(Integer)
+    # See app.services.duplicates.code_hash
+    code_hash = Column(String(64))
+    # Unix time of each phase the submission reached, e.g. {"accepted": ..., "judged": ...}
+    phase_timestamps = Column(JSONB)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     evaluated_at = Column(DateTime(timezone=True))
+    # Maintained by the update_submissions_updated_at trigger
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     results = relationship("SubmissionResult", back_populates="submission", cascade="all, delete-orphan")
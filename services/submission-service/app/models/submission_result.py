@@ -12,14 +12,15 @@ class TestCaseStatus(str, enum.Enum):
     FAILED = "failed"
     TIMEOUT = "timeout"
     ERROR = "error"
+    SKIPPED = "skipped"
 
 class SubmissionResult(Base):
     __tablename__ = "submission_results"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    submission_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    submission_id = Column(UUID(as_uuid=True), ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False, index=True)
     test_case_id = Column(UUID(as_uuid=True), nullable=False, index=True)
-    status = Column(SQLEnum(TestCaseStatus), nullable=False)
+    status = Column(SQLEnum(TestCaseStatus, values_callable=lambda statuses: [s.value for s in statuses]), nullable=False)
     execution_time_ms = Column(Integer)
     memory_used_mb = Column(Numeric(10, 2))
     actual_output = Column(Text)
@@ -0,0 +1,50 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.config import settings
+from app.dependencies import get_current_user
+from app.metrics import RESULT_POISON_QUEUE_DEPTH, RESULT_POISON_REPLAYED_TOTAL
+from app.schemas.poison import PoisonQueueResponse, ReplayResponse
+from app.services.retries import PoisonQueue
+
+router = APIRouter()
+poison_queue = PoisonQueue(settings.RESULT_QUEUE)
+
+def _require_staff(current_user: dict):
+    if current_user.get("role") != "staff":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only staff can manage the poison queue"
+        )
+
+async def _call(fn, *args):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Broker not available: {e}"
+        )
+
+@router.get("/", response_model=PoisonQueueResponse)
+async def inspect_poison_queue(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """Show the first execution results that could not be stored after every retry, leaving them queued (staff only)"""
+    _require_staff(current_user)
+    depth = await _call(poison_queue.depth)
+    RESULT_POISON_QUEUE_DEPTH.set(depth)
+    messages = await _call(poison_queue.inspect, limit)
+    return PoisonQueueResponse(depth=depth, messages=messages)
+
+@router.post("/replay", response_model=ReplayResponse)
+async def replay_poison_queue(
+    limit: int = Query(100, ge=1, le=10000),
+    current_user: dict = Depends(get_current_user)
+):
+    """Put the first poisoned execution results back into the result queue, with fresh retries (staff only)"""
+    _require_staff(current_user)
+    replayed = await _call(poison_queue.replay, limit)
+    RESULT_POISON_REPLAYED_TOTAL.inc(replayed)
+    return ReplayResponse(replayed=replayed)
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from uuid import UUID
+import httpx
+
+from app.database import get_db
+from app.models.rejudge import RejudgeJob, RejudgeStatus
+from app.schemas.submission import RejudgeCreate, RejudgeJobResponse
+from app.dependencies import get_current_user
+from app.services.rejudge import ACTIVE_REJUDGE_STATUSES, enqueue_rejudge, expire_rejudges, fail_rejudge
+from app.config import settings
+
+router = APIRouter()
+
+@router.post("/", response_model=RejudgeJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_rejudge(
+    rejudge_data: RejudgeCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Rejudge every submission of a problem or a whole contest (staff only)
+    
+    Submissions keep their current verdicts until all of them are judged again,
+    then the new results and the leaderboard are swapped in at once. Submissions
+    still waiting for a verdict are rejudged too, on the current tests.
+    """
+    if current_user.get("role") != "staff":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only staff can rejudge submissions"
+        )
+    
+    if rejudge_data.problem_id:
+        async with httpx.AsyncClient() as client:
+            problem_response = await client.get(
+                f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/{rejudge_data.problem_id}",
+                headers={"Authorization": f"Bearer {current_user.get('token', '')}"}
+            )
+        if problem_response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Problem not found"
+            )
+        if str(problem_response.json()["contest_id"]) != str(rejudge_data.contest_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Problem does not belong to this contest"
+            )
+    
+    # Two jobs over the same submissions would swap in each other's results
+    expire_rejudges(db, rejudge_data.contest_id)
+    running = db.query(RejudgeJob).filter(
+        RejudgeJob.contest_id == rejudge_data.contest_id,
+        RejudgeJob.status.in_(ACTIVE_REJUDGE_STATUSES)
+    ).first()
+    if running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Rejudge {running.id} of this contest is still in progress"
+        )
+    
+    job = RejudgeJob(
+        contest_id=rejudge_data.contest_id,
+        problem_id=rejudge_data.problem_id,
+        status=RejudgeStatus.ENQUEUEING,
+        created_by=UUID(current_user["id"])
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    background_tasks.add_task(enqueue_rejudge, job.id)
+    return job
+
+@router.get("/{job_id}", response_model=RejudgeJobResponse)
+async def get_rejudge(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the progress of a rejudge (staff only)"""
+    if current_user.get("role") != "staff":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only staff can view rejudges"
+        )
+    
+    job = db.query(RejudgeJob).filter(RejudgeJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rejudge not found"
+        )
+    if job.status in ACTIVE_REJUDGE_STATUSES:
+        expire_rejudges(db, job.contest_id)
+        db.refresh(job)
+    return job
+
+@router.post("/{job_id}/cancel", response_model=RejudgeJobResponse)
+async def cancel_rejudge(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stop a rejudge in progress, submissions keep their current verdicts (staff only)"""
+    if current_user.get("role") != "staff":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only staff can cancel rejudges"
+        )
+    
+    job = db.query(RejudgeJob).filter(RejudgeJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rejudge not found"
+        )
+    if not fail_rejudge(db, job_id, f"Cancelled by {current_user.get('username', current_user.get('id'))}"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Rejudge is not in progress"
+        )
+    db.refresh(job)
+    return job
@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+import httpx
+
+from app.database import get_db
+from app.schemas.submission import CustomRunCreate, CustomRunResponse
+from app.dependencies import get_current_user, verify_contest_access
+from app.config import settings
+
+router = APIRouter()
+
+@router.post("/", response_model=CustomRunResponse)
+async def create_run(
+    run_data: CustomRunCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Run code against custom input or the problem's sample tests
+    
+    The code is compiled and run right away on the judges' custom-run pool.
+    Nothing is stored and no submission is counted.
+    """
+    async with httpx.AsyncClient() as client:
+        problem_response = await client.get(
+            f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/{run_data.problem_id}",
+            headers={"Authorization": f"Bearer {current_user.get('token', '')}"}
+        )
+        if problem_response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Problem not found"
+            )
+        problem = problem_response.json()
+        
+        if not await verify_contest_access(problem["contest_id"], current_user, db):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You must be registered for this contest to run code"
+            )
+        
+        run_request = {
+            "code": run_data.code,
+            "language": run_data.language,
+            "time_limit_seconds": problem.get("time_limit_seconds", 2),
+            "memory_limit_mb": problem.get("memory_limit_mb", 256)
+        }
+        if run_data.stdin is not None:
+            run_request["tests"] = [{"input_data": run_data.stdin}]
+        else:
+            samples_response = await client.get(
+                f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/{run_data.problem_id}/samples",
+                headers={"Authorization": f"Bearer {current_user.get('token', '')}"}
+            )
+            samples = samples_response.json() if samples_response.status_code == 200 else []
+            if not samples:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Problem has no sample tests, provide stdin"
+                )
+            run_request["tests"] = [
+                {"input_data": sample["input_data"], "expected_output": sample["expected_output"]}
+                for sample in samples
+            ]
+            run_request["checker_mode"] = problem.get("checker_mode", "exact")
+            run_request["checker_tolerance"] = problem.get("checker_tolerance", 1e-6)
+            if run_request["checker_mode"] == "custom":
+                run_request["problem_id"] = str(problem["id"])
+                run_request["checker_version"] = problem.get("checker_version", 1)
+        
+        try:
+            run_response = await client.post(
+                f"{settings.EXECUTION_SERVICE_URL}/api/v1/runs/",
+                json=run_request,
+                timeout=settings.CUSTOM_RUN_TIMEOUT_SECONDS
+            )
+        except httpx.RequestError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Execution service unavailable"
+            )
+    
+    if run_response.status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_429_TOO_MANY_REQUESTS):
+        raise HTTPException(status_code=run_response.status_code, detail=run_response.json().get("detail"))
+    if run_response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not run the code"
+        )
+    return run_response.json()
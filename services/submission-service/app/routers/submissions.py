@@ -3,12 +3,15 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 import httpx
+import time
 
 from app.database import get_db
 from app.models.submission import Submission, SubmissionStatus
 from app.schemas.submission import SubmissionCreate, SubmissionResponse, SubmissionWithResults
 from app.dependencies import get_current_user, verify_contest_access
 from app.services.queue import submission_queue
+from app.services.duplicates import code_hash, reuse_verdict, scoring_event
+from app.metrics import SUBMISSION_PHASE_SECONDS
 from app.config import settings
 
 router = APIRouter()
@@ -20,6 +23,8 @@ async def create_submission(
     current_user: dict = Depends(get_current_user)
 ):
     """Submit code for evaluation"""
+    accepted_at = time.time()
+    accept_started = time.monotonic()
     user_id = UUID(current_user["id"])
     
     # Verify contest access
@@ -48,12 +53,17 @@ async def create_submission(
                 detail="Problem does not belong to this contest"
             )
         
-        # Get test cases
-        test_cases_response = await client.get(
-            f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/{submission_data.problem_id}",
+        # Get the current test-set version; judges fetch the test data themselves
+        test_set_response = await client.get(
+            f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/{submission_data.problem_id}/test-set",
             headers={"Authorization": f"Bearer {current_user.get('token', '')}"}
         )
-        test_cases_data = test_cases_response.json().get("test_cases", [])
+        if test_set_response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Problem not found"
+            )
+        test_set = test_set_response.json()
     
     # Create submission record
     db_submission = Submission(
@@ -63,19 +73,39 @@ async def create_submission(
         code=submission_data.code,
         language=submission_data.language,
         status=SubmissionStatus.PENDING,
-        total_test_cases=len(test_cases_data)
+        total_test_cases=test_set["test_case_count"],
+        test_set_version=test_set["version"],
+        code_hash=code_hash(submission_data.code, submission_data.language, problem_data),
+        phase_timestamps={"accepted": accepted_at}
     )
     db.add(db_submission)
+    # Identical code was judged against the same tests already, its verdict is final
+    reused = reuse_verdict(db, db_submission)
     db.commit()
     db.refresh(db_submission)
     
+    if reused:
+        try:
+            submission_queue.publish_scoring_event(scoring_event(db_submission, problem_data))
+        except Exception as e:
+            print(f"Warning: Could not score reused verdict of submission {db_submission.id}: {e}")
+        SUBMISSION_PHASE_SECONDS.labels(
+            phase="accept", language=submission_data.language, problem=str(submission_data.problem_id)
+        ).observe(time.monotonic() - accept_started)
+        return db_submission
+    
     # Publish to queue for execution
     try:
         submission_queue.publish_submission(
             submission_id=str(db_submission.id),
-            problem_id=str(submission_data.problem_id),
+            user_id=str(user_id),
             code=submission_data.code,
-            test_cases=test_cases_data
+            problem=problem_data,
+            test_set_version=test_set["version"],
+            language=submission_data.language,
+            phase_timestamps=db_submission.phase_timestamps,
+            # Submissions outside a running contest must not slow down live contestants
+            lane="contest" if problem_data.get("contest_running") else "practice"
         )
     except Exception as e:
         # Update submission status to error
@@ -87,6 +117,9 @@ async def create_submission(
             detail="Failed to queue submission for execution"
         )
     
+    SUBMISSION_PHASE_SECONDS.labels(
+        phase="accept", language=submission_data.language, problem=str(submission_data.problem_id)
+    ).observe(time.monotonic() - accept_started)
     return db_submission
 
 @router.get("/", response_model=List[SubmissionResponse])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
@@ -8,7 +8,27 @@ class SubmissionCreate(BaseModel):
     contest_id: UUID
     problem_id: UUID
     code: str = Field(..., min_length=1)
-    language: str = Field(default="cpp", pattern="^cpp$")
+    language: str = Field(default="cpp", pattern="^(cpp|python|java)$")
+
+class CustomRunCreate(BaseModel):
+    problem_id: UUID
+    code: str = Field(..., min_length=1)
+    language: str = Field(default="cpp", pattern="^(cpp|python|java)$")
+    # Runs the problem's sample tests when not given
+    stdin: Optional[str] = Field(None, max_length=64 * 1024)
+
+class CustomRunTestResult(BaseModel):
+    status: str
+    execution_time_ms: Optional[int] = None
+    memory_used_mb: Optional[Decimal] = None
+    output: Optional[str] = None
+    expected_output: Optional[str] = None
+    error_message: Optional[str] = None
+
+class CustomRunResponse(BaseModel):
+    status: str
+    error_message: Optional[str] = None
+    tests: List[CustomRunTestResult] = []
 
 class SubmissionUpdate(BaseModel):
     status: Optional[str] = None
@@ -35,6 +55,7 @@ class SubmissionResponse(BaseModel):
     error_message: Optional[str]
     submitted_at: datetime
     evaluated_at: Optional[datetime]
+    phase_timestamps: Optional[Dict[str, float]] = None
 
     class Config:
         from_attributes = True
@@ -56,3 +77,23 @@ class SubmissionResultResponse(BaseModel):
 class SubmissionWithResults(SubmissionResponse):
     results: List[SubmissionResultResponse] = []
 
+
+class RejudgeCreate(BaseModel):
+    contest_id: UUID
+    # Rejudges every problem of the contest when not set
+    problem_id: Optional[UUID] = None
+
+class RejudgeJobResponse(BaseModel):
+    id: UUID
+    contest_id: UUID
+    problem_id: Optional[UUID]
+    status: str
+    enqueued_submissions: int
+    judged_submissions: int
+    error_message: Optional[str]
+    created_by: UUID
+    created_at: datetime
+    completed_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
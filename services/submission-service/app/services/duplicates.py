@@ -0,0 +1,105 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Dict
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+from app.models.submission import Submission, SubmissionStatus
+from app.models.submission_result import SubmissionResult
+
+# Verdicts that are reused for identical code; anything else is judged again. Time limit
+# exceeded and runtime errors (memory limit, stack, a judge hiccup) depend on the node and its
+# load, so the same code resubmitted must get a fresh run rather than an inherited failure.
+REUSABLE_STATUSES = (
+    SubmissionStatus.ACCEPTED,
+    SubmissionStatus.WRONG_ANSWER,
+    SubmissionStatus.COMPILATION_ERROR,
+)
+
+def code_hash(code: str, language: str, problem: dict) -> str:
+    """Hash of a submission's code and of the problem settings its verdict depends on
+
+    Tests are covered by the test-set version stored next to the hash; limits,
+    checker and judging policy can change without a new version, so they are
+    hashed in.
+    """
+    judged_under = {
+        "language": language,
+        "time_limit_seconds": problem.get("time_limit_seconds", 2),
+        "memory_limit_mb": problem.get("memory_limit_mb", 256),
+        "judging_policy": problem.get("effective_judging_policy", "ioi"),
+        "checker_mode": problem.get("checker_mode", "exact"),
+        "checker_tolerance": problem.get("checker_tolerance", 1e-6),
+        "checker_version": problem.get("checker_version", 1),
+    }
+    digest = hashlib.sha256(json.dumps(judged_under, sort_keys=True).encode())
+    digest.update(b"\0")
+    digest.update(code.encode("utf-8"))
+    return digest.hexdigest()
+
+def reuse_verdict(db: Session, submission: Submission) -> bool:
+    """Give a new submission the verdict of an identical judged one, if there is one
+
+    Copies the verdict and the per-test results of the most recently judged
+    submission with the same problem, test-set version and code hash. The
+    caller commits.
+    """
+    judged = db.execute(
+        select(Submission)
+        .where(
+            Submission.problem_id == submission.problem_id,
+            Submission.test_set_version == submission.test_set_version,
+            Submission.code_hash == submission.code_hash,
+            Submission.evaluated_at.is_not(None),
+            Submission.status.in_(REUSABLE_STATUSES)
+        )
+        .order_by(Submission.evaluated_at.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if judged is None:
+        return False
+
+    submission.status = judged.status
+    submission.test_cases_passed = judged.test_cases_passed
+    submission.total_test_cases = judged.total_test_cases
+    submission.execution_time_ms = judged.execution_time_ms
+    submission.memory_used_mb = judged.memory_used_mb
+    submission.error_message = judged.error_message
+    submission.evaluated_at = datetime.now(timezone.utc)
+    submission.phase_timestamps = {**(submission.phase_timestamps or {}), "stored": submission.evaluated_at.timestamp()}
+    db.flush()
+
+    db.execute(
+        insert(SubmissionResult).from_select(
+            ["submission_id", "test_case_id", "status", "execution_time_ms", "memory_used_mb", "actual_output", "error_message"],
+            select(
+                literal(submission.id, Submission.id.type),
+                SubmissionResult.test_case_id,
+                SubmissionResult.status,
+                SubmissionResult.execution_time_ms,
+                SubmissionResult.memory_used_mb,
+                SubmissionResult.actual_output,
+                SubmissionResult.error_message
+            ).where(SubmissionResult.submission_id == judged.id),
+            # Row ids come from the database default, a Python default would repeat one id
+            include_defaults=False
+        )
+    )
+    return True
+
+def scoring_event(submission: Submission, problem: dict) -> Dict:
+    """Scoring event of a submission that got its verdict without being judged"""
+    return {
+        "submission_id": str(submission.id),
+        "contest_id": str(submission.contest_id),
+        "user_id": str(submission.user_id),
+        "problem_id": str(submission.problem_id),
+        "test_cases_passed": submission.test_cases_passed,
+        "total_test_cases": submission.total_test_cases,
+        "execution_time_ms": submission.execution_time_ms or 0,
+        "problem_points": problem.get("points", 100),
+        "time_limit_ms": problem.get("time_limit_seconds", 2) * 1000,
+        "judging_policy": problem.get("effective_judging_policy", "ioi"),
+        "language": submission.language,
+        "phase_timestamps": submission.phase_timestamps
+    }
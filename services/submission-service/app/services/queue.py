@@ -1,7 +1,16 @@
 import pika
 import json
+import time
+from typing import Dict, Optional
 from app.config import settings
 
+# Priority lanes of the judges, see execution-service LANE_WEIGHTS
+LANES = ("contest", "practice", "rejudge")
+
+def lane_queue(lane: str) -> str:
+    """Queue of a priority lane; live contest traffic keeps SUBMISSION_QUEUE itself"""
+    return settings.SUBMISSION_QUEUE if lane == "contest" else f"{settings.SUBMISSION_QUEUE}.{lane}"
+
 class SubmissionQueue:
     def __init__(self):
         self.connection = None
@@ -14,32 +23,78 @@ class SubmissionQueue:
                 pika.URLParameters(settings.RABBITMQ_URL)
             )
             self.channel = self.connection.channel()
-            self.channel.queue_declare(queue=settings.SUBMISSION_QUEUE, durable=True)
+            for lane in LANES:
+                self.channel.queue_declare(queue=lane_queue(lane), durable=True)
+            self.channel.queue_declare(queue=settings.SCORING_QUEUE, durable=True)
         except Exception as e:
             print(f"Failed to connect to RabbitMQ: {e}")
             raise
     
-    def publish_submission(self, submission_id: str, problem_id: str, code: str, test_cases: list):
-        """Publish submission to queue for execution"""
+    def publish_submission(self, submission_id: str, user_id: str, code: str, problem: dict, test_set_version: int,
+                           lane: str = "contest", rejudge_job_id: Optional[str] = None, language: str = "cpp",
+                           phase_timestamps: Optional[Dict[str, float]] = None):
+        """Publish submission to the queue of a priority lane for execution
+        
+        problem is the problem as returned by contest-service. Test data is not
+        included; judges load it from their local cache by problem id and
+        test-set version. Judges share capacity between the users of a lane by
+        user_id. Results of a rejudge carry rejudge_job_id back, so they can
+        be held until the whole job is judged. phase_timestamps travel with
+        the submission and are completed by the judge.
+        """
         if not self.channel:
             self.connect()
         
         message = {
             "submission_id": submission_id,
-            "problem_id": problem_id,
+            "user_id": user_id,
+            "problem_id": str(problem["id"]),
             "code": code,
-            "test_cases": test_cases
+            "language": language,
+            "test_set_version": test_set_version,
+            "time_limit_seconds": problem.get("time_limit_seconds", 2),
+            "memory_limit_mb": problem.get("memory_limit_mb", 256),
+            "points": problem.get("points", 100),
+            "judging_policy": problem.get("effective_judging_policy", "ioi"),
+            "checker_mode": problem.get("checker_mode", "exact"),
+            "checker_tolerance": problem.get("checker_tolerance", 1e-6),
+            # Custom checkers are fetched and compiled by judges once per version
+            "checker_version": problem.get("checker_version", 1),
+            "phase_timestamps": {**(phase_timestamps or {}), "queued": time.time()}
         }
+        if rejudge_job_id:
+            message["rejudge_job_id"] = rejudge_job_id
         
         self.channel.basic_publish(
             exchange="",
-            routing_key=settings.SUBMISSION_QUEUE,
+            routing_key=lane_queue(lane),
             body=json.dumps(message),
+            properties=pika.BasicProperties(
+                delivery_mode=2,  # Make message persistent
+                timestamp=int(time.time()),  # Judges export queue lag from it
+            )
+        )
+    
+    def publish_scoring_event(self, event: dict):
+        """Publish an event to scoring-service"""
+        if not self.channel:
+            self.connect()
+        
+        self.channel.basic_publish(
+            exchange="",
+            routing_key=settings.SCORING_QUEUE,
+            body=json.dumps(event),
             properties=pika.BasicProperties(
                 delivery_mode=2,  # Make message persistent
             )
         )
     
+    def queue_depth(self, lane: str) -> int:
+        """Number of messages waiting in the queue of a priority lane"""
+        if not self.channel:
+            self.connect()
+        return self.channel.queue_declare(queue=lane_queue(lane), durable=True, passive=True).method.message_count
+    
     def close(self):
         """Close connection"""
         if self.connection and not self.connection.is_closed:
@@ -0,0 +1,275 @@
+import httpx
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.submission import Submission
+from app.models.submission_result import SubmissionResult
+from app.models.rejudge import RejudgeJob, RejudgeResult, RejudgeStatus
+from app.services.queue import SubmissionQueue
+
+# Jobs that are still being enqueued or judged
+ACTIVE_REJUDGE_STATUSES = (RejudgeStatus.ENQUEUEING, RejudgeStatus.JUDGING)
+
+def enqueue_rejudge(job_id: UUID):
+    """Queue every submission of a rejudge job on the rejudge lane
+
+    Submissions still waiting for their first verdict are included. Their
+    original result is judged on an older test set, so it is dropped if it
+    arrives after the rejudge was swapped in (see _write_submission_results).
+
+    Problems are fetched once when the job starts, so all submissions to a
+    problem are judged on the same test-set version. Submissions are read in
+    batches of REJUDGE_BATCH_SIZE ordered by id, each in a short transaction of
+    its own, so no transaction or cursor stays open while enqueueing pauses
+    because REJUDGE_MAX_QUEUED messages are still waiting in the rejudge lane.
+    Enqueueing stops as soon as the job is no longer ENQUEUEING, e.g. because
+    it was cancelled.
+    """
+    queue = SubmissionQueue()
+    try:
+        db = SessionLocal()
+        try:
+            job = db.get(RejudgeJob, job_id)
+            contest_id, problem_id, created_at = job.contest_id, job.problem_id, job.created_at
+        finally:
+            db.close()
+        problems = _fetch_problems(contest_id, problem_id)
+
+        enqueued = 0
+        last_id = None
+        while True:
+            while queue.queue_depth("rejudge") > settings.REJUDGE_MAX_QUEUED:
+                time.sleep(settings.REJUDGE_QUEUE_POLL_SECONDS)
+
+            batch = _next_batch(contest_id, problem_id, created_at, last_id)
+            if not batch:
+                break
+            for row in batch:
+                problem = problems[row.problem_id]
+                queue.publish_submission(
+                    submission_id=str(row.id),
+                    user_id=str(row.user_id),
+                    code=row.code,
+                    problem=problem,
+                    test_set_version=problem["test_set_version"],
+                    lane="rejudge",
+                    rejudge_job_id=str(job_id),
+                    language=row.language
+                )
+            enqueued += len(batch)
+            last_id = batch[-1].id
+            if not _update_enqueueing_job(job_id, enqueued_submissions=enqueued):
+                print(f"Rejudge {job_id} stopped enqueueing, it is no longer in progress")
+                return
+
+        if not _update_enqueueing_job(job_id, status=RejudgeStatus.JUDGING):
+            return
+        # Every result may have come back before the job was marked as judging
+        db = SessionLocal()
+        try:
+            event = complete_rejudge(db, job_id)
+        finally:
+            db.close()
+        if event:
+            queue.publish_scoring_event(event)
+    except Exception as e:
+        print(f"Rejudge {job_id} failed: {e}")
+        db = SessionLocal()
+        try:
+            fail_rejudge(db, job_id, str(e))
+        finally:
+            db.close()
+    finally:
+        queue.close()
+
+def _fetch_problems(contest_id: UUID, problem_id: Optional[UUID]) -> Dict[UUID, Dict]:
+    """Problems to rejudge, with their current test-set versions, from contest-service"""
+    with httpx.Client(timeout=30) as client:
+        response = client.get(f"{settings.CONTEST_SERVICE_URL}/api/v1/problems/contest/{contest_id}")
+    response.raise_for_status()
+    problems = {UUID(problem["id"]): problem for problem in response.json()}
+    if problem_id is not None:
+        problems = {problem_id: problems[problem_id]}
+    return problems
+
+def _next_batch(contest_id: UUID, problem_id: Optional[UUID], created_at: datetime, after: Optional[UUID]) -> List:
+    """Next REJUDGE_BATCH_SIZE submissions of a job by id, read in a transaction of their own"""
+    query = select(Submission.id, Submission.user_id, Submission.problem_id, Submission.code, Submission.language).where(
+        Submission.contest_id == contest_id,
+        # Submissions made after the rejudge started are judged with the new tests already
+        Submission.submitted_at <= created_at
+    )
+    if problem_id is not None:
+        query = query.where(Submission.problem_id == problem_id)
+    if after is not None:
+        query = query.where(Submission.id > after)
+    db = SessionLocal()
+    try:
+        return db.execute(query.order_by(Submission.id).limit(settings.REJUDGE_BATCH_SIZE)).all()
+    finally:
+        db.close()
+
+def _update_enqueueing_job(job_id: UUID, **values) -> bool:
+    """Update a job that is still enqueueing, return False if it was cancelled or failed meanwhile"""
+    db = SessionLocal()
+    try:
+        updated = db.execute(
+            update(RejudgeJob)
+            .where(RejudgeJob.id == job_id, RejudgeJob.status == RejudgeStatus.ENQUEUEING)
+            .values(**values)
+        ).rowcount
+        db.commit()
+        return updated == 1
+    finally:
+        db.close()
+
+def fail_rejudge(db: Session, job_id: UUID, error_message: str) -> bool:
+    """Mark an unfinished job as failed and drop its staged results; submissions keep their verdicts
+
+    Returns False if the job had already completed or failed.
+    """
+    failed = db.execute(
+        update(RejudgeJob)
+        .where(RejudgeJob.id == job_id, RejudgeJob.status.in_(ACTIVE_REJUDGE_STATUSES))
+        .values(status=RejudgeStatus.FAILED, error_message=error_message, completed_at=datetime.now(timezone.utc))
+    ).rowcount
+    if failed:
+        db.execute(delete(RejudgeResult).where(RejudgeResult.job_id == job_id))
+    db.commit()
+    return failed == 1
+
+def expire_rejudges(db: Session, contest_id: UUID):
+    """Fail the contest's jobs still unfinished after REJUDGE_TIMEOUT_SECONDS, e.g. because a submission was lost"""
+    deadline = datetime.now(timezone.utc) - timedelta(seconds=settings.REJUDGE_TIMEOUT_SECONDS)
+    expired = db.execute(
+        select(RejudgeJob.id).where(
+            RejudgeJob.contest_id == contest_id,
+            RejudgeJob.status.in_(ACTIVE_REJUDGE_STATUSES),
+            RejudgeJob.created_at < deadline
+        )
+    ).scalars().all()
+    for job_id in expired:
+        fail_rejudge(db, job_id, f"Not finished within {settings.REJUDGE_TIMEOUT_SECONDS} seconds")
+
+def store_rejudge_results(db: Session, events: List[Dict]) -> List[UUID]:
+    """Stage results of rejudged submissions, return the jobs they belong to
+
+    Results go to rejudge_results instead of the submissions, which keep their
+    current verdicts until the whole job is swapped in by complete_rejudge.
+    The caller commits.
+    """
+    # Results of cancelled or failed jobs still come back, they are not staged; the
+    # share lock keeps a job from failing before its results are committed
+    active = set(db.execute(
+        select(RejudgeJob.id)
+        .where(
+            RejudgeJob.id.in_({UUID(event["rejudge_job_id"]) for event in events}),
+            RejudgeJob.status.in_(ACTIVE_REJUDGE_STATUSES)
+        )
+        .with_for_update(read=True)
+    ).scalars())
+    rows = [
+        {
+            "job_id": UUID(event["rejudge_job_id"]),
+            "submission_id": UUID(event["submission_id"]),
+            "status": event["status"],
+            "test_cases_passed": event["test_cases_passed"],
+            "total_test_cases": event["total_test_cases"],
+            "execution_time_ms": event.get("execution_time_ms"),
+            "memory_used_mb": event.get("memory_used_mb"),
+            "error_message": event.get("error_message"),
+            "test_set_version": event.get("test_set_version"),
+            "results": event.get("results", [])
+        }
+        for event in events if UUID(event["rejudge_job_id"]) in active
+    ]
+    if not rows:
+        return []
+    statement = pg_insert(RejudgeResult)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[RejudgeResult.job_id, RejudgeResult.submission_id],
+            set_={column: statement.excluded[column] for column in rows[0] if column not in ("job_id", "submission_id")}
+        ),
+        rows
+    )
+
+    # Counted rather than incremented, so redelivered results are not counted twice
+    job_ids = list({row["job_id"] for row in rows})
+    judged = (
+        select(func.count())
+        .select_from(RejudgeResult)
+        .where(RejudgeResult.job_id == RejudgeJob.id)
+        .scalar_subquery()
+    )
+    db.execute(update(RejudgeJob).where(RejudgeJob.id.in_(job_ids)).values(judged_submissions=judged))
+    return job_ids
+
+def complete_rejudge(db: Session, job_id: UUID) -> Optional[Dict]:
+    """Swap the staged results of a fully judged job into the submissions in one transaction
+
+    Returns the scoring event rebuilding the contest leaderboard, or None if the
+    job is still in progress or was completed already.
+    """
+    job = db.execute(select(RejudgeJob).where(RejudgeJob.id == job_id).with_for_update()).scalar_one_or_none()
+    if job is None or job.status != RejudgeStatus.JUDGING:
+        db.rollback()
+        return None
+    # Recounted under the lock; judged_submissions can miss results committed concurrently
+    judged = db.execute(select(func.count()).select_from(RejudgeResult).where(RejudgeResult.job_id == job_id)).scalar_one()
+    if judged < job.enqueued_submissions:
+        db.rollback()
+        return None
+
+    evaluated_at = datetime.now(timezone.utc)
+    db.execute(
+        update(Submission)
+        .where(Submission.id == RejudgeResult.submission_id, RejudgeResult.job_id == job_id)
+        .values(
+            status=RejudgeResult.status,
+            test_cases_passed=RejudgeResult.test_cases_passed,
+            total_test_cases=RejudgeResult.total_test_cases,
+            execution_time_ms=RejudgeResult.execution_time_ms,
+            memory_used_mb=RejudgeResult.memory_used_mb,
+            error_message=RejudgeResult.error_message,
+            test_set_version=func.coalesce(RejudgeResult.test_set_version, Submission.test_set_version),
+            evaluated_at=evaluated_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    staged = select(RejudgeResult.submission_id).where(RejudgeResult.job_id == job_id)
+    db.execute(delete(SubmissionResult).where(SubmissionResult.submission_id.in_(staged)))
+    db.execute(
+        text("""
+            INSERT INTO submission_results
+                (submission_id, test_case_id, status, execution_time_ms, memory_used_mb, actual_output, error_message)
+            SELECT r.submission_id, t.test_case_id, t.status, t.execution_time_ms, t.memory_used_mb, t.actual_output, t.error_message
+            FROM rejudge_results r,
+                jsonb_to_recordset(r.results) AS t(
+                    test_case_id UUID, status VARCHAR(20), execution_time_ms INTEGER,
+                    memory_used_mb DECIMAL(10, 2), actual_output TEXT, error_message TEXT
+                )
+            -- Tests without an id came from messages that embedded their test cases
+            WHERE r.job_id = :job_id AND t.test_case_id IS NOT NULL
+        """),
+        {"job_id": job_id}
+    )
+    db.execute(delete(RejudgeResult).where(RejudgeResult.job_id == job_id))
+    job.judged_submissions = judged
+    job.status = RejudgeStatus.COMPLETED
+    job.completed_at = evaluated_at
+    contest_id = job.contest_id
+    db.commit()
+
+    return {
+        "type": "rebuild_leaderboard",
+        "contest_id": str(contest_id),
+        # Submissions evaluated later are scored by their own events
+        "evaluated_before": evaluated_at.isoformat()
+    }
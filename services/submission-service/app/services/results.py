@@ -0,0 +1,257 @@
+import pika
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.submission import Submission, SubmissionStatus
+from app.models.submission_result import SubmissionResult, TestCaseStatus
+from app.metrics import RESULT_RETRIES_TOTAL, SUBMISSION_PHASE_SECONDS
+from app.services.rejudge import complete_rejudge, fail_rejudge, store_rejudge_results
+from app.services.retries import declare_retry_queues, retry_later
+
+def write_results(db: Session, events: List[Dict]) -> List[Dict]:
+    """Store a batch of execution results in one transaction, return the scoring events to forward
+
+    Submissions are updated with one executemany UPDATE and per-test rows are
+    written with multi-row INSERTs. Results already stored for a submission
+    are replaced, so redelivered events are harmless.
+    
+    Results judged on an older test set than the submission's current one are
+    dropped; they come from the first judging of a submission that a rejudge
+    has replaced already.
+
+    Results of a rejudge are only staged. Once a rejudge job has every result,
+    they are swapped in together and a single event rebuilding the contest
+    leaderboard replaces their individual scoring events.
+    """
+    # Judges report rejudge submissions that ended up in a poison queue, their job cannot complete
+    for event in events:
+        if event.get("type") == "rejudge_failed":
+            fail_rejudge(
+                db, UUID(event["rejudge_job_id"]),
+                f"Submission {event['submission_id']} could not be judged: {event.get('error_message')}"
+            )
+    events = [event for event in events if event.get("type") != "rejudge_failed"]
+    rejudged = [event for event in events if event.get("rejudge_job_id")]
+    events = [event for event in events if not event.get("rejudge_job_id")]
+    scoring_events = _write_submission_results(db, events) if events else []
+    if rejudged:
+        job_ids = store_rejudge_results(db, rejudged)
+        db.commit()
+        for job_id in job_ids:
+            event = complete_rejudge(db, job_id)
+            if event:
+                scoring_events.append(event)
+    return scoring_events
+
+def _write_submission_results(db: Session, events: List[Dict]) -> List[Dict]:
+    # A submission judged twice within the batch keeps its latest result
+    latest = {UUID(event["submission_id"]): event for event in events}
+    submission_ids = list(latest)
+    evaluated_at = datetime.now(timezone.utc)
+    stored_at = evaluated_at.timestamp()
+
+    submissions = {
+        row.id: row
+        for row in db.execute(
+            select(
+                Submission.id, Submission.contest_id, Submission.user_id, Submission.problem_id, Submission.language,
+                Submission.test_set_version
+            )
+            .where(Submission.id.in_(submission_ids))
+        )
+        if latest[row.id].get("test_set_version") is None or row.test_set_version is None
+        or latest[row.id]["test_set_version"] >= row.test_set_version
+    }
+    if not submissions:
+        return []
+
+    db.execute(
+        update(Submission),
+        [
+            {
+                "id": submission_id,
+                "status": SubmissionStatus(event["status"]),
+                "test_cases_passed": event["test_cases_passed"],
+                "total_test_cases": event["total_test_cases"],
+                "execution_time_ms": event.get("execution_time_ms"),
+                "memory_used_mb": event.get("memory_used_mb"),
+                "error_message": event.get("error_message"),
+                "evaluated_at": evaluated_at,
+                "phase_timestamps": {**event.get("phase_timestamps", {}), "stored": stored_at}
+            }
+            for submission_id, event in latest.items() if submission_id in submissions
+        ]
+    )
+    db.execute(delete(SubmissionResult).where(SubmissionResult.submission_id.in_(list(submissions))))
+    rows = [
+        {
+            "submission_id": submission_id,
+            "test_case_id": UUID(test["test_case_id"]),
+            "status": TestCaseStatus(test["status"]),
+            "execution_time_ms": test.get("execution_time_ms"),
+            "memory_used_mb": test.get("memory_used_mb"),
+            "actual_output": test.get("actual_output"),
+            "error_message": test.get("error_message")
+        }
+        for submission_id, event in latest.items() if submission_id in submissions
+        for test in event.get("results", [])
+        # Tests without an id came from messages that embedded their test cases
+        if test.get("test_case_id")
+    ]
+    if rows:
+        db.execute(insert(SubmissionResult), rows)
+    db.commit()
+    
+    for submission_id, event in latest.items():
+        if submission_id not in submissions:
+            continue
+        timestamps = event.get("phase_timestamps", {})
+        labels = {"language": submissions[submission_id].language, "problem": str(submissions[submission_id].problem_id)}
+        if "judged" in timestamps:
+            SUBMISSION_PHASE_SECONDS.labels(phase="result_write", **labels).observe(max(0.0, stored_at - timestamps["judged"]))
+        if "accepted" in timestamps:
+            SUBMISSION_PHASE_SECONDS.labels(phase="total", **labels).observe(max(0.0, stored_at - timestamps["accepted"]))
+
+    return [
+        {
+            "submission_id": str(submission_id),
+            "contest_id": str(submissions[submission_id].contest_id),
+            "user_id": str(submissions[submission_id].user_id),
+            "problem_id": str(submissions[submission_id].problem_id),
+            "test_cases_passed": event["test_cases_passed"],
+            "total_test_cases": event["total_test_cases"],
+            "execution_time_ms": event.get("execution_time_ms") or 0,
+            "problem_points": event.get("points", 100),
+            "time_limit_ms": event.get("time_limit_ms", 2000),
+            "judging_policy": event.get("judging_policy", "ioi"),
+            "language": submissions[submission_id].language,
+            "phase_timestamps": {**event.get("phase_timestamps", {}), "stored": stored_at}
+        }
+        for submission_id, event in latest.items() if submission_id in submissions
+    ]
+
+class ResultConsumer:
+    """Consumes execution results, stores them in batches and forwards them to scoring
+
+    A batch is written when RESULT_BATCH_SIZE events have arrived or the oldest
+    has waited RESULT_BATCH_MAX_WAIT_MS. Events are acknowledged only after
+    their batch is committed and the scoring events are confirmed by the broker.
+    If a batch fails, its events are written one at a time, so one event that
+    cannot be stored does not hold back the others; that event goes to a retry
+    queue, and after the last retry to the poison queue (see retries.py).
+    """
+
+    def __init__(self):
+        self._stopping = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        """Consume until stop() is called, reconnecting on errors"""
+        try:
+            while not self._stopping.is_set():
+                try:
+                    self._consume()
+                except Exception as e:
+                    if self._stopping.is_set():
+                        break
+                    print(f"Result consumer error: {e}, retrying in 5 seconds...")
+                    self._stopping.wait(5)
+        finally:
+            self._stopped.set()
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Write the pending batch and stop consuming"""
+        self._stopping.set()
+        return self._stopped.wait(timeout)
+
+    def _consume(self):
+        connection = pika.BlockingConnection(pika.URLParameters(settings.RABBITMQ_URL))
+        try:
+            channel = connection.channel()
+            channel.queue_declare(queue=settings.RESULT_QUEUE, durable=True)
+            declare_retry_queues(channel, settings.RESULT_QUEUE)
+            channel.queue_declare(queue=settings.SCORING_QUEUE, durable=True)
+            channel.confirm_delivery()
+            channel.basic_qos(prefetch_count=settings.RESULT_BATCH_SIZE * 2)
+
+            max_wait = settings.RESULT_BATCH_MAX_WAIT_MS / 1000
+            # (method, properties, body, event) of each delivery since the last flush
+            batch = []
+            batch_started = 0.0
+            for method, properties, body in channel.consume(settings.RESULT_QUEUE, inactivity_timeout=max_wait):
+                if method is not None:
+                    if not batch:
+                        batch_started = time.monotonic()
+                    try:
+                        event = json.loads(body)
+                    except ValueError:
+                        print(f"Dropping malformed result event: {body[:200]!r}")
+                        event = None
+                    batch.append((method, properties, body, event))
+
+                full = len(batch) >= settings.RESULT_BATCH_SIZE
+                if batch and (full or time.monotonic() - batch_started >= max_wait or self._stopping.is_set()):
+                    self._flush(channel, batch)
+                    batch = []
+                if self._stopping.is_set() and not batch:
+                    break
+            channel.cancel()
+        finally:
+            if connection.is_open:
+                connection.close()
+
+    def _flush(self, channel, batch: List):
+        events = [event for _, _, _, event in batch if event is not None]
+        try:
+            scoring_events = self._write(events) if events else []
+        except Exception as e:
+            print(f"Warning: Storing a batch of {len(events)} results failed, storing them one at a time: {e}")
+            for method, properties, body, event in batch:
+                if event is not None:
+                    self._flush_one(channel, properties, body, event)
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        self._publish(channel, scoring_events)
+        channel.basic_ack(delivery_tag=batch[-1][0].delivery_tag, multiple=True)
+
+    def _flush_one(self, channel, properties, body: bytes, event: Dict):
+        """Store a single event, or move it to a retry queue; the caller acks it afterwards"""
+        try:
+            scoring_events = self._write([event])
+        except Exception as e:
+            outcome = retry_later(channel, settings.RESULT_QUEUE, properties, body, e)
+            RESULT_RETRIES_TOTAL.labels(outcome=outcome).inc()
+            print(f"Warning: Result of submission {event.get('submission_id')} not stored ({outcome}): {e}")
+            return
+        self._publish(channel, scoring_events)
+
+    def _write(self, events: List[Dict]) -> List[Dict]:
+        db = SessionLocal()
+        try:
+            return write_results(db, events)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _publish(self, channel, scoring_events: List[Dict]):
+        for event in scoring_events:
+            channel.basic_publish(
+                exchange="",
+                routing_key=settings.SCORING_QUEUE,
+                body=json.dumps(event),
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                )
+            )
+
+result_consumer = ResultConsumer()
@@ -0,0 +1,52 @@
+from app.models.submission import SubmissionStatus
+from app.services.duplicates import REUSABLE_STATUSES, code_hash
+
+PROBLEM = {
+    "time_limit_seconds": 2,
+    "memory_limit_mb": 256,
+    "effective_judging_policy": "icpc",
+    "checker_mode": "exact",
+    "checker_tolerance": 1e-6,
+    "checker_version": 1,
+}
+CODE = "int main() { return 0; }"
+
+
+def test_same_code_same_settings_same_hash():
+    assert code_hash(CODE, "cpp", PROBLEM) == code_hash(CODE, "cpp", dict(PROBLEM))
+
+def test_hash_is_sha256_hex():
+    digest = code_hash(CODE, "cpp", PROBLEM)
+    assert len(digest) == 64
+    assert int(digest, 16) >= 0
+
+def test_code_changes_hash():
+    assert code_hash(CODE, "cpp", PROBLEM) != code_hash(CODE + "\n", "cpp", PROBLEM)
+
+def test_language_changes_hash():
+    assert code_hash(CODE, "cpp", PROBLEM) != code_hash(CODE, "python", PROBLEM)
+
+def test_judging_settings_change_hash():
+    # None of these bump the test-set version, so the hash has to tell the verdicts apart
+    base = code_hash(CODE, "cpp", PROBLEM)
+    for field, value in [
+        ("time_limit_seconds", 3),
+        ("memory_limit_mb", 512),
+        ("effective_judging_policy", "ioi"),
+        ("checker_mode", "float"),
+        ("checker_tolerance", 1e-3),
+        ("checker_version", 2),
+    ]:
+        assert code_hash(CODE, "cpp", {**PROBLEM, field: value}) != base, field
+
+def test_unrelated_problem_fields_do_not_change_hash():
+    assert code_hash(CODE, "cpp", PROBLEM) == code_hash(CODE, "cpp", {**PROBLEM, "title": "A + B", "points": 500})
+
+def test_missing_settings_use_defaults():
+    defaults = {"time_limit_seconds": 2, "memory_limit_mb": 256, "effective_judging_policy": "ioi"}
+    assert code_hash(CODE, "cpp", {}) == code_hash(CODE, "cpp", defaults)
+
+def test_resource_dependent_verdicts_are_judged_again():
+    assert SubmissionStatus.TIME_LIMIT_EXCEEDED not in REUSABLE_STATUSES
+    assert SubmissionStatus.RUNTIME_ERROR not in REUSABLE_STATUSES
+    assert SubmissionStatus.WRONG_ANSWER in REUSABLE_STATUSES
@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import app.services.results as results
+from app.config import settings
+from app.services.results import ResultConsumer
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+        self.acked = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append((routing_key, json.loads(body), properties))
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acked.append((delivery_tag, multiple))
+
+
+class FakeSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def write_results(db, events):
+    # Like an unknown status or a foreign key violation, the bad event fails any batch it is in
+    if any(event["status"] == "bogus" for event in events):
+        raise ValueError("'bogus' is not a valid SubmissionStatus")
+    return [{"submission_id": event["submission_id"]} for event in events]
+
+
+def delivery(tag, submission_id, status="accepted", headers=None):
+    event = {"submission_id": submission_id, "status": status, "test_cases_passed": 1, "total_test_cases": 1}
+    properties = SimpleNamespace(headers=headers, timestamp=1700000000)
+    return SimpleNamespace(delivery_tag=tag), properties, json.dumps(event).encode(), event
+
+
+def flush(monkeypatch, batch):
+    monkeypatch.setattr(results, "write_results", write_results)
+    monkeypatch.setattr(results, "SessionLocal", FakeSession)
+    channel = FakeChannel()
+    ResultConsumer()._flush(channel, batch)
+    return channel
+
+
+def test_batch_is_acked_at_once(monkeypatch):
+    channel = flush(monkeypatch, [delivery(1, "a"), delivery(2, "b")])
+
+    assert channel.acked == [(2, True)]
+    assert [body["submission_id"] for _, body, _ in channel.published] == ["a", "b"]
+
+
+def test_bad_event_does_not_stall_the_events_behind_it(monkeypatch):
+    channel = flush(monkeypatch, [delivery(1, "a"), delivery(2, "bad", status="bogus"), delivery(3, "c")])
+
+    assert channel.acked == [(1, False), (2, False), (3, False)]
+    scored = [body["submission_id"] for queue, body, _ in channel.published if queue == settings.SCORING_QUEUE]
+    assert scored == ["a", "c"]
+    retried = [(queue, body, properties) for queue, body, properties in channel.published if queue != settings.SCORING_QUEUE]
+    assert len(retried) == 1
+    queue, body, properties = retried[0]
+    assert queue == f"{settings.RESULT_QUEUE}.retry.{settings.RETRY_DELAYS_SECONDS[0]}s"
+    assert body["submission_id"] == "bad"
+    assert properties.headers["retries"] == 1
+    assert "bogus" in properties.headers["last_error"]
+
+
+def test_bad_event_is_poisoned_after_the_last_retry(monkeypatch):
+    headers = {"retries": len(settings.RETRY_DELAYS_SECONDS)}
+    channel = flush(monkeypatch, [delivery(1, "bad", status="bogus", headers=headers)])
+
+    assert channel.acked == [(1, False)]
+    assert [queue for queue, _, _ in channel.published] == [f"{settings.RESULT_QUEUE}.poison"]